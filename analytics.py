@@ -0,0 +1,180 @@
+"""
+Expense Analytics
+Per-category distribution statistics and month-over-month deltas over flat
+amount/category/date columns, vectorized with NumPy when it is installed
+and computed in pure Python otherwise.
+"""
+
+from array import array
+from collections import namedtuple
+from datetime import date
+from math import sqrt
+
+try:
+    import numpy as np
+except ImportError:  # Optional: the pure-Python path gives the same results
+    np = None
+
+AnalyticsColumns = namedtuple('AnalyticsColumns', 'amounts codes dates category_names')
+
+PERCENTILES = {'median': 0.5, 'p90': 0.9, 'p99': 0.99}
+
+# Day 0 of numpy's datetime64[D] is 1970-01-01.
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+
+def columns(store):
+    """Return the live rows of ``store`` as AnalyticsColumns.
+
+    ``amounts`` is an ``array('d')``, ``codes`` an ``array('H')`` of indexes
+    into ``category_names`` and ``dates`` an ``array('i')`` of date
+    ordinals. Stores with an ``analytics_columns`` method provide them
+    directly; others are read row by row.
+    """
+    if hasattr(store, 'analytics_columns'):
+        return store.analytics_columns()
+    names, codes_by_name = [], {}
+    amounts, codes, dates = array('d'), array('H'), array('i')
+    ordinals = {}
+    for expense in store:
+        code = codes_by_name.get(expense.category)
+        if code is None:
+            code = codes_by_name[expense.category] = len(names)
+            names.append(expense.category)
+        ordinal = ordinals.get(expense.date)
+        if ordinal is None:
+            ordinal = ordinals[expense.date] = date.fromisoformat(expense.date).toordinal()
+        amounts.append(expense.amount)
+        codes.append(code)
+        dates.append(ordinal)
+    return AnalyticsColumns(amounts, codes, dates, names)
+
+
+def analyze(cols, first=None, last=None, use_numpy=None):
+    """Summarize AnalyticsColumns per category.
+
+    Returns ``{'count', 'by_category', 'backend'}``. Each category has its
+    count, total, mean, median, p90, p99 and population standard deviation
+    (percentiles interpolate linearly, like NumPy's default) plus
+    ``monthly``: its total for every month from the first to the last month
+    with data, with the change from the previous month and the relative
+    change (None where the previous month had nothing). Rows outside the
+    date ordinals ``first``..``last`` are skipped.
+
+    ``use_numpy`` forces a backend; by default NumPy is used when installed.
+    """
+    if use_numpy is None:
+        use_numpy = np is not None
+    if use_numpy:
+        return _analyze_numpy(cols, first, last)
+    return _analyze_python(cols, first, last)
+
+
+def _month_label(month):
+    """Format a month counted from year 0 (``year * 12 + month - 1``)."""
+    return f'{month // 12:04d}-{month % 12 + 1:02d}'
+
+
+def _monthly(totals, months):
+    """Build the ``monthly`` list from per-month totals, starting at month ``months[0]``."""
+    result, previous = [], None
+    for month, total in zip(months, totals):
+        delta = total - previous if previous is not None else None
+        result.append({
+            'month': _month_label(month),
+            'total': total,
+            'delta': delta,
+            'pct_change': delta / previous if previous else None,
+        })
+        previous = total
+    return result
+
+
+def _analyze_python(cols, first, last):
+    groups = {}
+    month_totals = {}
+    months_seen = set()
+    month_of = {}
+    names = cols.category_names
+    for amount, code, ordinal in zip(cols.amounts, cols.codes, cols.dates):
+        if (first is not None and ordinal < first) or (last is not None and ordinal > last):
+            continue
+        month = month_of.get(ordinal)
+        if month is None:
+            day = date.fromordinal(ordinal)
+            month = month_of[ordinal] = day.year * 12 + day.month - 1
+        groups.setdefault(code, []).append(amount)
+        key = (code, month)
+        month_totals[key] = month_totals.get(key, 0.0) + amount
+        months_seen.add(month)
+
+    months = list(range(min(months_seen), max(months_seen) + 1)) if months_seen else []
+    by_category, count = {}, 0
+    for code in sorted(groups, key=names.__getitem__):
+        values = sorted(groups[code])
+        n = len(values)
+        count += n
+        total = sum(values)
+        mean = total / n
+        stats = {'count': n, 'total': total, 'mean': mean}
+        for name, q in PERCENTILES.items():
+            position = q * (n - 1)
+            low = int(position)
+            high = min(low + 1, n - 1)
+            stats[name] = values[low] + (values[high] - values[low]) * (position - low)
+        stats['std'] = sqrt(sum((v - mean) ** 2 for v in values) / n)
+        stats['monthly'] = _monthly([month_totals.get((code, m), 0.0) for m in months], months)
+        by_category[names[code]] = stats
+    return {'count': count, 'by_category': by_category, 'backend': 'python'}
+
+
+def _analyze_numpy(cols, first, last):
+    amounts = np.frombuffer(cols.amounts, dtype=np.float64)
+    codes = np.frombuffer(cols.codes, dtype=np.uint16)
+    dates = np.frombuffer(cols.dates, dtype=np.int32)
+    if first is not None or last is not None:
+        keep = np.ones(len(amounts), dtype=bool)
+        if first is not None:
+            keep &= dates >= first
+        if last is not None:
+            keep &= dates <= last
+        amounts, codes, dates = amounts[keep], codes[keep], dates[keep]
+    if not len(amounts):
+        return {'count': 0, 'by_category': {}, 'backend': 'numpy'}
+
+    # Sort by category, then amount, so each category is one sorted run.
+    order = np.lexsort((amounts, codes))
+    amounts, codes, dates = amounts[order], codes[order], dates[order]
+    present, starts, counts = np.unique(codes, return_index=True, return_counts=True)
+    totals = np.add.reduceat(amounts, starts)
+    means = totals / counts
+    deviations = amounts - np.repeat(means, counts)
+    stds = np.sqrt(np.add.reduceat(deviations * deviations, starts) / counts)
+    quantiles = {}
+    for name, q in PERCENTILES.items():
+        position = q * (counts - 1)
+        low = np.floor(position).astype(np.int64)
+        high = np.minimum(low + 1, counts - 1)
+        below, above = amounts[starts + low], amounts[starts + high]
+        quantiles[name] = below + (above - below) * (position - low)
+
+    # datetime64[M] counts months from 1970-01; shift to months from year 0.
+    months = (dates - _EPOCH_ORDINAL).astype('datetime64[D]').astype('datetime64[M]')
+    months = months.astype(np.int64) + 1970 * 12
+    low_month = int(months.min())
+    span = int(months.max()) - low_month + 1
+    group = np.repeat(np.arange(len(present)), counts)
+    monthly = np.bincount(group * span + (months - low_month), weights=amounts,
+                          minlength=len(present) * span).reshape(len(present), span)
+    month_range = list(range(low_month, low_month + span))
+
+    names = cols.category_names
+    by_category = {}
+    for i in sorted(range(len(present)), key=lambda i: names[present[i]]):
+        stats = {'count': int(counts[i]), 'total': float(totals[i]), 'mean': float(means[i])}
+        for name in PERCENTILES:
+            stats[name] = float(quantiles[name][i])
+        stats['std'] = float(stds[i])
+        stats['monthly'] = _monthly(monthly[i].tolist(), month_range)
+        by_category[names[present[i]]] = stats
+    return {'count': int(counts.sum()), 'by_category': by_category, 'backend': 'numpy'}
@@ -3,69 +3,309 @@ Expense Tracker Application
 A simple Flask-based expense tracking application with CRUD operations.
 """
 
-from flask import Flask, render_template, request, redirect, url_for, flash, jsonify
-from datetime import datetime
+from flask import Flask, Request, Response, render_template, request, redirect, url_for, flash, jsonify
+from markupsafe import Markup
+import atexit
+import csv
+import io
 import json
+import os
+import tempfile
+import time
+from datetime import date, timedelta
+from functools import partial, wraps
+
+from analytics import analyze, columns
+from compression import COMPRESSIBLE, compress, compress_stream, negotiate
+from fast_json import JSONProvider
+from importer import UNDECODABLE, import_csv, read_header
+from journal import open_journal
+from metrics import RequestMetrics
+from profiling import open_profiler
+from models import (CATEGORIES, MAX_EXPENSE_ID, Expense, is_iso_date, new_expenses,
+                    parse_expense_fields)
+from render_cache import RenderCache
+from store import GRANULARITIES, store_from_config
+
+
+class TimedRequest(Request):
+    """Request that notes when it was created, for ``record_request_metrics``.
+    
+    Stamping the request object costs less than a ``before_request`` hook
+    and also times URL matching.
+    """
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.started = time.perf_counter()
+
 
 app = Flask(__name__)
+app.request_class = TimedRequest
 app.secret_key = 'dev-secret-key-change-in-production'
+app.json = JSONProvider(app)
+
+app.config['EXPENSE_STORE'] = os.environ.get('EXPENSE_STORE', 'memory')
+app.config['EXPENSE_DB_PATH'] = os.environ.get('EXPENSE_DB_PATH', 'expenses.db')
+app.config['EXPENSE_JOURNAL_DIR'] = os.environ.get('EXPENSE_JOURNAL_DIR', '')
+app.config['EXPENSE_SNAPSHOT_EVERY'] = int(os.environ.get('EXPENSE_SNAPSHOT_EVERY', 100_000))
+# Read-only seed data for the columnar store: nothing writes this file back,
+# so changes are lost on restart. Use EXPENSE_JOURNAL_DIR for durable writes.
+app.config['EXPENSE_SNAPSHOT_PATH'] = os.environ.get('EXPENSE_SNAPSHOT_PATH', '')
+# Set when several worker processes serve the app (requires EXPENSE_STORE=sqlite)
+app.config['EXPENSE_MULTIPROCESS'] = os.environ.get('EXPENSE_MULTIPROCESS', '') not in ('', '0')
+app.config['API_DEFAULT_PAGE_SIZE'] = 100
+app.config['API_MAX_PAGE_SIZE'] = 1000
+app.config['API_STREAM_BATCH_SIZE'] = 1000
+app.config['API_BULK_MAX_ROWS'] = 100_000
+app.config['IMPORT_WORKERS'] = int(os.environ.get('IMPORT_WORKERS', 0))
+app.config['IMPORT_REJECT_DIR'] = os.environ.get('IMPORT_REJECT_DIR', '')
+app.config['RENDER_CACHE_MAX_ENTRIES'] = int(os.environ.get('RENDER_CACHE_MAX_ENTRIES', 64))
+app.config['RENDER_CACHE_MAX_BYTES'] = int(os.environ.get('RENDER_CACHE_MAX_BYTES', 32 * 2**20))
+app.config['COMPRESS_MIN_BYTES'] = int(os.environ.get('COMPRESS_MIN_BYTES', 1024))
+app.config['COMPRESS_LEVEL'] = int(os.environ.get('COMPRESS_LEVEL', 6))
+app.config['COMPRESS_CACHE_MAX_ENTRIES'] = int(os.environ.get('COMPRESS_CACHE_MAX_ENTRIES', 64))
+app.config['COMPRESS_CACHE_MAX_BYTES'] = int(os.environ.get('COMPRESS_CACHE_MAX_BYTES', 32 * 2**20))
+app.config['ASGI_THREADS'] = int(os.environ.get('ASGI_THREADS', 16))
+app.config['ASGI_STREAM_THREADS'] = int(os.environ.get('ASGI_STREAM_THREADS', 4))
+# Opt-in profiling: requests carrying PROFILE_HEADER (equal to PROFILE_TOKEN,
+# if set) and a PROFILE_SAMPLE_RATE share of all requests run under cProfile
+app.config['PROFILE_HEADER'] = os.environ.get('PROFILE_HEADER', '')
+app.config['PROFILE_TOKEN'] = os.environ.get('PROFILE_TOKEN', '')
+app.config['PROFILE_SAMPLE_RATE'] = float(os.environ.get('PROFILE_SAMPLE_RATE', 0.0))
+app.config['PROFILE_DIR'] = os.environ.get('PROFILE_DIR', '')
+
+# Expense data store ('memory', 'columnar' or 'sqlite')
+expenses = store_from_config(app.config)
+
+# Optional durability for in-memory stores: replays the journal on startup
+journal = open_journal(app.config, expenses)
+if journal is not None:
+    atexit.register(journal.close)
 
-# In-memory data store
-expenses = []
-next_id = 1
-
-CATEGORIES = [
-    'Food & Dining',
-    'Transportation',
-    'Shopping',
-    'Entertainment',
-    'Bills & Utilities',
-    'Healthcare',
-    'Other'
-]
-
-
-class Expense:
-    """Represents a single expense entry."""
-    
-    def __init__(self, amount, category, description, date=None, expense_id=None):
-        global next_id
-        self.id = expense_id if expense_id else next_id
-        if not expense_id:
-            next_id += 1
-        self.amount = float(amount)
-        self.category = category
-        self.description = description
-        self.date = date if date else datetime.now().strftime('%Y-%m-%d')
-    
-    def to_dict(self):
-        """Convert expense to dictionary."""
-        return {
-            'id': self.id,
-            'amount': self.amount,
-            'category': self.category,
-            'description': self.description,
-            'date': self.date
-        }
+# Rendered expense table/summary fragments, keyed by filter and store version
+render_cache = RenderCache(app.config['RENDER_CACHE_MAX_ENTRIES'],
+                           app.config['RENDER_CACHE_MAX_BYTES'])
+
+# Compressed API bodies, keyed by path, query, encoding and ETag
+compressed_cache = RenderCache(app.config['COMPRESS_CACHE_MAX_ENTRIES'],
+                               app.config['COMPRESS_CACHE_MAX_BYTES'])
+
+# Per-route latency, size and status statistics served at /metrics
+metrics = RequestMetrics()
+
+# Request profiler; None, and not in the request path at all, unless configured
+profiler = open_profiler(app.config, app.wsgi_app, app.url_map, expenses)
+if profiler is not None:
+    app.wsgi_app = profiler
+
+
+def conditional(view=None, *, variant=None):
+    """Tag a GET view's response with the store version as its ETag.
+    
+    A matching ``If-None-Match`` is answered with 304 before the view runs,
+    so unchanged data is never serialized. The version is read before the
+    view, so a concurrent write can only make the tag older than the body,
+    which costs the client one extra refetch, never a stale cache hit.
+    
+    A body compressed for an earlier request with the same ETag is served
+    from ``compressed_cache`` without running the view. Compressed bodies
+    carry the ETag as a weak validator, which still matches here.
+    
+    For a view whose body also depends on request headers, ``variant()``
+    names the representation chosen for this request (or returns None for
+    the default one). It becomes part of the ETag, and responses vary on
+    ``Accept``.
+    """
+    if view is None:
+        return partial(conditional, variant=variant)
+    
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        etag = f'{expenses.epoch}-{expenses.version}'
+        if 'period' in request.args:
+            # Relative periods move with the calendar, not just the data.
+            etag += f'-{date.today().toordinal()}'
+        representation = variant() if variant is not None else None
+        if representation is not None:
+            etag += f'-{representation}'
+        if request.if_none_match.contains_weak(etag):
+            response = app.response_class(status=304)
+        else:
+            response = _cached_compressed(etag)
+            if response is None:
+                response = app.make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+        response.set_etag(etag, weak='Content-Encoding' in response.headers)
+        if variant is not None:
+            response.vary.add('Accept')
+        return response
+    return wrapper
+
+
+def _compressed_key(encoding, etag):
+    return request.path, request.query_string, encoding, etag
+
+
+def _cached_compressed(etag):
+    """Return the cached compressed response for this request and ETag, or None."""
+    encoding = negotiate(request.accept_encodings)
+    # Streams are never cached, and a cached JSON body must not answer an
+    # NDJSON request for the same URL.
+    if encoding is None or request.method != 'GET' or _wants_stream():
+        return None
+    cached = compressed_cache.get(_compressed_key(encoding, etag))
+    if cached is None:
+        return None
+    mimetype, body = cached
+    response = app.response_class(body, mimetype=mimetype)
+    response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    return response
+
+
+def compress_response(response):
+    """Compress text responses for clients that accept gzip, deflate or brotli.
+    
+    Bodies in memory are compressed from ``COMPRESS_MIN_BYTES`` up; streamed
+    bodies always are, chunk by chunk. A body tagged by ``conditional`` is
+    also cached under its ETag, so repeated polls of unchanged data are
+    neither rebuilt nor recompressed.
+    """
+    if (response.status_code != 200 or response.direct_passthrough
+            or 'Content-Encoding' in response.headers
+            or response.mimetype not in COMPRESSIBLE):
+        return response
+    response.vary.add('Accept-Encoding')
+    encoding = negotiate(request.accept_encodings)
+    if encoding is None:
+        return response
+    level = app.config['COMPRESS_LEVEL']
+    etag, weak = response.get_etag()
+    if response.is_streamed:
+        response.response = compress_stream(response.response, encoding, level)
+    else:
+        data = response.get_data()
+        if len(data) < app.config['COMPRESS_MIN_BYTES']:
+            return response
+        started = time.perf_counter()
+        body = compress(data, encoding, level)
+        if etag and not weak and request.method == 'GET':
+            compressed_cache.put(_compressed_key(encoding, etag), (response.mimetype, body),
+                                 len(body), time.perf_counter() - started)
+        response.set_data(body)
+    response.headers['Content-Encoding'] = encoding
+    if etag:
+        response.set_etag(etag, weak=True)
+    return response
+
+
+def record_request_metrics(response):
+    """Record the request's latency, status and body size in ``metrics``.
+    
+    Latency runs until the response is ready; for a streamed body that is
+    before its chunks are produced, and its size is not known.
+    """
+    # Resolve the request proxy once and read the header directly (half the
+    # cost of ``content_length``); this runs on every request.
+    req = request._get_current_object()
+    metrics.observe(req.endpoint or 'unmatched', req.method, response.status_code,
+                    time.perf_counter() - req.started,
+                    response.headers.get('Content-Length', type=int))
+
+
+@app.after_request
+def finish_response(response):
+    """Compress the response, then record the bytes actually sent in ``metrics``.
+    
+    One hook rather than two: Flask's dispatch of each after-request hook
+    costs about as much as the recording itself.
+    """
+    response = compress_response(response)
+    record_request_metrics(response)
+    return response
+
+
+PERIODS = ('this-month', 'last-30-days')
+
+
+def _parse_date_range(args):
+    """Read ``from``/``to`` (YYYY-MM-DD) or a ``period`` into inclusive date ordinals.
+    
+    Returns ``(first, last)`` with None for an open end, or None when no
+    range was requested; raises ValueError if the arguments are invalid.
+    """
+    period = args.get('period')
+    if period:
+        today = date.today()
+        if period == 'this-month':
+            next_month = (today.replace(day=28) + timedelta(days=4)).replace(day=1)
+            return today.replace(day=1).toordinal(), next_month.toordinal() - 1
+        if period == 'last-30-days':
+            return today.toordinal() - 29, today.toordinal()
+        raise ValueError(f"period must be one of: {', '.join(PERIODS)}")
+    if not args.get('from') and not args.get('to'):
+        return None
+    bounds = []
+    for name in ('from', 'to'):
+        value = args.get(name) or None
+        if value is not None:
+            if not is_iso_date(value):
+                raise ValueError(f'{name} must be a YYYY-MM-DD date')
+            value = date.fromisoformat(value).toordinal()
+        bounds.append(value)
+    if None not in bounds and bounds[0] > bounds[1]:
+        raise ValueError('from must not be after to')
+    return tuple(bounds)
+
+
+def _iso(ordinal):
+    return date.fromordinal(ordinal).isoformat() if ordinal is not None else None
 
 
 @app.route('/')
 def index():
-    """Display all expenses with optional filtering."""
-    category_filter = request.args.get('category', '')
+    """Display all expenses with optional filtering.
     
-    filtered_expenses = expenses
-    if category_filter:
-        filtered_expenses = [e for e in expenses if e.category == category_filter]
+    The filter, table and summary come from the render cache, keyed by the
+    filter and store version, so only the flash messages are rendered on
+    every request. The version is read first, so a fragment is never
+    cached under a newer version than the data it shows.
+    """
+    category_filter = request.args.get('category', '')
+    try:
+        date_range = _parse_date_range(request.args)
+    except ValueError:
+        flash('Invalid date! Please use YYYY-MM-DD.', 'error')
+        date_range = None
+    first, last = date_range or (None, None)
+    key = (category_filter, first, last, expenses.epoch, expenses.version)
     
-    total = sum(e.amount for e in filtered_expenses)
+    def render_expenses():
+        if date_range is not None:
+            filtered_expenses = expenses.date_range(first, last, category_filter or None)
+            total = sum(e.amount for e in filtered_expenses)
+        elif category_filter:
+            filtered_expenses = expenses.by_category(category_filter)
+            total = expenses.category_total(category_filter)
+        else:
+            filtered_expenses = expenses
+            total = expenses.total()
+        return render_template(
+            '_expenses.html',
+            expenses=filtered_expenses,
+            categories=CATEGORIES,
+            selected_category=category_filter,
+            date_from=_iso(first) or '',
+            date_to=_iso(last) or '',
+            total=total
+        )
     
     return render_template(
         'index.html',
-        expenses=filtered_expenses,
-        categories=CATEGORIES,
-        selected_category=category_filter,
-        total=total
+        expenses_html=Markup(render_cache.get_or_render(key, render_expenses)),
+        categories=CATEGORIES
     )
 
 
@@ -79,23 +319,22 @@ def add_expense():
         date = request.form.get('date')
         
         # Validation
-        if not amount or not category or not description:
-            flash('All fields are required!', 'error')
-            return redirect(url_for('index'))
-        
-        if float(amount) <= 0:
-            flash('Amount must be greater than zero!', 'error')
+        try:
+            amount, category, description, date = parse_expense_fields(
+                amount, category, description, date)
+        except ValueError as e:
+            flash(str(e), 'error')
             return redirect(url_for('index'))
         
         expense = Expense(amount, category, description, date)
-        expenses.append(expense)
+        if journal is not None:
+            journal.add(expenses, expense)
+        else:
+            expenses.add(expense)
         
         flash(f'Expense of ${expense.amount:.2f} added successfully!', 'success')
         return redirect(url_for('index'))
     
-    except ValueError:
-        flash('Invalid amount! Please enter a valid number.', 'error')
-        return redirect(url_for('index'))
     except Exception as e:
         flash(f'Error adding expense: {str(e)}', 'error')
         return redirect(url_for('index'))
@@ -104,12 +343,12 @@ def add_expense():
 @app.route('/delete/<int:expense_id>', methods=['POST'])
 def delete_expense(expense_id):
     """Delete an expense by ID."""
-    global expenses
-    
-    expense = next((e for e in expenses if e.id == expense_id), None)
+    if journal is not None:
+        expense = journal.delete(expenses, expense_id)
+    else:
+        expense = expenses.delete(expense_id)
     
     if expense:
-        expenses[:] = [e for e in expenses if e.id != expense_id]  # Update in place
         flash(f'Expense deleted successfully!', 'success')
     else:
         flash('Expense not found!', 'error')
@@ -117,37 +356,419 @@ def delete_expense(expense_id):
     return redirect(url_for('index'))
 
 
+def _parse_page_args(args):
+    """Read ``limit`` and ``cursor`` query args; raise ValueError if invalid."""
+    limit = args.get('limit', app.config['API_DEFAULT_PAGE_SIZE'])
+    cursor = args.get('cursor') or '0'
+    try:
+        limit, after_id = int(limit), int(cursor)
+    except ValueError:
+        raise ValueError('limit and cursor must be integers') from None
+    if not 1 <= limit <= app.config['API_MAX_PAGE_SIZE']:
+        raise ValueError(f"limit must be between 1 and {app.config['API_MAX_PAGE_SIZE']}")
+    if after_id < 0:
+        raise ValueError('cursor must not be negative')
+    if after_id > MAX_EXPENSE_ID:
+        raise ValueError(f'cursor must not exceed {MAX_EXPENSE_ID}')
+    return limit, after_id
+
+
+def _json_array(rows):
+    """Encode expenses as a JSON array from their cached fragments."""
+    return b'[' + b','.join([e.to_json() for e in rows]) + b']'
+
+
+def _json_response(body):
+    """Wrap encoded JSON bytes in a response, newline-terminated like ``jsonify``."""
+    return app.response_class(body + b'\n', mimetype='application/json')
+
+
+def _page_response(page, limit):
+    """Return one keyset page (fetched with one extra row) and its ``next_cursor``."""
+    next_cursor = str(page[limit - 1].id) if len(page) > limit else None
+    return _json_response(b'{"expenses":' + _json_array(page[:limit])
+                          + b',"next_cursor":' + json.dumps(next_cursor).encode() + b'}')
+
+
+def _stream_expenses(ndjson, batch_size):
+    """Yield every expense as encoded JSON, one keyset page at a time.
+    
+    Only one batch is materialized at a time, so memory stays flat however
+    many rows the store holds. Rows added or deleted mid-stream are seen or
+    skipped according to their id, as with cursor paging.
+    """
+    after_id, first = 0, True
+    if not ndjson:
+        yield b'['
+    while True:
+        batch = expenses.page(after_id, batch_size)
+        if not batch:
+            break
+        after_id = batch[-1].id
+        if ndjson:
+            chunk = b''.join([e.to_json() + b'\n' for e in batch])
+        else:
+            chunk = (b'' if first else b',') + b','.join([e.to_json() for e in batch])
+        first = False
+        yield chunk
+    if not ndjson:
+        yield b']'
+
+
+def _wants_stream():
+    """Return 'ndjson', 'json' or None for the requested /api/expenses mode."""
+    if request.accept_mimetypes.best == 'application/x-ndjson':
+        return 'ndjson'
+    if request.args.get('stream') in ('1', 'true'):
+        return 'json'
+    return None
+
+
 @app.route('/api/expenses', methods=['GET'])
+@conditional(variant=_wants_stream)
 def get_expenses_api():
-    """API endpoint to get all expenses as JSON."""
-    return jsonify([e.to_dict() for e in expenses])
+    """API endpoint to get expenses as JSON.
+    
+    With ``limit`` and/or ``cursor`` the response is one keyset page in id
+    order plus a ``next_cursor`` (null on the last page). ``from``/``to``
+    (or ``period``) return the expenses in that date range, in date order.
+    ``Accept: application/x-ndjson`` or ``?stream=1`` streams every expense
+    as NDJSON or a chunked JSON array; otherwise the full list is returned
+    as before.
+    """
+    try:
+        date_range = _parse_date_range(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if date_range is not None:
+        if 'limit' in request.args or 'cursor' in request.args:
+            return jsonify({'error': 'Date ranges cannot be combined with limit/cursor'}), 400
+        return _json_response(_json_array(expenses.date_range(*date_range)))
+    
+    if 'limit' not in request.args and 'cursor' not in request.args:
+        mode = _wants_stream()
+        if mode is None:
+            return _json_response(_json_array(expenses))
+        mimetype = 'application/x-ndjson' if mode == 'ndjson' else 'application/json'
+        return Response(_stream_expenses(mode == 'ndjson', app.config['API_STREAM_BATCH_SIZE']),
+                        mimetype=mimetype)
+    
+    try:
+        limit, after_id = _parse_page_args(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    # Fetch one extra row to learn whether another page follows.
+    return _page_response(expenses.page(after_id, limit + 1), limit)
+
+
+@app.route('/api/expenses/search', methods=['GET'])
+@conditional
+def search_expenses_api():
+    """API endpoint to search expense descriptions.
+    
+    ``q`` holds one or more words; an expense matches when every word
+    starts a word of its description (case-insensitive). ``category`` and
+    ``from``/``to`` (or ``period``) narrow the matches. Results are keyset
+    pages in id order, paged with ``limit``/``cursor`` like ``/api/expenses``.
+    """
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({'error': 'q is required'}), 400
+    try:
+        limit, after_id = _parse_page_args(request.args)
+        first, last = _parse_date_range(request.args) or (None, None)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    page = expenses.search(query, after_id, limit + 1, request.args.get('category') or None,
+                           first, last)
+    return _page_response(page, limit)
+
+
+def _bulk_rows():
+    """Return the rows of a bulk request body; raise ValueError if unreadable."""
+    if request.mimetype == 'text/csv':
+        # Decoded and headed like /api/expenses/import: BOM dropped, names normalized.
+        body = io.StringIO(request.get_data().decode('utf-8-sig'), newline='')
+        header = read_header(body.readline())
+        return list(csv.DictReader(body, fieldnames=header))
+    rows = request.get_json(silent=True)
+    if not isinstance(rows, list):
+        raise ValueError('Body must be a JSON array or CSV with a header row')
+    return rows
+
+
+def _validate_rows(rows):
+    """Validate raw rows; return (valid field tuples, per-row error dicts)."""
+    valid, errors = [], []
+    for index, row in enumerate(rows):
+        if not isinstance(row, dict):
+            errors.append({'row': index, 'error': 'Row must be an object!'})
+            continue
+        try:
+            valid.append(parse_expense_fields(row.get('amount'), row.get('category'),
+                                              row.get('description'), row.get('date')))
+        except ValueError as e:
+            errors.append({'row': index, 'error': str(e)})
+    return valid, errors
+
+
+def _create_expenses(valid):
+    """Create expenses for validated fields and add them as one change."""
+    new = new_expenses(valid)
+    if journal is not None:
+        return journal.add_many(expenses, new)
+    return expenses.add_many(new)
+
+
+EXPORT_COLUMNS = ('id', 'date', 'category', 'description', 'amount')
+
+
+def _export_csv(category, batch_size):
+    """Yield the expenses (optionally of one category) as CSV, a page at a time."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    after_id = 0
+    while True:
+        batch = expenses.page(after_id, batch_size, category)
+        if batch:
+            after_id = batch[-1].id
+            writer.writerows([(e.id, e.date, e.category, e.description, e.amount)
+                              for e in batch])
+        if buffer.tell():
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+        if not batch:
+            return
+
+
+@app.route('/api/expenses/export', methods=['GET'])
+def export_expenses_api():
+    """API endpoint to download expenses as CSV, streamed from the store.
+    
+    ``category`` filters like the index page and ``gzip=1`` compresses the
+    download; the dataset is never materialized in memory.
+    """
+    if request.args.get('format', 'csv') != 'csv':
+        return jsonify({'error': 'Unsupported export format; use format=csv'}), 400
+    category = request.args.get('category') or None
+    chunks = _export_csv(category, app.config['API_STREAM_BATCH_SIZE'])
+    filename = 'expenses.csv'
+    mimetype = 'text/csv'
+    if request.args.get('gzip') in ('1', 'true'):
+        chunks = compress_stream(chunks, 'gzip', app.config['COMPRESS_LEVEL'])
+        filename += '.gz'
+        mimetype = 'application/gzip'
+    response = Response(chunks, mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename={filename}'
+    return response
+
+
+@app.route('/api/expenses/bulk', methods=['POST'])
+def bulk_add_expenses_api():
+    """API endpoint to create many expenses from a JSON array or CSV body.
+    
+    Rows are validated with the same rules as ``/add``. If any row fails,
+    nothing is created and the errors are returned with 422, unless
+    ``?partial=1`` asks for the valid rows to be created anyway.
+    """
+    try:
+        rows = _bulk_rows()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if len(rows) > app.config['API_BULK_MAX_ROWS']:
+        return jsonify({'error': f"At most {app.config['API_BULK_MAX_ROWS']} rows per request"}), 413
+    
+    valid, errors = _validate_rows(rows)
+    if errors and request.args.get('partial') not in ('1', 'true'):
+        return jsonify({'created': 0, 'errors': errors}), 422
+    
+    try:
+        created = _create_expenses(valid)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 409
+    return jsonify({
+        'created': len(created),
+        'first_id': created[0].id if created else None,
+        'last_id': created[-1].id if created else None,
+        'errors': errors
+    }), 201
+
+
+@app.route('/api/expenses/import', methods=['POST'])
+def import_expenses_api():
+    """API endpoint to stream a large CSV body into the store.
+    
+    Unlike ``/bulk``, the body is never held in memory and valid rows are
+    kept even when others fail, including rows that are not UTF-8.
+    Rejected rows go to a file in ``IMPORT_REJECT_DIR`` when it is set; the
+    response lists the first errors and the reject file's path.
+    
+    An import that fails part way returns 500 with the counts so far and
+    the ``error``, since the rows created before it stay stored.
+    """
+    body = io.TextIOWrapper(request.stream, encoding='utf-8-sig', errors=UNDECODABLE,
+                            newline='')
+    reject_dir, reject_path, rejects = app.config['IMPORT_REJECT_DIR'], None, None
+    if reject_dir:
+        os.makedirs(reject_dir, exist_ok=True)
+        fd, reject_path = tempfile.mkstemp(prefix='rejects-', suffix='.csv', dir=reject_dir)
+        rejects = open(fd, 'w', encoding='utf-8', errors=UNDECODABLE, newline='')
+    stats, error = None, None
+    try:
+        stats = import_csv(body, expenses, journal, workers=app.config['IMPORT_WORKERS'],
+                           rejects=rejects)
+    except Exception as e:
+        # import_csv attaches its stats once rows may have been stored.
+        stats = getattr(e, 'stats', None)
+        if stats is None and not isinstance(e, ValueError):
+            raise
+        error = e
+    finally:
+        if rejects is not None:
+            rejects.close()
+            # Keep the file only when it holds rejected rows; a bad header
+            # must not leave an empty file behind.
+            if stats is None or not stats.rejected:
+                os.remove(reject_path)
+    if stats is None:
+        return jsonify({'error': str(error)}), 400
+    
+    result = stats.to_dict()
+    result['reject_file'] = reject_path if reject_path and stats.rejected else None
+    if error is not None:
+        app.logger.error('Import failed after %d rows were created', stats.created,
+                         exc_info=error)
+        result['error'] = str(error)
+        return jsonify(result), 500
+    return jsonify(result), 201
 
 
 @app.route('/api/summary', methods=['GET'])
+@conditional
 def get_summary_api():
-    """API endpoint to get expense summary by category."""
-    summary = {}
-    for expense in expenses:
-        if expense.category in summary:
-            summary[expense.category] += expense.amount
-        else:
-            summary[expense.category] = expense.amount
+    """API endpoint to get expense summary by category.
     
+    ``from``/``to`` or ``period`` (``this-month``, ``last-30-days``)
+    summarize only that date range, from the store's date index.
+    """
+    try:
+        date_range = _parse_date_range(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if date_range is None:
+        summary, count = expenses.category_totals(), len(expenses)
+    else:
+        summary, count = expenses.range_summary(*date_range)
     total = sum(summary.values())
     
-    return jsonify({
+    result = {
         'by_category': summary,
         'total': total,
-        'count': len(expenses)
-    })
+        'count': count
+    }
+    if date_range is not None:
+        result['from'], result['to'] = map(_iso, date_range)
+    return jsonify(result)
+
+
+@app.route('/api/summary/timeseries', methods=['GET'])
+@conditional
+def get_timeseries_api():
+    """API endpoint to get expense totals per day or month.
+    
+    ``granularity`` is ``day`` or ``month`` (the default). Each period with
+    expenses gets its total, count and per-category totals, read from the
+    store's rollups rather than re-aggregated from the rows. ``from``/``to``
+    (or ``period``) limit the series to the periods they touch, and
+    ``category`` to one category.
+    """
+    granularity = request.args.get('granularity', 'month')
+    if granularity not in GRANULARITIES:
+        return jsonify({'error': f"granularity must be one of: {', '.join(GRANULARITIES)}"}), 400
+    try:
+        date_range = _parse_date_range(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    category_filter = request.args.get('category') or None
+    
+    series = []
+    for period, category, count, total in expenses.rollup(granularity, *(date_range or ())):
+        if category_filter is not None and category != category_filter:
+            continue
+        if not series or series[-1]['period'] != period:
+            series.append({'period': period, 'total': 0, 'count': 0, 'by_category': {}})
+        point = series[-1]
+        point['total'] += total
+        point['count'] += count
+        point['by_category'][category] = total
+    
+    result = {'granularity': granularity, 'series': series}
+    if date_range is not None:
+        result['from'], result['to'] = map(_iso, date_range)
+    return jsonify(result)
+
+
+@app.route('/api/analytics', methods=['GET'])
+@conditional
+def get_analytics_api():
+    """API endpoint to get per-category statistics and month-over-month deltas.
+    
+    Mean, median, p90/p99 and standard deviation per category, plus each
+    category's monthly totals and their changes, computed over flat
+    amount/category/date columns (vectorized when NumPy is installed).
+    ``from``/``to`` or ``period`` limit the rows analyzed.
+    """
+    try:
+        date_range = _parse_date_range(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    result = analyze(columns(expenses), *(date_range or ()))
+    if date_range is not None:
+        result['from'], result['to'] = map(_iso, date_range)
+    return jsonify(result)
+
+
+@app.route('/api/cache/stats', methods=['GET'])
+def get_cache_stats_api():
+    """API endpoint to get render cache size, hit rate and render times.
+    
+    The compressed-body cache reports the same figures under ``compression``.
+    """
+    stats = render_cache.stats()
+    stats['compression'] = compressed_cache.stats()
+    return jsonify(stats)
+
+
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    """Prometheus endpoint for request and store metrics.
+    
+    Per-route request counts by status, latency and response-size
+    histograms, and the store's row count and version.
+    """
+    body = metrics.render([
+        ('expense_store_rows', 'Expenses currently stored.', len(expenses)),
+        ('expense_store_version', 'Committed store mutations.', expenses.version),
+    ])
+    return Response(body, content_type='text/plain; version=0.0.4; charset=utf-8')
 
 
 @app.route('/clear', methods=['POST'])
 def clear_expenses():
-    """Clear all expenses (useful for testing)."""
-    global expenses, next_id
-    expenses[:] = []  # Clear in place instead of reassigning
-    next_id = 1
+    """Clear all expenses (useful for testing).
+    
+    Ids are not reset: a request that allocated its id before the clear
+    may still add it afterwards, and a reused id would then collide.
+    """
+    with expenses.lock:
+        if journal is not None:
+            journal.clear(expenses)
+        else:
+            expenses.clear()
     flash('All expenses cleared!', 'success')
     return redirect(url_for('index'))
 
@@ -0,0 +1,175 @@
+"""
+Expense Tracker ASGI Entry Point
+Serves the Flask app from an asyncio event loop, for example with
+``uvicorn asgi:app``. Views run unchanged, with the same store and
+validation, in a thread pool; the event loop does all client I/O, so slow
+clients reading large or streamed bodies hold no thread while they wait.
+"""
+
+import asyncio
+import contextvars
+import io
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from app import app as flask_app
+
+# Large bodies are sent in slices so one response never fills the
+# transport buffer with the whole payload at once.
+SEND_CHUNK = 256 * 1024
+
+executor = ThreadPoolExecutor(flask_app.config['ASGI_THREADS'], thread_name_prefix='expense-asgi')
+# Streamed bodies are produced on their own smaller pool, so requests never
+# queue behind the chunks of every open stream.
+stream_executor = ThreadPoolExecutor(flask_app.config['ASGI_STREAM_THREADS'],
+                                     thread_name_prefix='expense-asgi-stream')
+
+_DONE = object()
+
+
+class _ReceiveStream(io.RawIOBase):
+    """Request body for ``wsgi.input``, pulled from ASGI ``receive`` on demand.
+
+    Read from a pool thread, so uploads stream into views such as
+    ``/api/expenses/import`` without being buffered first.
+    """
+
+    def __init__(self, receive, loop):
+        self._receive = receive
+        self._loop = loop
+        self._buffer = b''
+        self.finished = False
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        while not self._buffer and not self.finished:
+            message = asyncio.run_coroutine_threadsafe(self._receive(), self._loop).result()
+            if message['type'] == 'http.disconnect':
+                raise OSError('Client disconnected')
+            self._buffer = message.get('body', b'')
+            self.finished = not message.get('more_body', False)
+        size = min(len(b), len(self._buffer))
+        b[:size] = self._buffer[:size]
+        self._buffer = self._buffer[size:]
+        return size
+
+
+def _environ(scope, body):
+    """Build a WSGI environ for an ASGI HTTP scope."""
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': client[0],
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BufferedReader(body),
+        # The body ends when receive says so, with or without Content-Length.
+        'wsgi.input_terminated': True,
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+    }
+    for name, value in scope.get('headers', ()):
+        name, value = name.decode('latin-1').upper().replace('-', '_'), value.decode('latin-1')
+        if name in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+            environ[name] = value
+            continue
+        key = f'HTTP_{name}'
+        environ[key] = f'{environ[key]},{value}' if key in environ else value
+    return environ
+
+
+def _call_view(context, environ):
+    """Run the Flask app in a pool thread; return ``(status, headers, body)``."""
+    started = []
+
+    def start_response(status, headers, exc_info=None):
+        started[:] = [status, headers]
+
+    body = context.run(flask_app, environ, start_response)
+    return started[0], started[1], body
+
+
+async def _watch_disconnect(receive, disconnected):
+    while (await receive())['type'] != 'http.disconnect':
+        pass
+    disconnected.set()
+
+
+async def _serve_http(scope, receive, send):
+    loop = asyncio.get_running_loop()
+    # One context per request, so context variables set by the view stay
+    # visible while its body is produced on other pool threads.
+    context = contextvars.copy_context()
+    request_body = _ReceiveStream(receive, loop)
+    status, headers, body = await loop.run_in_executor(
+        executor, _call_view, context, _environ(scope, request_body))
+
+    disconnected = asyncio.Event()
+    watcher = None
+    if request_body.finished or scope['method'] in ('GET', 'HEAD'):
+        watcher = asyncio.ensure_future(_watch_disconnect(receive, disconnected))
+    try:
+        await send({
+            'type': 'http.response.start',
+            'status': int(status.split(' ', 1)[0]),
+            'headers': [(name.lower().encode('latin-1'), value.encode('latin-1'))
+                        for name, value in headers],
+        })
+        # Werkzeug sets Content-Length only for bodies already in memory.
+        # Streamed bodies (NDJSON, CSV exports) are generators that run view
+        # code per chunk, so each chunk is produced in the stream pool.
+        streamed = not any(name.lower() == 'content-length' for name, _ in headers)
+        chunks = iter(body)
+        while not disconnected.is_set():
+            if streamed:
+                chunk = await loop.run_in_executor(stream_executor, context.run, next, chunks,
+                                                   _DONE)
+            else:
+                chunk = next(chunks, _DONE)
+            if chunk is _DONE:
+                break
+            for start in range(0, len(chunk), SEND_CHUNK):
+                await send({'type': 'http.response.body',
+                            'body': bytes(chunk[start:start + SEND_CHUNK]),
+                            'more_body': True})
+                if disconnected.is_set():
+                    break
+        if not disconnected.is_set():
+            await send({'type': 'http.response.body', 'body': b'', 'more_body': False})
+    finally:
+        if watcher is not None:
+            watcher.cancel()
+        close = getattr(body, 'close', None)
+        if close is not None:
+            await loop.run_in_executor(executor, context.run, close)
+
+
+async def _serve_lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def app(scope, receive, send):
+    """ASGI application serving every route of the Flask app."""
+    if scope['type'] == 'http':
+        await _serve_http(scope, receive, send)
+    elif scope['type'] == 'lifespan':
+        await _serve_lifespan(receive, send)
+    else:
+        raise ValueError(f"Unsupported ASGI scope type: {scope['type']}")
@@ -0,0 +1,4 @@
+"""
+Benchmarks Package
+Performance measurements for the Expense Tracker application.
+"""
@@ -0,0 +1,51 @@
+"""
+Analytics Benchmark
+Times the NumPy and pure-Python analytics backends, and reading the
+columns out of each store, at several sizes.
+Run with: python -m benchmarks.bench_analytics [--rows 10000 100000 1000000]
+"""
+
+import argparse
+import time
+
+import analytics
+from analytics import analyze, columns
+from benchmarks.bench_memory import sample_rows
+from models import Expense
+from store import ColumnarExpenseStore, ExpenseStore
+
+
+def timed(fn, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    args = parser.parse_args()
+    if analytics.np is None:
+        parser.error('NumPy is not installed; only the Python backend is available')
+
+    for count in args.rows:
+        print(f'{count:,} expenses')
+        for store_class in (ExpenseStore, ColumnarExpenseStore):
+            store = store_class()
+            store.add_many(Expense(amount, category, description, day, expense_id=expense_id)
+                           for amount, category, description, day, expense_id
+                           in sample_rows(count))
+            read, cols = timed(lambda: columns(store))
+            vectorized, fast = timed(lambda: analyze(cols, use_numpy=True))
+            looped, slow = timed(lambda: analyze(cols, use_numpy=False))
+            assert fast['count'] == slow['count'] == count
+            print(f'  {store_class.__name__:<21} columns {read * 1000:8.1f} ms   '
+                  f'numpy {vectorized * 1000:7.1f} ms   python {looped * 1000:8.1f} ms   '
+                  f'speedup {looped / vectorized:5.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+"""
+ASGI Slow-Client Benchmark
+Runs many slow clients streaming /api/expenses through the ASGI entry
+point while timing fast /api/summary requests, and reports how many threads
+it took. A threaded WSGI server needs one thread per slow client.
+Run with: python -m benchmarks.bench_asgi [--rows N] [--slow N] [--delay MS]
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+import asgi
+from app import expenses
+from benchmarks.bench_memory import sample_rows
+from models import Expense
+
+
+def scope(path, query=b''):
+    return {'type': 'http', 'method': 'GET', 'path': path, 'query_string': query,
+            'headers': [], 'http_version': '1.1', 'scheme': 'http',
+            'server': ('bench', 80), 'client': ('127.0.0.1', 1), 'root_path': ''}
+
+
+async def request(path, query=b'', delay=0.0):
+    """Run one request; ``delay`` is how long the client takes to read each message."""
+    pending = [{'type': 'http.request', 'body': b'', 'more_body': False}]
+    size = 0
+
+    async def receive():
+        if pending:
+            return pending.pop()
+        await asyncio.Event().wait()
+
+    async def send(message):
+        nonlocal size
+        size += len(message.get('body', b''))
+        if delay:
+            await asyncio.sleep(delay)
+
+    await asgi.app(scope(path, query), receive, send)
+    return size
+
+
+async def scenario(slow_count, delay, fast_count):
+    slow = [asyncio.ensure_future(request('/api/expenses', b'stream=1', delay))
+            for _ in range(slow_count)]
+    await asyncio.sleep(0.1)  # Let the slow streams get going
+    latencies = []
+    for _ in range(fast_count):
+        started = time.perf_counter()
+        await request('/api/summary')
+        latencies.append(time.perf_counter() - started)
+    still_streaming = sum(not task.done() for task in slow)
+    sizes = await asyncio.gather(*slow)
+    return latencies, still_streaming, sizes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=20_000)
+    parser.add_argument('--slow', type=int, default=200)
+    parser.add_argument('--delay', type=float, default=20, help='ms per message read')
+    parser.add_argument('--fast', type=int, default=100)
+    args = parser.parse_args()
+
+    expenses.clear()
+    expenses.add_many(Expense(amount, category, description, day, expense_id=expense_id)
+                      for amount, category, description, day, expense_id
+                      in sample_rows(args.rows))
+    started = time.perf_counter()
+    latencies, streaming, sizes = asyncio.run(
+        scenario(args.slow, args.delay / 1000, args.fast))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    print(f'{args.slow} slow clients streaming {args.rows:,} rows '
+          f'({sizes[0] / 2**20:.1f} MiB each, {args.delay:g} ms per message)')
+    print(f'  /api/summary while streaming: p50 {statistics.median(latencies) * 1000:.2f} ms   '
+          f'p99 {latencies[int(len(latencies) * 0.99) - 1] * 1000:.2f} ms   '
+          f'({streaming} slow clients still reading)')
+    print(f'  threads used: {len(asgi.executor._threads)} view + '
+          f'{len(asgi.stream_executor._threads)} stream   total {elapsed:.1f} s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""
+Bulk Create Benchmark
+Measures rows/s for POST /api/expenses/bulk with JSON and CSV bodies,
+compared with one form POST to /add (plus its redirect) per row. With
+--existing N, each batch goes into a store already holding N rows dated
+after it, as with an import of historical bank statements.
+Run with: python -m benchmarks.bench_bulk [--rows N] [--existing N] [--store KIND]
+"""
+
+import argparse
+import csv
+import io
+import json
+import os
+import time
+from datetime import date, timedelta
+
+from benchmarks.bench_memory import sample_rows
+
+
+def bodies(count):
+    rows = [{'amount': f'{amount:.2f}', 'category': category, 'description': description,
+             'date': day}
+            for amount, category, description, day, _ in sample_rows(count)]
+    out = io.StringIO()
+    writer = csv.DictWriter(out, fieldnames=['amount', 'category', 'description', 'date'])
+    writer.writeheader()
+    writer.writerows(rows)
+    return rows, json.dumps(rows), out.getvalue()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=100_000)
+    parser.add_argument('--form-rows', type=int, default=1_000,
+                        help='rows to POST to /add one by one (0 to skip)')
+    parser.add_argument('--existing', type=int, default=0,
+                        help='rows already stored, dated after the batch')
+    parser.add_argument('--store', default='memory')
+    args = parser.parse_args()
+
+    os.environ['EXPENSE_STORE'] = args.store
+    from app import app, expenses
+    from models import Expense, advance_ids
+
+    def load():
+        expenses.clear()
+        later = date(2025, 1, 1)
+        expenses.add_many(Expense(amount, category, description,
+                                  (later + timedelta(days=expense_id % 365)).isoformat(),
+                                  expense_id=expense_id)
+                          for amount, category, description, _, expense_id
+                          in sample_rows(args.existing))
+        advance_ids(args.existing)
+        # Build lazily built indexes now, as a running server would have.
+        expenses.date_range(None, None)
+
+    rows, json_body, csv_body = bodies(args.rows)
+    client = app.test_client()
+    print(f'Bulk create of {args.rows:,} rows into the {args.store} store'
+          f' holding {args.existing:,} later rows')
+    for name, body, content_type in (('JSON array', json_body, 'application/json'),
+                                     ('CSV', csv_body, 'text/csv')):
+        load()
+        started = time.perf_counter()
+        response = client.post('/api/expenses/bulk', data=body, content_type=content_type)
+        elapsed = time.perf_counter() - started
+        assert response.status_code == 201, response.data[:200]
+        print(f'  {name:<11} {elapsed * 1000:8.1f} ms   {args.rows / elapsed:10,.0f} rows/s')
+
+    if not args.form_rows:
+        return
+    load()
+    started = time.perf_counter()
+    for row in rows[:args.form_rows]:
+        client.post('/add', data=row, follow_redirects=True)
+    elapsed = time.perf_counter() - started
+    print(f'  {"POST /add":<11} {elapsed * 1000:8.1f} ms   {args.form_rows / elapsed:10,.0f} rows/s'
+          f'   ({args.form_rows:,} rows)')
+
+
+if __name__ == '__main__':
+    main()
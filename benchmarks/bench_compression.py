@@ -0,0 +1,86 @@
+"""
+Compression Benchmark
+Reports the CPU-versus-bytes trade-off of each encoding and level on real
+API payloads, and requests/sec for a large /api/expenses poll sent plain,
+compressed on every request and served from the compressed-body cache.
+Run with: python -m benchmarks.bench_compression [--rows N]
+"""
+
+import argparse
+import time
+import zlib
+
+from benchmarks.bench_memory import sample_rows
+from compression import brotli
+
+PAYLOADS = {
+    'JSON list': ('/api/expenses', {}),
+    'JSON page of 100': ('/api/expenses?limit=100', {}),
+    'NDJSON stream': ('/api/expenses', {'Accept': 'application/x-ndjson'}),
+    'CSV export': ('/api/expenses/export?format=csv', {}),
+}
+
+
+def codecs():
+    """Return (label, compress function) pairs to compare."""
+    def zlib_codec(wbits, level):
+        def run(data):
+            compressor = zlib.compressobj(level, zlib.DEFLATED, wbits)
+            return compressor.compress(data) + compressor.flush()
+        return run
+
+    pairs = [(f'gzip -{level}', zlib_codec(31, level)) for level in (1, 6, 9)]
+    pairs.append(('deflate -6', zlib_codec(15, 6)))
+    if brotli is not None:
+        pairs += [(f'br q{quality}', lambda data, q=quality: brotli.compress(data, quality=q))
+                  for quality in (1, 5, 9, 11)]
+    return pairs
+
+
+def best_time(fn, budget=0.5):
+    best, deadline = float('inf'), time.perf_counter() + budget
+    while best == float('inf') or time.perf_counter() < deadline:
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=10_000)
+    args = parser.parse_args()
+
+    from app import app, compressed_cache, expenses
+    from models import Expense
+
+    for amount, category, description, day, expense_id in sample_rows(args.rows):
+        expenses.add(Expense(amount, category, description, day, expense_id=expense_id))
+    client = app.test_client()
+
+    print(f'Compression of API payloads at {args.rows:,} expenses')
+    for name, (path, headers) in PAYLOADS.items():
+        body = client.get(path, headers=headers).get_data()
+        print(f'  {name}: {len(body) / 1024:,.1f} KiB')
+        for label, run in codecs():
+            elapsed = best_time(lambda: run(body))
+            size = len(run(body))
+            print(f'    {label:<11} {size / 1024:9,.1f} KiB  {len(body) / size:5.1f}x'
+                  f'  {elapsed * 1000:8.2f} ms  {len(body) / elapsed / 2**20:7.1f} MB/s')
+
+    print('GET /api/expenses, requests/sec (best)')
+    gzip_headers = {'Accept-Encoding': 'gzip'}
+    plain = best_time(lambda: client.get('/api/expenses').get_data())
+
+    def recompress():
+        compressed_cache.clear()
+        client.get('/api/expenses', headers=gzip_headers).get_data()
+    uncached = best_time(recompress)
+    cached = best_time(lambda: client.get('/api/expenses', headers=gzip_headers).get_data())
+    for label, elapsed in (('uncompressed', plain), ('gzip, compressed each time', uncached),
+                           ('gzip, from cache', cached)):
+        print(f'  {label:<27} {1 / elapsed:9.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+"""
+Date Range Benchmark
+Times 1-day and 30-day date_range queries and range summaries against
+filtering every row by its date string, for the in-memory stores.
+Run with: python -m benchmarks.bench_date_range [--rows N]
+"""
+
+import argparse
+import time
+from datetime import date
+
+from benchmarks.bench_memory import sample_rows
+from models import Expense
+from store import ColumnarExpenseStore, ExpenseStore
+
+
+def timed(fn, repeat=5):
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    windows = {'1 day': (date(2024, 6, 1), date(2024, 6, 1)),
+               '30 days': (date(2024, 6, 1), date(2024, 6, 30))}
+    print(f'Date ranges over {args.rows:,} expenses spread across one year')
+    for store_class in (ExpenseStore, ColumnarExpenseStore):
+        store = store_class()
+        store.add_many(Expense(amount, category, description, day, expense_id=expense_id)
+                       for amount, category, description, day, expense_id
+                       in sample_rows(args.rows))
+        store.date_range(0, 0)  # Build the columnar index outside the timings
+        for name, (first, last) in windows.items():
+            low, high = first.isoformat(), last.isoformat()
+            scan, rows = timed(lambda: [e for e in store if low <= e.date <= high], repeat=1)
+            indexed, found = timed(lambda: store.date_range(first.toordinal(), last.toordinal()))
+            summary, _ = timed(lambda: store.range_summary(first.toordinal(), last.toordinal()))
+            assert len(found) == len(rows)
+            print(f'  {store_class.__name__:<21} {name:<8} full scan {scan * 1000:7.1f} ms   '
+                  f'date_range {indexed * 1000:6.1f} ms   range_summary {summary * 1000:6.1f} ms'
+                  f'   ({len(found):,} rows)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+"""
+CSV Import Benchmark
+Streams a generated CSV file through importer.import_csv and reports
+throughput and peak RSS growth, in-process and with a parsing pool. Each
+run uses a fresh interpreter because peak RSS never goes down.
+Run with: python -m benchmarks.bench_import [--rows N] [--workers N ...]
+"""
+
+import argparse
+import csv
+import os
+import subprocess
+import sys
+import tempfile
+
+from benchmarks.bench_memory import sample_rows
+from benchmarks.bench_streaming import peak_rss_mb
+
+
+def write_csv(path, count):
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['amount', 'category', 'description', 'date'])
+        for amount, category, description, day, _ in sample_rows(count):
+            writer.writerow([f'{amount:.2f}', category, description, day])
+
+
+def run_import(path, workers, store_kind):
+    from importer import import_csv
+    from store import create_store
+
+    store = create_store(store_kind)
+    baseline = peak_rss_mb()
+    with open(path, encoding='utf-8', newline='') as f:
+        stats = import_csv(f, store, workers=workers)
+    print(f'{stats.elapsed:.3f} {stats.created} {baseline:.1f} {peak_rss_mb():.1f}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--workers', type=int, nargs='+', default=[0, 2, 4])
+    parser.add_argument('--store', default='columnar')
+    parser.add_argument('--run', nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        run_import(args.run[0], int(args.run[1]), args.store)
+        return
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'expenses.csv')
+        write_csv(path, args.rows)
+        size = os.path.getsize(path) / 2**20
+        print(f'Import of {args.rows:,} rows ({size:.1f} MB CSV) into the {args.store} store')
+        for workers in args.workers:
+            output = subprocess.run(
+                [sys.executable, '-m', 'benchmarks.bench_import', '--store', args.store,
+                 '--run', path, str(workers)],
+                check=True, capture_output=True, text=True).stdout.split()
+            elapsed, created = float(output[0]), int(output[1])
+            growth = float(output[3]) - float(output[2])
+            print(f'  workers={workers:<2} {elapsed:7.2f} s   {created / elapsed:10,.0f} rows/s'
+                  f'   peak RSS growth {growth:7.1f} MB')
+
+
+if __name__ == '__main__':
+    main()
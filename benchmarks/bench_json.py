@@ -0,0 +1,98 @@
+"""
+JSON Response Benchmark
+Requests per second for /api/expenses built from cached per-row JSON
+fragments against the previous to_dict() + jsonify() encoding, and for
+jsonify() routes with the orjson provider against the standard library.
+Run with: python -m benchmarks.bench_json [--rows N ...] [--store memory|columnar]
+"""
+
+import argparse
+import os
+import time
+from unittest import mock
+
+from flask import request
+from flask.json.provider import DefaultJSONProvider
+
+from benchmarks.bench_memory import sample_rows
+
+PATHS = {
+    'full list': '/api/expenses',
+    'page of 100': '/api/expenses?limit=100&cursor={middle}',
+}
+# Routes answered by jsonify(), so their cost is the JSON provider's.
+PROVIDER_PATHS = {
+    'daily timeseries': '/api/summary/timeseries?granularity=day',
+    'analytics': '/api/analytics',
+}
+
+
+def load(expenses, rows):
+    """Refill the store with fresh expenses, so no row has a cached encoding."""
+    from models import Expense
+
+    expenses.clear()
+    for amount, category, description, day, expense_id in sample_rows(rows):
+        expenses.add(Expense(amount, category, description, day, expense_id=expense_id))
+
+
+def requests_per_second(client, path, budget=1.0):
+    """Return (first request rps, best rps) for repeated GETs of ``path``."""
+    timings = []
+    deadline = time.perf_counter() + budget
+    while len(timings) < 3 or time.perf_counter() < deadline:
+        started = time.perf_counter()
+        response = client.get(path)
+        response.get_data()
+        timings.append(time.perf_counter() - started)
+        assert response.status_code == 200
+    return 1 / timings[0], 1 / min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, nargs='+', default=[10_000, 100_000])
+    parser.add_argument('--store', choices=('memory', 'columnar'), default='memory')
+    args = parser.parse_args()
+    os.environ['EXPENSE_STORE'] = args.store
+
+    import fast_json
+    from app import app, expenses
+
+    legacy = DefaultJSONProvider(app)
+
+    @app.route('/bench/legacy')
+    def legacy_expenses():
+        # The view as it was: every row through to_dict() and json.dumps().
+        if 'limit' in request.args:
+            limit, after_id = int(request.args['limit']), int(request.args['cursor'])
+            page = expenses.page(after_id, limit + 1)
+            next_cursor = str(page[limit - 1].id) if len(page) > limit else None
+            return legacy.response({'expenses': [e.to_dict() for e in page[:limit]],
+                                    'next_cursor': next_cursor})
+        return legacy.response([e.to_dict() for e in expenses])
+
+    client = app.test_client()
+    print(f'{args.store} store; requests/sec (first request, best)')
+    for rows in args.rows:
+        load(expenses, rows)
+        print(f'  {rows:>9,} rows')
+        for name, path in PATHS.items():
+            path = path.format(middle=rows // 2)
+            first, best = requests_per_second(client, path.replace('/api/expenses', '/bench/legacy'))
+            print(f'    {name:<17} to_dict + jsonify {first:9.1f} {best:9.1f}')
+            load(expenses, rows)
+            first, best = requests_per_second(client, path)
+            print(f'    {name:<17} cached fragments  {first:9.1f} {best:9.1f}')
+        for name, path in PROVIDER_PATHS.items():
+            encoders = [('stdlib', None)]
+            if fast_json.orjson is not None:
+                encoders.append(('orjson', fast_json.orjson))
+            for label, encoder in encoders:
+                with mock.patch.object(fast_json, 'orjson', encoder):
+                    first, best = requests_per_second(client, path)
+                print(f'    {name:<17} {label:<17} {first:9.1f} {best:9.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+"""
+Memory Benchmark
+Measures bytes per expense with tracemalloc for each storage layout.
+Run with: python -m benchmarks.bench_memory [--rows N]
+"""
+
+import argparse
+import tracemalloc
+from datetime import date, timedelta
+
+from models import CATEGORIES, Expense
+from store import ColumnarExpenseStore, ExpenseStore
+
+
+class LegacyExpense:
+    """The original ``__dict__``-based Expense, kept as the baseline."""
+
+    def __init__(self, amount, category, description, date, expense_id):
+        self.id = expense_id
+        self.amount = float(amount)
+        self.category = category
+        self.description = description
+        self.date = date
+
+
+def sample_rows(count):
+    """Yield (amount, category, description, date, id) tuples."""
+    start = date(2024, 1, 1)
+    for i in range(count):
+        yield (
+            (i % 500) + 0.99,
+            CATEGORIES[i % len(CATEGORIES)],
+            f'Expense number {i}',
+            (start + timedelta(days=i % 365)).isoformat(),
+            i + 1,
+        )
+
+
+def build_legacy_list(count):
+    return [LegacyExpense(*row) for row in sample_rows(count)]
+
+
+def build_slots_store(count):
+    store = ExpenseStore()
+    for amount, category, description, day, expense_id in sample_rows(count):
+        store.add(Expense(amount, category, description, day, expense_id=expense_id))
+    return store
+
+
+def build_columnar_store(count):
+    store = ColumnarExpenseStore()
+    for amount, category, description, day, expense_id in sample_rows(count):
+        store.add(Expense(amount, category, description, day, expense_id=expense_id))
+    return store
+
+
+LAYOUTS = [
+    ('legacy list (__dict__)', build_legacy_list),
+    ('ExpenseStore (__slots__)', build_slots_store),
+    ('ColumnarExpenseStore', build_columnar_store),
+]
+
+
+def measure(builder, count):
+    """Return retained bytes per row for a store built by ``builder``."""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    data = builder(count)
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del data
+    return (after - before) / count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=100_000)
+    args = parser.parse_args()
+
+    print(f'Bytes per expense at {args.rows:,} rows (tracemalloc)')
+    for name, builder in LAYOUTS:
+        print(f'  {name:<28} {measure(builder, args.rows):8.1f}')
+
+
+if __name__ == '__main__':
+    main()
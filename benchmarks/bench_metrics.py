@@ -0,0 +1,113 @@
+"""
+Metrics Overhead Benchmark
+Measures what request metrics add to each request: requests/sec per route
+with and without the timed request class and metrics recording, in rounds
+whose order alternates to cancel drift, and the instrumentation's own cost
+in microseconds.
+Run with: python -m benchmarks.bench_metrics [--rows N] [--rounds N] [--requests N]
+"""
+
+import argparse
+import statistics
+import time
+
+from werkzeug.test import EnvironBuilder
+
+from benchmarks.bench_memory import sample_rows
+
+ROUTES = {
+    'index': ('GET', '/?category=Shopping'),
+    'get_expenses_api': ('GET', '/api/expenses?limit=50'),
+    'get_summary_api': ('GET', '/api/summary'),
+    'add_expense': ('POST', '/add'),
+}
+FORM = {'amount': '3.50', 'category': 'Other', 'description': 'Benchmark'}
+
+
+def start_response(status, headers, exc_info=None):
+    pass
+
+
+def run_round(app, method, path, requests):
+    """Return requests/sec for ``requests`` WSGI calls of one route.
+
+    Calling ``app.wsgi_app`` directly leaves out the test client, whose own
+    cost varies more than the instrumentation being measured.
+    """
+    data = FORM if method == 'POST' else None
+    environs = [EnvironBuilder(path=path, method=method, data=data).get_environ()
+                for _ in range(requests)]
+    started = time.perf_counter()
+    for environ in environs:
+        body = app.wsgi_app(environ, start_response)
+        b''.join(body)
+        body.close()
+    return requests / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=1000)
+    parser.add_argument('--rounds', type=int, default=21)
+    parser.add_argument('--requests', type=int, default=2000)
+    args = parser.parse_args()
+
+    from flask import Request
+
+    from app import (TimedRequest, app, compress_response, expenses, finish_response, metrics,
+                     record_request_metrics)
+    from models import Expense, advance_ids, reset_ids
+
+    rows = list(sample_rows(args.rows))
+
+    def reset_store():
+        # Every round starts from the same rows, however many /add created.
+        expenses.clear()
+        reset_ids()
+        for amount, category, description, day, expense_id in rows:
+            expenses.add(Expense(amount, category, description, day, expense_id=expense_id))
+        advance_ids(args.rows)
+
+    def instrumented(enabled):
+        # Without metrics the after-request hook only compresses.
+        app.request_class = TimedRequest if enabled else Request
+        app.after_request_funcs[None] = [finish_response if enabled else compress_response]
+
+    print(f'Requests/sec through app.wsgi_app (median of {args.rounds} alternating rounds)')
+    for name, (method, path) in ROUTES.items():
+        rates = {True: [], False: []}
+        for round_number in range(args.rounds):
+            for enabled in ((False, True) if round_number % 2 else (True, False)):
+                reset_store()
+                instrumented(enabled)
+                rates[enabled].append(run_round(app, method, path, args.requests))
+        off, on = statistics.median(rates[False]), statistics.median(rates[True])
+        added = 1 / on - 1 / off
+        print(f'  {name:<17} without {off:8.0f}   with {on:8.0f}   {added * 1e6:+5.1f} us'
+              f'   {(off - on) / off:6.2%} of this route, {added / 200e-6:6.2%} at 5,000 req/s')
+    instrumented(True)
+
+    # The instrumentation alone: building the request and recording it.
+    environ = EnvironBuilder(path='/api/summary').get_environ()
+    response = app.response_class(b'x' * 100)
+    repeat = 200_000
+    costs = {}
+    for request_class in (Request, TimedRequest):
+        with app.request_context(environ):
+            started = time.perf_counter()
+            for _ in range(repeat):
+                request_class(environ)
+            costs[request_class] = (time.perf_counter() - started) / repeat
+    with app.request_context(environ):
+        started = time.perf_counter()
+        for _ in range(repeat):
+            record_request_metrics(response)
+        per_request = (time.perf_counter() - started) / repeat
+    per_request += costs[TimedRequest] - costs[Request]
+    print(f'Instrumentation cost {per_request * 1e6:.2f} us per request; at 5,000 req/s '
+          f'(200 us each) that is {per_request / 200e-6:.2%}')
+    metrics.reset()
+
+
+if __name__ == '__main__':
+    main()
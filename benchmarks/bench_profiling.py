@@ -0,0 +1,80 @@
+"""
+Profiling Benchmark
+Measures what the request profiler costs: requests/sec for unflagged
+requests with no profiler installed and with one installed, and for
+flagged requests saved to a directory or returned as a report.
+Run with: python -m benchmarks.bench_profiling [--rows N] [--rounds N] [--requests N]
+"""
+
+import argparse
+import shutil
+import statistics
+import tempfile
+import time
+
+from werkzeug.test import EnvironBuilder
+
+from benchmarks.bench_memory import sample_rows
+
+PATH = '/api/summary'
+
+
+def start_response(status, headers, exc_info=None):
+    pass
+
+
+def run_round(wsgi_app, headers, requests):
+    """Return requests/sec for ``requests`` calls of ``wsgi_app``."""
+    environs = [EnvironBuilder(path=PATH, headers=headers).get_environ()
+                for _ in range(requests)]
+    started = time.perf_counter()
+    for environ in environs:
+        body = wsgi_app(environ, start_response)
+        b''.join(body)
+        if hasattr(body, 'close'):
+            body.close()
+    return requests / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=1000)
+    parser.add_argument('--rounds', type=int, default=21)
+    parser.add_argument('--requests', type=int, default=2000)
+    args = parser.parse_args()
+
+    from app import app, expenses
+    from models import Expense
+    from profiling import RequestProfiler
+
+    for amount, category, description, day, expense_id in sample_rows(args.rows):
+        expenses.add(Expense(amount, category, description, day, expense_id=expense_id))
+    directory = tempfile.mkdtemp()
+    plain = app.wsgi_app
+    installed = RequestProfiler(plain, app.url_map, expenses, header='X-Profile')
+    to_directory = RequestProfiler(plain, app.url_map, expenses, header='X-Profile',
+                                   directory=directory)
+    flagged = {'X-Profile': '1'}
+
+    try:
+        print(f'GET {PATH}, requests/sec (median of {args.rounds} alternating rounds)')
+        rates = {'none': [], 'installed': []}
+        for round_number in range(args.rounds):
+            for name in (('none', 'installed') if round_number % 2 else ('installed', 'none')):
+                wsgi_app = plain if name == 'none' else installed
+                rates[name].append(run_round(wsgi_app, {}, args.requests))
+        off, on = statistics.median(rates['none']), statistics.median(rates['installed'])
+        print(f'  unflagged, no profiler      {off:9.0f}')
+        print(f'  unflagged, header mode      {on:9.0f}   {(1 / on - 1 / off) * 1e6:+.2f} us')
+
+        profiled = max(args.requests // 20, 1)
+        for label, wsgi_app in (('flagged, report attachment', installed),
+                                ('flagged, saved to directory', to_directory)):
+            rate = statistics.median(run_round(wsgi_app, flagged, profiled) for _ in range(5))
+            print(f'  {label:<27} {rate:9.0f}   {1e6 / rate:8.0f} us per request')
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
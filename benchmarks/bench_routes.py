@@ -0,0 +1,278 @@
+"""
+Route Benchmark Suite
+Drives every route in app.py through the Flask test client at several
+dataset sizes and records ops/sec, p50/p99 latency and peak memory per
+request as JSON. With --baseline, the run is compared against a saved one
+and any regression beyond the tolerances makes it exit with status 1.
+Run with: python -m benchmarks.bench_routes [--sizes N ...] [--routes NAME ...]
+          [--store memory|columnar|sqlite] [--output FILE] [--baseline FILE]
+"""
+
+import argparse
+import csv
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from urllib.parse import urlencode
+
+from benchmarks.bench_memory import sample_rows
+from models import CATEGORIES
+
+SIZES = [0, 1_000, 10_000, 100_000, 1_000_000]
+FORM = {'amount': '3.50', 'category': 'Other', 'description': 'Benchmark', 'date': '2024-06-01'}
+BATCH_ROWS = 100
+# Ids of the rows added for /delete to remove, clear of the dataset's ids
+DELETE_ID = 10**9
+# A category sample_rows fills, so the narrowed index renders real rows
+CATEGORY_QUERY = urlencode({'category': CATEGORIES[0]})
+
+# name: (endpoint, method, path, body). ``{id}`` in a path is DELETE_ID plus
+# the request's 1-based number.
+ROUTES = {
+    'index': ('index', 'GET', '/', None),
+    'index?category': ('index', 'GET', f'/?{CATEGORY_QUERY}', None),
+    'add_expense': ('add_expense', 'POST', '/add', 'form'),
+    'delete_expense': ('delete_expense', 'POST', '/delete/{id}', None),
+    'get_expenses_api': ('get_expenses_api', 'GET', '/api/expenses', None),
+    'get_expenses_api?limit': ('get_expenses_api', 'GET', '/api/expenses?limit=100', None),
+    'search_expenses_api': ('search_expenses_api', 'GET', '/api/expenses/search?q=number', None),
+    'export_expenses_api': ('export_expenses_api', 'GET', '/api/expenses/export?format=csv', None),
+    'bulk_add_expenses_api': ('bulk_add_expenses_api', 'POST', '/api/expenses/bulk', 'json'),
+    'import_expenses_api': ('import_expenses_api', 'POST', '/api/expenses/import', 'csv'),
+    'get_summary_api': ('get_summary_api', 'GET', '/api/summary', None),
+    'get_timeseries_api': ('get_timeseries_api', 'GET', '/api/summary/timeseries?granularity=day',
+                           None),
+    'get_analytics_api': ('get_analytics_api', 'GET', '/api/analytics', None),
+    'get_cache_stats_api': ('get_cache_stats_api', 'GET', '/api/cache/stats', None),
+    'metrics_endpoint': ('metrics_endpoint', 'GET', '/metrics', None),
+    'static': ('static', 'GET', '/static/css/style.css', None),
+    'clear_expenses': ('clear_expenses', 'POST', '/clear', None),
+}
+# Routes that change the store; the dataset is reloaded after them.
+MUTATING = {'add_expense', 'delete_expense', 'bulk_add_expenses_api', 'import_expenses_api',
+            'clear_expenses'}
+
+
+def batch_bodies():
+    """Return the JSON and CSV bodies for one bulk create or import."""
+    rows = [{'amount': f'{amount:.2f}', 'category': category, 'description': description,
+             'date': day}
+            for amount, category, description, day, _ in sample_rows(BATCH_ROWS)]
+    out = io.StringIO()
+    writer = csv.DictWriter(out, fieldnames=['amount', 'category', 'description', 'date'])
+    writer.writeheader()
+    writer.writerows(rows)
+    return {'json': (json.dumps(rows), 'application/json'), 'csv': (out.getvalue(), 'text/csv')}
+
+
+def percentile(sorted_values, fraction):
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+def max_rss_mib():
+    try:
+        import resource
+    except ImportError:
+        return None
+    scale = 1 if sys.platform == 'darwin' else 1024
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale / 2**20, 1)
+
+
+def measure(client, route, bodies, budget, min_requests, max_requests, before_each=None):
+    """Time one route; return its ops/sec, latencies in ms and peak memory.
+
+    The first request, which may fill caches or build an index, is reported
+    as ``first_ms`` and left out of the others. ``before_each(n)``, if given,
+    prepares request ``n`` outside the timing.
+    """
+    _, method, path, body = route
+    kwargs = {}
+    if body == 'form':
+        kwargs['data'] = FORM
+    elif body is not None:
+        kwargs['data'], kwargs['content_type'] = bodies[body]
+
+    def call(n, traced=False):
+        """Return request ``n``'s latency and, if ``traced``, its peak bytes."""
+        if before_each is not None:
+            before_each(n)
+        if traced:
+            tracemalloc.start()
+        try:
+            base = tracemalloc.get_traced_memory()[0]
+            started = time.perf_counter()
+            response = client.open(path.format(id=DELETE_ID + n), method=method, **kwargs)
+            response.get_data()
+            response.close()
+            elapsed = time.perf_counter() - started
+            assert response.status_code < 500, (path, response.status_code)
+            return elapsed, tracemalloc.get_traced_memory()[1] - base
+        finally:
+            if traced:
+                tracemalloc.stop()
+
+    first = call(0)[0]
+    timings = []
+    deadline = time.perf_counter() + budget
+    while len(timings) < max_requests and (len(timings) < min_requests
+                                           or time.perf_counter() < deadline):
+        timings.append(call(len(timings) + 1)[0])
+
+    # Peak memory in separate requests, since tracemalloc slows every
+    # allocation. The least of three leaves out one-off container resizes.
+    peaks = [call(n, traced=True)[1] for n in range(len(timings) + 1, len(timings) + 4)]
+
+    ordered = sorted(timings)
+    return {
+        'requests': len(timings),
+        'ops_per_sec': round(len(timings) / sum(timings), 2),
+        'first_ms': round(first * 1000, 4),
+        'p50_ms': round(percentile(ordered, 0.50) * 1000, 4),
+        'p99_ms': round(percentile(ordered, 0.99) * 1000, 4),
+        'peak_kib': round(min(peaks) / 1024, 1),
+    }
+
+
+def compare(results, baseline, tolerance, p99_tolerance, min_peak_kib):
+    """Return a message for each route that regressed against ``baseline``."""
+    regressions = []
+    for size, routes in results['results'].items():
+        for name, now in routes.items():
+            before = baseline.get('results', {}).get(size, {}).get(name)
+            if before is None or 'skipped' in before or 'skipped' in now:
+                continue
+            label = f'{name} at {int(size):,} rows'
+            if now['ops_per_sec'] < before['ops_per_sec'] * (1 - tolerance):
+                regressions.append(f'{label}: {now["ops_per_sec"]:,.1f} ops/sec, '
+                                   f'baseline {before["ops_per_sec"]:,.1f}')
+            if now['p99_ms'] > before['p99_ms'] * (1 + p99_tolerance):
+                regressions.append(f'{label}: p99 {now["p99_ms"]:.3f} ms, '
+                                   f'baseline {before["p99_ms"]:.3f} ms')
+            if (now['peak_kib'] > before['peak_kib'] * (1 + tolerance)
+                    and now['peak_kib'] - before['peak_kib'] > min_peak_kib):
+                regressions.append(f'{label}: peak {now["peak_kib"]:,.1f} KiB, '
+                                   f'baseline {before["peak_kib"]:,.1f} KiB')
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=SIZES)
+    parser.add_argument('--routes', nargs='+', choices=sorted(ROUTES), default=list(ROUTES))
+    parser.add_argument('--store', choices=('memory', 'columnar', 'sqlite'), default='memory')
+    parser.add_argument('--budget', type=float, default=1.0, help='seconds per route and size')
+    parser.add_argument('--min-requests', type=int, default=3)
+    parser.add_argument('--max-requests', type=int, default=2000)
+    parser.add_argument('--output', help='write the results as JSON to this file')
+    parser.add_argument('--baseline', help='fail on regressions against this results file')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='allowed drop in ops/sec and growth in peak memory')
+    parser.add_argument('--p99-tolerance', type=float, default=1.0,
+                        help='allowed growth in p99 latency')
+    parser.add_argument('--min-peak-kib', type=float, default=64,
+                        help='peak memory growth ignored below this many KiB')
+    parser.add_argument('--max-peak-mib', type=float, default=1024,
+                        help='skip a route whose peak, scaled from the previous size, '
+                             'would exceed this')
+    args = parser.parse_args()
+
+    db_dir = None
+    os.environ['EXPENSE_STORE'] = args.store
+    if args.store == 'sqlite':
+        db_dir = tempfile.mkdtemp()
+        os.environ['EXPENSE_DB_PATH'] = os.path.join(db_dir, 'bench.db')
+
+    from app import app, expenses
+    from models import Expense, advance_ids, reset_ids
+
+    endpoints = {rule.endpoint for rule in app.url_map.iter_rules()}
+    missing = endpoints - {endpoint for endpoint, *_ in ROUTES.values()}
+    if missing:
+        parser.error(f'no benchmark for routes: {", ".join(sorted(missing))}')
+
+    def load(rows):
+        expenses.clear()
+        reset_ids()
+        expenses.add_many(Expense(amount, category, description, day, expense_id=expense_id)
+                          for amount, category, description, day, expense_id in sample_rows(rows))
+        advance_ids(rows)
+
+    client = app.test_client(use_cookies=False)
+    bodies = batch_bodies()
+    results = {
+        'meta': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'store': args.store,
+            'budget_seconds': args.budget,
+            'started': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'max_rss_mib': {},
+        },
+        'results': {},
+    }
+
+    def save():
+        if args.output:
+            with open(args.output, 'w', encoding='utf-8') as f:
+                json.dump(results, f, indent=2, sort_keys=True)
+                f.write('\n')
+
+    # name: (size, peak KiB) of the route's last measurement
+    previous = {}
+    print(f'{args.store} store; ops/sec, p50 and p99 ms, peak KiB per request')
+    for size in args.sizes:
+        load(size)
+        print(f'  {size:>9,} rows')
+        routes = results['results'][str(size)] = {}
+        for name in args.routes:
+            last_size, last_peak = previous.get(name, (0, 0))
+            if last_size and last_peak * size / last_size / 1024 > args.max_peak_mib:
+                # Peak memory grows with the rows a route renders, such as the
+                # unfiltered index page's full table.
+                estimate = last_peak * size / last_size / 1024
+                routes[name] = {'skipped': f'estimated peak {estimate:,.0f} MiB '
+                                           f'over --max-peak-mib {args.max_peak_mib:,.0f}'}
+                print(f'    {name:<24} skipped: {routes[name]["skipped"]}')
+                continue
+            before_each = None
+            if name == 'delete_expense':
+                before_each = lambda n: expenses.add(Expense(
+                    3.5, 'Other', 'Benchmark', '2024-06-01', expense_id=DELETE_ID + n))
+            elif name == 'clear_expenses':
+                # Each request clears the full dataset, not an empty store.
+                before_each = lambda n: len(expenses) == size or load(size)
+            routes[name] = stats = measure(client, ROUTES[name], bodies, args.budget,
+                                           args.min_requests, args.max_requests, before_each)
+            print(f'    {name:<24} {stats["ops_per_sec"]:10,.1f} {stats["p50_ms"]:10.3f} '
+                  f'{stats["p99_ms"]:10.3f} {stats["peak_kib"]:12,.1f}')
+            previous[name] = (size, stats['peak_kib'])
+            if name in MUTATING:
+                load(size)
+        results['meta']['max_rss_mib'][str(size)] = max_rss_mib()
+        # Saved after every size, so a run cut short keeps what it measured.
+        save()
+
+    if args.output:
+        print(f'Wrote {args.output}')
+    if db_dir is not None:
+        expenses.close()
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance, args.p99_tolerance,
+                              args.min_peak_kib)
+        for message in regressions:
+            print(f'REGRESSION {message}')
+        if regressions:
+            sys.exit(1)
+        print(f'No regressions against {args.baseline}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+"""
+Search Benchmark
+Times description searches through the inverted index against scanning
+every row, for the in-memory stores and the SQLite FTS5 index.
+Run with: python -m benchmarks.bench_search [--rows N] [--no-sqlite]
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import date, timedelta
+
+from models import CATEGORIES, Expense
+from search import matches, tokenize
+from sqlite_store import SQLiteExpenseStore
+from store import ColumnarExpenseStore, ExpenseStore
+
+QUERIES = {
+    'rare word': 'zuvo',
+    'common prefix': 'ka',
+    'two words': 'ka be',
+    'with category': 'ka',
+    'no match': 'zuvo qqq',
+}
+
+
+def vocabulary(count=5000, seed=7):
+    """Return ``count`` distinct pronounceable pseudo-words."""
+    rng = random.Random(seed)
+    words = {'zuvo'}
+    while len(words) < count:
+        words.add(''.join(rng.choice('bdgklmnprstvz') + rng.choice('aeiou')
+                          for _ in range(rng.randint(2, 4))))
+    return sorted(words)
+
+
+def sample_rows(count, seed=11):
+    """Yield expenses with 2-4 word descriptions; 'zuvo' appears about 1 in 5,000."""
+    rng = random.Random(seed)
+    words = vocabulary()
+    start = date(2024, 1, 1)
+    for i in range(count):
+        yield Expense((i % 500) + 0.99, CATEGORIES[i % len(CATEGORIES)],
+                      ' '.join(rng.choice(words) for _ in range(rng.randint(2, 4))),
+                      (start + timedelta(days=i % 365)).isoformat(), expense_id=i + 1)
+
+
+def timed(fn, repeat=20):
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--limit', type=int, default=50)
+    parser.add_argument('--no-sqlite', action='store_true')
+    args = parser.parse_args()
+
+    stores = [ExpenseStore(), ColumnarExpenseStore()]
+    tmp = tempfile.TemporaryDirectory()
+    if not args.no_sqlite:
+        stores.append(SQLiteExpenseStore(os.path.join(tmp.name, 'bench.db')))
+    print(f'Searching {args.rows:,} expenses, limit {args.limit}')
+    for store in stores:
+        batch = []
+        for expense in sample_rows(args.rows):
+            batch.append(expense)
+            if len(batch) == 10_000:
+                store.add_many(batch)
+                batch = []
+        store.add_many(batch)
+        started = time.perf_counter()
+        store.search('warmup')
+        print(f'  {type(store).__name__}: index ready in {time.perf_counter() - started:.2f} s')
+        for name, query in QUERIES.items():
+            category = 'Shopping' if name == 'with category' else None
+            prefixes = tokenize(query)
+
+            def scan():
+                found = []
+                for expense in store:
+                    if ((category is None or expense.category == category)
+                            and matches(expense.description, prefixes)):
+                        found.append(expense)
+                        if len(found) == args.limit:
+                            break
+                return found
+
+            indexed, found = timed(lambda: store.search(query, limit=args.limit,
+                                                        category=category))
+            scanned, expected = timed(scan, repeat=1)
+            assert [e.id for e in found] == [e.id for e in expected], name
+            print(f'    {name:<14} {query!r:<11} search {indexed * 1000:8.3f} ms   '
+                  f'scan {scanned * 1000:8.1f} ms   ({len(found)} rows)')
+        if isinstance(store, SQLiteExpenseStore):
+            store.close()
+    tmp.cleanup()
+
+
+if __name__ == '__main__':
+    main()
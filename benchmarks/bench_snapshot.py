@@ -0,0 +1,65 @@
+"""
+Snapshot Startup Benchmark
+Compares cold-start time of parsing a JSON-lines dump into a store with
+memory-mapping a binary snapshot, including the first /api/summary-style read.
+Run with: python -m benchmarks.bench_snapshot [--rows N]
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import time
+
+from benchmarks.bench_recovery import build_store
+from models import Expense
+from snapshot import capture, write_snapshot
+from store import ColumnarExpenseStore
+
+
+def load_json_lines(path):
+    store = ColumnarExpenseStore()
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            expense_id, amount, category, description, day = json.loads(line)
+            store.add(Expense(amount, category, description, day, expense_id=expense_id))
+    return store
+
+
+def load_mapped(path):
+    store = ColumnarExpenseStore()
+    store.load_snapshot(path)
+    return store
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        json_path = os.path.join(directory, 'expenses.jsonl')
+        bin_path = os.path.join(directory, 'expenses.bin')
+        source = build_store(args.rows)
+        with open(json_path, 'w', encoding='utf-8') as f:
+            for e in source:
+                f.write(json.dumps([e.id, e.amount, e.category, e.description, e.date]) + '\n')
+        write_snapshot(bin_path, capture(source))
+        del source
+
+        print(f'Cold start at {args.rows:,} expenses')
+        for name, loader, path in (('JSON lines parse', load_json_lines, json_path),
+                                   ('mmap binary snapshot', load_mapped, bin_path)):
+            started = time.perf_counter()
+            store = loader(path)
+            loaded = time.perf_counter() - started
+            store.category_totals()
+            store.get(args.rows // 2)
+            first_read = time.perf_counter() - started
+            print(f'  {name:<22} load {loaded * 1000:9.1f} ms   '
+                  f'load + first reads {first_read * 1000:9.1f} ms')
+            del store
+
+
+if __name__ == '__main__':
+    main()
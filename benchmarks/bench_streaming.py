@@ -0,0 +1,75 @@
+"""
+Streaming Export Benchmark
+Compares peak RSS of serving every expense from /api/expenses as one
+jsonify() body with the streamed NDJSON, chunked JSON and CSV export modes. Each mode
+runs in a fresh interpreter because peak RSS never goes down.
+Run with: python -m benchmarks.bench_streaming [--rows N]
+"""
+
+import argparse
+import resource
+import subprocess
+import sys
+import time
+
+from benchmarks.bench_memory import sample_rows
+
+MODES = {
+    'buffered': ('/api/expenses', {}),
+    'ndjson': ('/api/expenses', {'Accept': 'application/x-ndjson'}),
+    'chunked': ('/api/expenses?stream=1', {}),
+    'csv': ('/api/expenses/export?format=csv', {}),
+    'csv.gz': ('/api/expenses/export?format=csv&gzip=1', {}),
+}
+
+
+def peak_rss_mb():
+    # ru_maxrss is KiB on Linux, bytes on macOS.
+    scale = 1 if sys.platform == 'darwin' else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale / 2**20
+
+
+def run_mode(mode, rows):
+    """Fill the app's store, consume one response and print the RSS numbers."""
+    from app import app, expenses
+    from models import Expense
+
+    for amount, category, description, day, expense_id in sample_rows(rows):
+        expenses.add(Expense(amount, category, description, day, expense_id=expense_id))
+    loaded = peak_rss_mb()
+
+    path, headers = MODES[mode]
+    started = time.perf_counter()
+    size = 0
+    with app.test_client() as client:
+        response = client.get(path, headers=headers)
+        for chunk in response.response:
+            size += len(chunk)
+        response.close()
+    elapsed = time.perf_counter() - started
+    print(f'{loaded:.1f} {peak_rss_mb():.1f} {elapsed:.3f} {size}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=500_000)
+    parser.add_argument('--mode', choices=MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        run_mode(args.mode, args.rows)
+        return
+
+    print(f'GET /api/expenses at {args.rows:,} expenses')
+    for mode in MODES:
+        output = subprocess.run(
+            [sys.executable, '-m', 'benchmarks.bench_streaming', '--rows', str(args.rows),
+             '--mode', mode],
+            check=True, capture_output=True, text=True).stdout.split()
+        loaded, peak, elapsed, size = float(output[0]), float(output[1]), float(output[2]), int(output[3])
+        print(f'  {mode:<9} peak RSS {peak:8.1f} MB   over loaded store {peak - loaded:8.1f} MB'
+              f'   {elapsed * 1000:8.1f} ms   {size / 2**20:6.1f} MB body')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""
+Time-Series Rollup Benchmark
+Times day and month rollups against re-aggregating every row, and compares
+the JSON a chart has to download either way.
+Run with: python -m benchmarks.bench_timeseries [--rows N]
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import time
+
+from benchmarks.bench_memory import sample_rows
+from models import Expense
+from sqlite_store import SQLiteExpenseStore
+from store import ColumnarExpenseStore, ExpenseStore
+
+
+def timed(fn, repeat=5):
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def aggregate(store, granularity):
+    """Re-aggregate every row, as the charts did client-side."""
+    width = 10 if granularity == 'day' else 7
+    totals = {}
+    for expense in store:
+        key = (expense.date[:width], expense.category)
+        count, total = totals.get(key, (0, 0))
+        totals[key] = (count + 1, total + expense.amount)
+    return sorted((period, category, count, total)
+                  for (period, category), (count, total) in totals.items())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    tmp = tempfile.TemporaryDirectory()
+    print(f'Rollups over {args.rows:,} expenses spread across one year')
+    for store in (ExpenseStore(), ColumnarExpenseStore(),
+                  SQLiteExpenseStore(os.path.join(tmp.name, 'bench.db'))):
+        rows = [Expense(amount, category, description, day, expense_id=expense_id)
+                for amount, category, description, day, expense_id in sample_rows(args.rows)]
+        started = time.perf_counter()
+        for start in range(0, len(rows), 10_000):
+            store.add_many(rows[start:start + 10_000])
+        loaded = time.perf_counter() - started
+        store.rollup('day')  # Build the columnar rollups outside the timings
+        print(f'  {type(store).__name__} (load {loaded:.1f} s)')
+        for granularity in ('month', 'day'):
+            rolled, result = timed(lambda: store.rollup(granularity))
+            scanned, expected = timed(lambda: aggregate(store, granularity), repeat=1)
+            assert [row[:3] for row in result] == [row[:3] for row in expected]
+            print(f'    {granularity:<5} rollup {rolled * 1000:7.2f} ms   '
+                  f'full aggregate {scanned * 1000:8.1f} ms   ({len(result):,} rows)')
+        if isinstance(store, SQLiteExpenseStore):
+            store.close()
+        else:
+            full = len(json.dumps([e.to_dict() for e in store]))
+            series = len(json.dumps(store.rollup('month')))
+            print(f'    download: all expenses {full / 2**20:.1f} MiB, '
+                  f'monthly rollup {series / 2**10:.1f} KiB')
+    tmp.cleanup()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""
+Response Compression
+Content-Encoding negotiation and gzip, deflate and (when installed) brotli
+compression of whole bodies and of streams.
+"""
+
+import zlib
+
+try:
+    import brotli
+except ImportError:  # Optional: gzip and deflate are always available
+    try:
+        import brotlicffi as brotli
+    except ImportError:
+        brotli = None
+
+# In order of preference when a client accepts several equally.
+ENCODINGS = ('br', 'gzip', 'deflate') if brotli is not None else ('gzip', 'deflate')
+
+# Brotli's higher qualities cost far more CPU than they save on dynamic
+# responses; 5 compresses better than gzip -6 at a similar speed.
+BROTLI_QUALITY = 5
+
+COMPRESSIBLE = frozenset({
+    'application/json',
+    'application/x-ndjson',
+    'application/javascript',
+    'text/csv',
+    'text/css',
+    'text/html',
+    'text/plain',
+})
+
+
+def negotiate(accept_encodings):
+    """Return the best of ENCODINGS for a parsed Accept-Encoding header, or None."""
+    return accept_encodings.best_match(ENCODINGS)
+
+
+def _zlib(encoding, level):
+    # wbits 31 writes a gzip member; 15 the zlib stream HTTP calls deflate.
+    return zlib.compressobj(level, zlib.DEFLATED, 31 if encoding == 'gzip' else 15)
+
+
+def compress(data, encoding, level=6):
+    """Compress a whole body with ``encoding``; ``level`` applies to gzip and deflate."""
+    if encoding == 'br':
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    compressor = _zlib(encoding, level)
+    return compressor.compress(data) + compressor.flush()
+
+
+def compress_stream(chunks, encoding, level=6):
+    """Yield a stream of chunks compressed with ``encoding``.
+
+    Each input chunk is flushed as it is compressed, so a client reading
+    NDJSON rows sees every batch as soon as it is produced. ``chunks`` is
+    closed when the stream is, like the body it replaces.
+    """
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+
+        def step(chunk):
+            return compressor.process(chunk) + compressor.flush()
+        finish = compressor.finish
+    else:
+        compressor = _zlib(encoding, level)
+
+        def step(chunk):
+            return compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        finish = compressor.flush
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode('utf-8')
+            data = step(chunk)
+            if data:
+                yield data
+        yield finish()
+    finally:
+        close = getattr(chunks, 'close', None)
+        if close is not None:
+            close()
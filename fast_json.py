@@ -0,0 +1,53 @@
+"""
+Fast JSON Provider
+Flask JSON provider that encodes responses with orjson when it is installed
+and falls back to Flask's standard-library encoder otherwise.
+"""
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # Optional: the standard library writes the same JSON
+    orjson = None
+
+if orjson is not None:
+    # Dates and dataclasses go through Flask's ``default`` so they encode as
+    # they would without orjson.
+    _OPTIONS = (orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS
+                | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS)
+
+
+class JSONProvider(DefaultJSONProvider):
+    """Flask JSON provider that encodes with orjson when it is installed.
+
+    Output has the same keys, order and values as the default provider's,
+    except that non-ASCII text is written as UTF-8 instead of escaped.
+    Compact responses (the default outside debug mode) skip the ``str``
+    round trip and are built from orjson's bytes directly. Anything orjson
+    cannot encode natively goes through the default provider's ``default``;
+    calls with extra ``json.dumps`` options fall back to the standard
+    library.
+    """
+
+    def _options(self):
+        options = _OPTIONS
+        if not self.sort_keys:
+            options &= ~orjson.OPT_SORT_KEYS
+        return options
+
+    def _compact(self):
+        return self.compact or (self.compact is None and not self._app.debug)
+
+    def dumps(self, obj, **kwargs):
+        if orjson is None or kwargs.keys() - {'separators'}:
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=self.default, option=self._options()).decode('utf-8')
+
+    def response(self, *args, **kwargs):
+        if orjson is None or not self._compact():
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        body = orjson.dumps(obj, default=self.default,
+                            option=self._options() | orjson.OPT_APPEND_NEWLINE)
+        return self._app.response_class(body, mimetype=self.mimetype)
@@ -0,0 +1,270 @@
+"""
+Expense Importer
+Streaming CSV import for files too large to load at once: read, parse,
+validate and batch-insert in bounded memory, with rejected rows written to
+a reject file and optional process-pool parsing.
+Run with: python importer.py FILE [--workers N] [--rejects PATH]
+"""
+
+import argparse
+import csv
+import io
+import queue
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from models import new_expenses, parse_expense_fields
+
+REQUIRED_COLUMNS = ('amount', 'category', 'description')
+# Error handler for decoding CSV input and writing reject files: rows with
+# bytes that are not UTF-8 are rejected, and written back byte for byte.
+UNDECODABLE = 'surrogateescape'
+
+
+class ImportStats:
+    """Running counts for an import, shared with progress callbacks."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.rows = 0
+        self.created = 0
+        self.rejected = 0
+        self.errors = []
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def to_dict(self, max_errors=100):
+        """Return a JSON-ready summary with at most ``max_errors`` reject details."""
+        return {
+            'rows': self.rows,
+            'created': self.created,
+            'rejected': self.rejected,
+            'errors': self.errors[:max_errors],
+            'seconds': round(self.elapsed, 3),
+        }
+
+
+def read_header(line):
+    """Return the column names of a CSV header line, stripped and lower-cased.
+
+    Raises ValueError if a required column is missing.
+    """
+    header = [name.strip().lower() for name in next(csv.reader([line]), [])]
+    missing = [name for name in REQUIRED_COLUMNS if name not in header]
+    if missing:
+        raise ValueError(f"CSV header is missing: {', '.join(missing)}")
+    return header
+
+
+def read_chunks(lines, chunk_rows=10_000):
+    """Yield ``(first_line_number, [raw lines])`` chunks of whole CSV records.
+
+    Records are split on line ends unless a quoted field is still open
+    (an odd number of quotes so far), so quoted newlines stay together.
+    The header line is not included; line numbers count it as line 1.
+    """
+    chunk, start, number, quotes = [], 2, 1, 0
+    for line in lines:
+        number += 1
+        chunk.append(line)
+        quotes += line.count('"')
+        if quotes % 2:
+            continue
+        quotes = 0
+        if len(chunk) >= chunk_rows:
+            yield start, chunk
+            chunk, start = [], number + 1
+    if chunk:
+        yield start, chunk
+
+
+def parse_chunk(header, start, lines):
+    """Parse and validate one chunk of raw CSV lines.
+
+    Returns ``(valid, rejects)``: validated field tuples ready for
+    ``new_expenses`` and ``(line, fields, error)`` tuples for bad rows.
+    Runs in worker processes, so it only takes and returns plain data.
+
+    Bytes that were not UTF-8 arrive as surrogate escapes (see
+    ``UNDECODABLE``); rows holding any are rejected.
+    """
+    positions = {name: index for index, name in enumerate(header)}
+    amount_at, category_at, description_at = (positions[name] for name in REQUIRED_COLUMNS)
+    date_at = positions.get('date')
+    valid, rejects = [], []
+    consumed = 0
+    text = ''.join(lines)
+    # Only look for escapes row by row in the rare chunk that has any.
+    clean = text.isascii() or _is_text(text)
+    reader = csv.reader(io.StringIO(text))
+    for fields in reader:
+        line, consumed = start + consumed, reader.line_num
+        if not fields:
+            continue
+        if len(fields) < len(header):
+            fields += [''] * (len(header) - len(fields))
+        if not clean and not _is_text(''.join(fields)):
+            rejects.append((line, fields, 'Invalid text! The row is not valid UTF-8.'))
+            continue
+        try:
+            valid.append(parse_expense_fields(
+                fields[amount_at], fields[category_at], fields[description_at],
+                fields[date_at] if date_at is not None else None))
+        except ValueError as e:
+            rejects.append((line, fields, str(e)))
+    return valid, rejects
+
+
+def _is_text(text):
+    """Return False if ``text`` holds surrogate escapes of undecodable bytes."""
+    try:
+        text.encode('utf-8')
+    except UnicodeEncodeError:
+        return False
+    return True
+
+
+def _parsed_chunks(chunks, header, workers):
+    """Yield ``parse_chunk`` results in file order.
+
+    With ``workers`` the chunks are parsed in a process pool, keeping at
+    most two chunks per worker in flight so memory stays bounded however
+    large the file is.
+    """
+    if not workers:
+        for start, lines in chunks:
+            yield parse_chunk(header, start, lines)
+        return
+    with ProcessPoolExecutor(workers) as pool:
+        pending = [pool.submit(parse_chunk, header, start, lines)
+                   for start, lines in islice(chunks, 2 * workers)]
+        while pending:
+            result = pending.pop(0).result()
+            for start, lines in islice(chunks, 1):
+                pending.append(pool.submit(parse_chunk, header, start, lines))
+            yield result
+
+
+class _Writer(threading.Thread):
+    """Single thread that applies validated batches to the store in order."""
+
+    def __init__(self, store, journal, stats):
+        super().__init__(name='expense-import-writer', daemon=True)
+        self.store = store
+        self.journal = journal
+        self.stats = stats
+        self.batches = queue.Queue(maxsize=4)
+        self.error = None
+
+    def run(self):
+        while True:
+            fields = self.batches.get()
+            if fields is None:
+                return
+            if self.error is not None:
+                continue
+            try:
+                batch = new_expenses(fields)
+                if self.journal is not None:
+                    self.journal.add_many(self.store, batch)
+                else:
+                    self.store.add_many(batch)
+                self.stats.created += len(batch)
+            except Exception as e:
+                # Keep draining so the reader never blocks on a full queue.
+                self.error = e
+
+
+def import_csv(lines, store, journal=None, workers=0, chunk_rows=10_000, rejects=None,
+               progress=None):
+    """Stream CSV ``lines`` (a text file or iterable of lines) into ``store``.
+
+    Rows failing ``/add`` validation are skipped and, if ``rejects`` is a
+    writable text file, written to it as CSV with their line number and
+    error. ``progress`` is called with the ``ImportStats`` after each
+    chunk. Decode ``lines`` with ``errors=UNDECODABLE`` to reject rows
+    that are not UTF-8 instead of failing on them.
+
+    Raises ValueError if the header lacks a required column. Any later
+    error, such as one from the store, is raised with the ``ImportStats``
+    so far as its ``stats`` attribute, since earlier batches are already
+    stored.
+    """
+    lines = iter(lines)
+    header = read_header(next(lines, ''))
+
+    stats = ImportStats()
+    reject_writer = csv.writer(rejects) if rejects is not None else None
+    if reject_writer is not None:
+        reject_writer.writerow(header + ['line', 'error'])
+    writer = _Writer(store, journal, stats)
+    writer.start()
+    failure = None
+    try:
+        for valid, rejected in _parsed_chunks(read_chunks(lines, chunk_rows), header, workers):
+            stats.rows += len(valid) + len(rejected)
+            stats.rejected += len(rejected)
+            for line, fields, error in rejected:
+                if len(stats.errors) < 100:
+                    stats.errors.append({'line': line, 'error': error})
+                if reject_writer is not None:
+                    reject_writer.writerow(fields + [line, error])
+            if valid:
+                writer.batches.put(valid)
+            if writer.error is not None:
+                break
+            if progress is not None:
+                progress(stats)
+    except Exception as e:
+        failure = e
+    finally:
+        writer.batches.put(None)
+        writer.join()
+    failure = writer.error or failure
+    if failure is not None:
+        failure.stats = stats
+        raise failure
+    return stats
+
+
+def _report(stats):
+    rate = stats.rows / stats.elapsed if stats.elapsed else 0
+    print(f'\r{stats.rows:,} rows  {stats.created:,} created  {stats.rejected:,} rejected  '
+          f'{rate:,.0f} rows/s', end='', file=sys.stderr, flush=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('file', help='CSV file with amount, category, description[, date]')
+    parser.add_argument('--workers', type=int, default=0,
+                        help='parse in a pool of N processes (default: in-process)')
+    parser.add_argument('--chunk-rows', type=int, default=10_000)
+    parser.add_argument('--rejects', help='write rejected rows to this CSV file')
+    args = parser.parse_args(argv)
+
+    # The app owns the configured store and journal (EXPENSE_STORE, ...).
+    from app import expenses, journal
+
+    rejects = (open(args.rejects, 'w', encoding='utf-8', errors=UNDECODABLE, newline='')
+               if args.rejects else None)
+    try:
+        with open(args.file, encoding='utf-8-sig', errors=UNDECODABLE, newline='') as f:
+            stats = import_csv(f, expenses, journal, workers=args.workers,
+                               chunk_rows=args.chunk_rows, rejects=rejects, progress=_report)
+    finally:
+        if rejects is not None:
+            rejects.close()
+        if journal is not None:
+            journal.close()
+    _report(stats)
+    print(file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
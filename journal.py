@@ -0,0 +1,348 @@
+"""
+Expense Journal
+Append-only operation journal with group commit and periodic snapshots, so
+an in-memory store survives restarts without a database round-trip per write.
+"""
+
+import json
+import os
+import threading
+
+from models import Expense, advance_ids
+from snapshot import MappedSnapshot, capture, write_snapshot
+
+SNAPSHOT_PREFIX = 'snapshot-'
+SNAPSHOT_SUFFIX = '.bin'
+LEGACY_SNAPSHOT_SUFFIX = '.jsonl'
+SEGMENT_PREFIX = 'journal-'
+
+
+def _name(prefix, seq, suffix):
+    return f'{prefix}{seq:012d}{suffix}'
+
+
+def _seq_of(filename, prefix):
+    return int(filename[len(prefix):].split('.', 1)[0])
+
+
+def encode_record(record):
+    """Encode one journal record as a JSON line."""
+    return json.dumps(record, separators=(',', ':')).encode('utf-8') + b'\n'
+
+
+def _fsync_dir(path):
+    """Persist directory entries (renames, new files) where the OS allows it."""
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+class ExpenseJournal:
+    """Durable log of add/delete/clear operations for an expense store.
+
+    Each record is one JSON line. Writers append to an in-memory buffer and
+    block until a background flusher has written and fsynced it; records
+    that arrive while a flush is in progress share the next fsync (group
+    commit). ``add``, ``delete`` and ``clear`` apply a change to the store
+    and queue its record under the store's mutation lock, so the journal
+    order always matches the order the store saw, then wait for the fsync
+    outside the lock. Records are numbered by a global sequence; a snapshot taken at
+    sequence ``S`` holds the store state before record ``S`` and the active
+    segment is rotated to ``journal-S.log``, so recovery loads the newest
+    snapshot and replays only the segments after it.
+
+    Snapshots use the binary format from ``snapshot.py``; a columnar store
+    maps them directly instead of re-adding every row. JSON-lines snapshots
+    from earlier versions are still read.
+    """
+
+    def __init__(self, directory, snapshot_every=100_000, commit_delay=0.002):
+        self.directory = directory
+        self.snapshot_every = snapshot_every
+        self.commit_delay = commit_delay
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._flushed = threading.Condition(self._lock)
+        self._pending = threading.Condition(self._lock)
+        self._buffer = []
+        self._seq = 0
+        self._durable_seq = 0
+        self._since_snapshot = 0
+        self._segment = None
+        self._snapshot_thread = None
+        self._closed = False
+        self._flusher = threading.Thread(target=self._flush_loop, name='expense-journal',
+                                         daemon=True)
+
+    # -- recovery ---------------------------------------------------------
+
+    def _list(self, prefix, suffix):
+        names = [n for n in os.listdir(self.directory)
+                 if n.startswith(prefix) and n.endswith(suffix)]
+        return sorted(names, key=lambda n: _seq_of(n, prefix))
+
+    def _snapshots(self):
+        names = (self._list(SNAPSHOT_PREFIX, SNAPSHOT_SUFFIX)
+                 + self._list(SNAPSHOT_PREFIX, LEGACY_SNAPSHOT_SUFFIX))
+        return sorted(names, key=lambda n: _seq_of(n, SNAPSHOT_PREFIX))
+
+    def recover(self, store):
+        """Load the latest snapshot and replay the journal tail into ``store``.
+
+        Returns the number of replayed journal records. Must be called once,
+        before any records are written.
+        """
+        store.clear()
+        snapshot_seq = 0
+        snapshots = self._snapshots()
+        if snapshots:
+            latest = snapshots[-1]
+            snapshot_seq = _seq_of(latest, SNAPSHOT_PREFIX)
+            path = os.path.join(self.directory, latest)
+            if latest.endswith(LEGACY_SNAPSHOT_SUFFIX):
+                with open(path, encoding='utf-8') as f:
+                    for line in f:
+                        store.add(self._expense(json.loads(line)))
+            elif hasattr(store, 'load_snapshot'):
+                store.load_snapshot(path)
+            else:
+                for expense in MappedSnapshot(path):
+                    store.add(expense)
+
+        seq, replayed = snapshot_seq, 0
+        for name in self._list(SEGMENT_PREFIX, '.log'):
+            start = _seq_of(name, SEGMENT_PREFIX)
+            if start < snapshot_seq:
+                continue
+            seq = start
+            path = os.path.join(self.directory, name)
+            with open(path, 'r+b') as f:
+                good = 0
+                for line in f:
+                    try:
+                        if not line.endswith(b'\n'):
+                            raise ValueError('unterminated record')
+                        record = json.loads(line)
+                    except ValueError:
+                        # A torn write from a crash; nothing after it was
+                        # acknowledged. Cut it off, so records appended to
+                        # this segment after recovery are not hidden behind it.
+                        f.truncate(good)
+                        os.fsync(f.fileno())
+                        break
+                    self._apply(store, record)
+                    good += len(line)
+                    seq += 1
+                    replayed += 1
+
+        advance_ids(store.max_id())
+        self._seq = self._durable_seq = seq
+        self._since_snapshot = seq - snapshot_seq
+        self._open_segment(seq)
+        self._flusher.start()
+        return replayed
+
+    @staticmethod
+    def _expense(fields):
+        expense_id, amount, category, description, day = fields
+        return Expense(amount, category, description, day, expense_id=expense_id)
+
+    def _apply(self, store, record):
+        op = record[0]
+        if op == 'add':
+            store.add(self._expense(record[1:]))
+        elif op == 'delete':
+            store.delete(record[1])
+        elif op == 'clear':
+            store.clear()
+
+    # -- writing ----------------------------------------------------------
+
+    def _open_segment(self, start):
+        if self._segment is not None:
+            self._segment.close()
+        self._segment = open(os.path.join(self.directory, _name(SEGMENT_PREFIX, start, '.log')),
+                             'ab')
+        _fsync_dir(self.directory)
+
+    def _append(self, record, wait=True):
+        """Queue a record; with ``wait``, block until it is fsynced. Returns its sequence."""
+        line = encode_record(record)
+        with self._lock:
+            if self._closed:
+                raise RuntimeError('journal is closed')
+            self._buffer.append(line)
+            self._seq += 1
+            self._since_snapshot += 1
+            seq = self._seq
+            self._pending.notify()
+        if wait:
+            self.wait(seq)
+        return seq
+
+    def wait(self, seq):
+        """Block until every record up to ``seq`` is durable."""
+        with self._lock:
+            while self._durable_seq < seq:
+                self._flushed.wait()
+
+    def record_add(self, expense, wait=True):
+        """Log an added expense."""
+        return self._append(['add', expense.id, expense.amount, expense.category,
+                             expense.description, expense.date], wait)
+
+    def record_delete(self, expense_id, wait=True):
+        """Log a deleted expense."""
+        return self._append(['delete', expense_id], wait)
+
+    def record_clear(self, wait=True):
+        """Log clearing all expenses."""
+        return self._append(['clear'], wait)
+
+    def add(self, store, expense):
+        """Add ``expense`` to ``store`` and durably log it."""
+        with store.lock:
+            store.add(expense)
+            seq = self.record_add(expense, wait=False)
+        self.wait(seq)
+        self.maybe_snapshot(store)
+        return expense
+
+    def add_many(self, store, expenses):
+        """Add ``expenses`` to ``store`` as one change and durably log them."""
+        with store.lock:
+            expenses = store.add_many(expenses)
+            seq = None
+            for expense in expenses:
+                seq = self.record_add(expense, wait=False)
+        if seq is not None:
+            self.wait(seq)
+            self.maybe_snapshot(store)
+        return expenses
+
+    def delete(self, store, expense_id):
+        """Delete an expense from ``store``, durably logging it if it existed."""
+        with store.lock:
+            expense = store.delete(expense_id)
+            if expense is None:
+                return None
+            seq = self.record_delete(expense_id, wait=False)
+        self.wait(seq)
+        self.maybe_snapshot(store)
+        return expense
+
+    def clear(self, store):
+        """Clear ``store``, durably log it and snapshot the now-empty store."""
+        with store.lock:
+            store.clear()
+            seq = self.record_clear(wait=False)
+        self.wait(seq)
+        self.snapshot(store)  # Empty, so cheap, and retires the old segments
+
+    def _flush_loop(self):
+        while True:
+            with self._lock:
+                while not self._buffer and not self._closed:
+                    self._pending.wait()
+                if not self._buffer and self._closed:
+                    return
+            if self.commit_delay:
+                # Let concurrent writers join this batch before paying for fsync.
+                threading.Event().wait(self.commit_delay)
+            with self._lock:
+                batch, self._buffer = self._buffer, []
+                seq, segment = self._seq, self._segment
+            # Write outside the lock so new records can queue for the next batch.
+            segment.write(b''.join(batch))
+            segment.flush()
+            os.fsync(segment.fileno())
+            with self._lock:
+                self._durable_seq = seq
+                self._flushed.notify_all()
+
+    # -- snapshots --------------------------------------------------------
+
+    def maybe_snapshot(self, store):
+        """Start a snapshot once enough records have accumulated since the last one."""
+        if self._since_snapshot >= self.snapshot_every:
+            self.snapshot(store)
+
+    def snapshot(self, store, wait=False):
+        """Capture ``store`` and write it as a snapshot in the background.
+
+        The rows are copied and the segment rotated while holding the store's
+        mutation lock and the journal lock, so the snapshot lines up exactly
+        with the journal position.
+        """
+        if self._snapshot_thread is not None and self._snapshot_thread.is_alive():
+            if not wait:
+                return
+            self._snapshot_thread.join()
+        with store.lock, self._lock:
+            while self._durable_seq < self._seq:
+                self._flushed.wait()
+            seq = self._seq
+            columns = capture(store)
+            self._open_segment(seq)
+            self._since_snapshot = 0
+        self._snapshot_thread = threading.Thread(target=self._write_snapshot,
+                                                 args=(seq, columns),
+                                                 name='expense-snapshot', daemon=True)
+        self._snapshot_thread.start()
+        if wait:
+            self._snapshot_thread.join()
+
+    def _write_snapshot(self, seq, columns):
+        write_snapshot(os.path.join(self.directory, _name(SNAPSHOT_PREFIX, seq, SNAPSHOT_SUFFIX)),
+                       columns)
+        _fsync_dir(self.directory)
+        # Everything before this snapshot is now redundant.
+        stale = [n for n in self._snapshots() if _seq_of(n, SNAPSHOT_PREFIX) < seq]
+        stale += [n for n in self._list(SEGMENT_PREFIX, '.log')
+                  if _seq_of(n, SEGMENT_PREFIX) < seq]
+        for name in stale:
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError:
+                # Still mapped on platforms that lock mapped files; retried next time.
+                pass
+
+    def close(self):
+        """Flush outstanding records and stop the background threads."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._pending.notify()
+        if self._flusher.is_alive():
+            self._flusher.join()
+        if self._snapshot_thread is not None:
+            self._snapshot_thread.join()
+        if self._segment is not None:
+            self._segment.close()
+
+
+def open_journal(config, store):
+    """Open the journal configured for ``store`` and recover it, or return None."""
+    directory = config.get('EXPENSE_JOURNAL_DIR')
+    if not directory:
+        return None
+    if config.get('EXPENSE_STORE', 'memory') == 'sqlite':
+        raise ValueError('The journal is for in-memory stores; SQLite is already durable')
+    if config.get('EXPENSE_SNAPSHOT_PATH'):
+        # Recovery starts from an empty store, so it would drop the mapped seed.
+        raise ValueError('EXPENSE_SNAPSHOT_PATH cannot be combined with EXPENSE_JOURNAL_DIR; '
+                         'the journal recovers from its own snapshots')
+    journal = ExpenseJournal(
+        directory,
+        snapshot_every=int(config.get('EXPENSE_SNAPSHOT_EVERY', 100_000)),
+    )
+    journal.recover(store)
+    return journal
@@ -0,0 +1,134 @@
+"""
+Request Metrics
+Per-route latency and response-size histograms and status counts, rendered
+in the Prometheus text exposition format.
+"""
+
+import threading
+from bisect import bisect_left
+from collections import deque
+
+# Upper bounds in seconds; a request counts in the first bucket it fits.
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0,
+                   2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+# Observations queued before they are folded into the histograms.
+FLUSH_EVERY = 256
+
+
+class _RouteStats:
+    """Histogram and status counts for one (route, method); the last bucket is +Inf."""
+
+    __slots__ = ('latency', 'latency_sum', 'sizes', 'size_sum', 'statuses')
+
+    def __init__(self):
+        self.latency = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.latency_sum = 0.0
+        self.sizes = [0] * (len(SIZE_BUCKETS) + 1)
+        self.size_sum = 0
+        self.statuses = {}
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _histogram(lines, name, labels, buckets, counts, total):
+    cumulative = 0
+    for bound, count in zip(buckets, counts):
+        cumulative += count
+        lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+    cumulative += counts[-1]
+    lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {cumulative}')
+    lines.append(f'{name}_sum{{{labels}}} {_number(total)}')
+    lines.append(f'{name}_count{{{labels}}} {cumulative}')
+
+
+class RequestMetrics:
+    """Thread-safe request statistics for a ``/metrics`` endpoint.
+
+    ``observe`` only appends to a deque, which is atomic without a lock,
+    so it can run on every request. Every ``FLUSH_EVERY`` observations, and
+    before each ``render``, the queue is folded into the histograms under
+    the lock in one batch. Histogram buckets are stored per bucket and made
+    cumulative only when ``render`` writes them out.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._routes = {}
+        self._pending = deque()
+
+    def observe(self, route, method, status, seconds, size=None):
+        """Record one request; ``size`` is the body length, or None if unknown (streams)."""
+        self._pending.append((route, method, status, seconds, size))
+        if len(self._pending) >= FLUSH_EVERY:
+            self._flush()
+
+    def _flush(self):
+        """Fold queued observations into the histograms."""
+        with self._lock:
+            pending, routes = self._pending, self._routes
+            # popleft, not a swap or clear, so appends racing the flush are kept.
+            for _ in range(len(pending)):
+                route, method, status, seconds, size = pending.popleft()
+                stats = routes.get((route, method))
+                if stats is None:
+                    stats = routes[route, method] = _RouteStats()
+                stats.latency[bisect_left(LATENCY_BUCKETS, seconds)] += 1
+                stats.latency_sum += seconds
+                if size is not None:
+                    stats.sizes[bisect_left(SIZE_BUCKETS, size)] += 1
+                    stats.size_sum += size
+                stats.statuses[status] = stats.statuses.get(status, 0) + 1
+
+    def reset(self):
+        """Forget every observation."""
+        with self._lock:
+            self._pending.clear()
+            self._routes.clear()
+
+    def render(self, gauges=()):
+        """Return the metrics in Prometheus text format.
+
+        ``gauges`` holds extra ``(name, help, value)`` samples, such as the
+        store's row count, read at scrape time.
+        """
+        self._flush()
+        with self._lock:
+            routes = sorted((key, list(s.latency), s.latency_sum, list(s.sizes), s.size_sum,
+                             sorted(s.statuses.items()))
+                            for key, s in self._routes.items())
+
+        lines = [
+            '# HELP expense_http_requests_total Requests handled, by route, method and status.',
+            '# TYPE expense_http_requests_total counter',
+        ]
+        for (route, method), *_, statuses in routes:
+            for status, count in statuses:
+                lines.append(f'expense_http_requests_total{{route="{_escape(route)}",'
+                             f'method="{method}",status="{status}"}} {count}')
+        lines += [
+            '# HELP expense_http_request_duration_seconds Time to build each response.',
+            '# TYPE expense_http_request_duration_seconds histogram',
+        ]
+        for (route, method), latency, latency_sum, *_ in routes:
+            _histogram(lines, 'expense_http_request_duration_seconds',
+                       f'route="{_escape(route)}",method="{method}"',
+                       LATENCY_BUCKETS, latency, latency_sum)
+        lines += [
+            '# HELP expense_http_response_size_bytes Body sizes of responses with a known length.',
+            '# TYPE expense_http_response_size_bytes histogram',
+        ]
+        for (route, method), _, _, sizes, size_sum, _ in routes:
+            _histogram(lines, 'expense_http_response_size_bytes',
+                       f'route="{_escape(route)}",method="{method}"',
+                       SIZE_BUCKETS, sizes, size_sum)
+        for name, help_text, value in gauges:
+            lines += [f'# HELP {name} {help_text}', f'# TYPE {name} gauge',
+                      f'{name} {_number(value)}']
+        return '\n'.join(lines) + '\n'
@@ -0,0 +1,188 @@
+"""
+Expense Models
+Expense entity, categories and id allocation shared by the app and stores.
+"""
+
+import json
+import threading
+from datetime import datetime
+from json.encoder import encode_basestring_ascii
+from math import isfinite
+
+# An expense as compact JSON with sorted keys, as ``jsonify`` writes it.
+_ROW_JSON = '{"amount":%r,"category":%s,"date":%s,"description":%s,"id":%d}'
+
+CATEGORIES = [
+    'Food & Dining',
+    'Transportation',
+    'Shopping',
+    'Entertainment',
+    'Bills & Utilities',
+    'Healthcare',
+    'Other'
+]
+
+
+# Largest expense id any store accepts: the in-memory date indexes pack an
+# id and a date ordinal into one int64 key, leaving 40 bits for the id.
+MAX_EXPENSE_ID = 2**40 - 1
+
+
+class IdAllocator:
+    """Hands out increasing expense ids; safe to share between threads.
+
+    A single lock guards the counter, so concurrent requests never receive
+    the same id and resets or advances cannot interleave with allocation.
+    """
+    
+    def __init__(self, start=1):
+        self._next = start
+        self._lock = threading.Lock()
+    
+    def allocate(self):
+        """Return the next unused id."""
+        with self._lock:
+            expense_id = self._next
+            self._next += 1
+            return expense_id
+    
+    def allocate_block(self, count):
+        """Reserve ``count`` consecutive ids and return them as a range."""
+        with self._lock:
+            start = self._next
+            self._next += count
+            return range(start, start + count)
+    
+    def advance(self, last_id):
+        """Make sure newly allocated ids come after ``last_id``."""
+        with self._lock:
+            self._next = max(self._next, last_id + 1)
+    
+    def reset(self, start=1):
+        """Restart allocation from ``start``."""
+        with self._lock:
+            self._next = start
+    
+    def peek(self):
+        """Return the id the next allocation will use."""
+        return self._next
+
+
+ids = IdAllocator()
+
+
+def reset_ids():
+    """Restart id allocation from 1 (used when all expenses are cleared)."""
+    ids.reset()
+
+
+def advance_ids(last_id):
+    """Make sure newly allocated ids come after ``last_id``."""
+    ids.advance(last_id)
+
+
+def use_id_allocator(allocator):
+    """Allocate ids from ``allocator`` from now on.
+    
+    Used in multi-process mode, where the counter must live in storage every
+    worker shares; ``allocator`` needs IdAllocator's methods.
+    """
+    global ids
+    ids = allocator
+
+
+def is_iso_date(value):
+    """Return True for a valid zero-padded YYYY-MM-DD date string."""
+    if not isinstance(value, str) or len(value) != 10 or value[4] != '-' or value[7] != '-':
+        return False
+    try:
+        datetime.fromisoformat(value)
+    except ValueError:
+        return False
+    return True
+
+
+def parse_expense_fields(amount, category, description, date=None):
+    """Validate raw expense fields from a form or API request.
+    
+    Returns ``(amount, category, description, date)`` with the amount as a
+    float and a missing date as None. Raises ValueError carrying the
+    user-facing message for the first rule the fields break.
+    """
+    if amount is None or amount == '' or not category or not description:
+        raise ValueError('All fields are required!')
+    if not isinstance(category, str) or not isinstance(description, str):
+        raise ValueError('Category and description must be text!')
+    if isinstance(amount, bool):
+        # JSON true/false would otherwise pass as 1.0 and 0.0.
+        raise ValueError('Invalid amount! Please enter a valid number.')
+    try:
+        amount = float(amount)
+    except (TypeError, ValueError, OverflowError):
+        raise ValueError('Invalid amount! Please enter a valid number.') from None
+    if not isfinite(amount):
+        # nan and inf parse as floats but would poison every running total.
+        raise ValueError('Invalid amount! Please enter a valid number.')
+    if amount <= 0:
+        raise ValueError('Amount must be greater than zero!')
+    if date and not is_iso_date(date):
+        raise ValueError('Invalid date! Please use YYYY-MM-DD.')
+    return amount, category, description, date or None
+
+
+class Expense:
+    """Represents a single expense entry.
+    
+    Expenses are never edited after creation, so ``to_json`` keeps the
+    encoded form of each one after its first use.
+    """
+    
+    __slots__ = ('id', 'amount', 'category', 'description', 'date', '_json')
+    
+    def __init__(self, amount, category, description, date=None, expense_id=None):
+        self.id = expense_id if expense_id else ids.allocate()
+        self.amount = float(amount)
+        self.category = category
+        self.description = description
+        self.date = date if date else datetime.now().strftime('%Y-%m-%d')
+    
+    def to_dict(self):
+        """Convert expense to dictionary."""
+        return {
+            'id': self.id,
+            'amount': self.amount,
+            'category': self.category,
+            'description': self.description,
+            'date': self.date
+        }
+    
+    def to_json(self):
+        """Return the expense as encoded JSON bytes, cached after the first call.
+        
+        The fixed shape is formatted directly, byte for byte as ``jsonify``
+        writes ``to_dict()`` but several times faster than encoding the dict.
+        """
+        try:
+            return self._json
+        except AttributeError:
+            pass
+        if isfinite(self.amount):
+            encoded = (_ROW_JSON % (self.amount, encode_basestring_ascii(self.category),
+                                    encode_basestring_ascii(self.date),
+                                    encode_basestring_ascii(self.description), self.id))
+        else:
+            encoded = json.dumps(self.to_dict(), separators=(',', ':'), sort_keys=True)
+        self._json = encoded.encode('ascii')
+        return self._json
+
+
+def new_expenses(fields):
+    """Build expenses from validated field tuples, allocating their ids as one block.
+    
+    ``fields`` holds ``(amount, category, description, date)`` tuples as
+    returned by ``parse_expense_fields``; rows without a date get today's.
+    """
+    today = datetime.now().strftime('%Y-%m-%d')
+    return [Expense(amount, category, description, day or today, expense_id=expense_id)
+            for (amount, category, description, day), expense_id
+            in zip(fields, ids.allocate_block(len(fields)))]
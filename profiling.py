@@ -0,0 +1,142 @@
+"""
+Request Profiling
+Opt-in cProfile runs of single requests, chosen by a request header or a
+sampling rate, saved to a directory or returned as a text attachment.
+"""
+
+import cProfile
+import hmac
+import io
+import os
+import pstats
+import random
+import threading
+import time
+
+from werkzeug.exceptions import HTTPException
+
+# Functions listed in an attachment report, by cumulative time
+REPORT_LINES = 40
+
+
+class RequestProfiler:
+    """WSGI middleware that profiles the requests it is asked to.
+
+    A request is profiled when it carries ``header`` (with ``token`` as its
+    value, if one is set) or, independently, with probability
+    ``sample_rate``. Profiling covers the whole body, so streamed responses
+    are buffered while profiled.
+
+    With ``directory`` set, stats go to ``<route>-<rows>rows-<time>.prof``
+    there, loadable with ``pstats``, and the response carries the path in
+    ``X-Profile-File``. Without it, a requested profile replaces the body
+    with a text report as an attachment; sampled requests always need a
+    directory, since their clients did not ask for a report.
+
+    Only one request is profiled at a time: cProfile can be active once
+    per process on newer Pythons, and a request arriving meanwhile is served
+    unprofiled.
+    """
+
+    def __init__(self, wsgi_app, url_map, store, header='', token='', sample_rate=0.0,
+                 directory=''):
+        if not 0.0 <= sample_rate <= 1.0:
+            raise ValueError('PROFILE_SAMPLE_RATE must be between 0 and 1')
+        if sample_rate and not directory:
+            raise ValueError('PROFILE_SAMPLE_RATE requires PROFILE_DIR')
+        self.wsgi_app = wsgi_app
+        self.url_map = url_map
+        self.store = store
+        self.environ_key = 'HTTP_' + header.upper().replace('-', '_') if header else None
+        # WSGI header values are latin-1 decoded bytes; compare them as bytes
+        self.token = token.encode('utf-8')
+        self.sample_rate = sample_rate
+        self.directory = directory
+        self._lock = threading.Lock()
+
+    def __call__(self, environ, start_response):
+        if not self._wanted(environ) or not self._lock.acquire(blocking=False):
+            return self.wsgi_app(environ, start_response)
+        try:
+            return self._profile(environ, start_response)
+        finally:
+            self._lock.release()
+
+    def _wanted(self, environ):
+        if self.environ_key is not None:
+            value = environ.get(self.environ_key)
+            if value is not None and (not self.token or hmac.compare_digest(
+                    value.encode('latin-1'), self.token)):
+                return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def _route(self, environ):
+        try:
+            return self.url_map.bind_to_environ(environ).match()[0]
+        except HTTPException:
+            return 'unmatched'
+
+    def _profile(self, environ, start_response):
+        captured = []
+        chunks = []
+
+        def capture(status, headers, exc_info=None):
+            captured[:] = [status, headers]
+            return chunks.append
+
+        profile = cProfile.Profile()
+        started = time.perf_counter()
+        profile.enable()
+        try:
+            body = self.wsgi_app(environ, capture)
+            try:
+                chunks.extend(body)
+            finally:
+                if hasattr(body, 'close'):
+                    body.close()
+        finally:
+            profile.disable()
+        elapsed = time.perf_counter() - started
+        status, headers = captured
+        route = self._route(environ)
+        rows = len(self.store)
+        name = f'{route}-{rows}rows-{time.time_ns()}'
+
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+            path = os.path.join(self.directory, name + '.prof')
+            profile.dump_stats(path)
+            start_response(status, headers + [('X-Profile-File', path)])
+            return chunks
+
+        report = io.StringIO()
+        query = environ.get('QUERY_STRING')
+        report.write(f'Route: {route} ({environ["REQUEST_METHOD"]} '
+                     f'{environ.get("PATH_INFO", "/")}{"?" + query if query else ""})\n'
+                     f'Status: {status}\n'
+                     f'Store rows: {rows}\n'
+                     f'Elapsed: {elapsed * 1000:.2f} ms\n\n')
+        pstats.Stats(profile, stream=report).sort_stats('cumulative').print_stats(REPORT_LINES)
+        data = report.getvalue().encode('utf-8')
+        start_response('200 OK', [
+            ('Content-Type', 'text/plain; charset=utf-8'),
+            ('Content-Length', str(len(data))),
+            ('Content-Disposition', f'attachment; filename="{name}.txt"'),
+            ('X-Profiled-Status', status),
+        ])
+        return [data]
+
+
+def open_profiler(config, wsgi_app, url_map, store):
+    """Wrap ``wsgi_app`` in the profiler the config asks for, or return None.
+
+    Profiling is off unless ``PROFILE_HEADER`` or ``PROFILE_SAMPLE_RATE`` is
+    set, and then nothing wraps the app, so requests pay nothing for it.
+    """
+    header = config.get('PROFILE_HEADER', '')
+    sample_rate = float(config.get('PROFILE_SAMPLE_RATE', 0.0))
+    if not header and not sample_rate:
+        return None
+    return RequestProfiler(wsgi_app, url_map, store, header=header,
+                           token=config.get('PROFILE_TOKEN', ''), sample_rate=sample_rate,
+                           directory=config.get('PROFILE_DIR', ''))
@@ -0,0 +1,97 @@
+"""
+Render Cache
+Size-capped LRU cache for rendered HTML fragments (and other derived bodies,
+such as compressed responses), with hit and render-time statistics for
+sizing it.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+
+class RenderCache:
+    """LRU mapping of keys to rendered strings, bounded by entries and bytes.
+
+    ``get_or_render`` returns the cached string for a key or calls the
+    render function, timing it, and stores the result. Entries are charged
+    their UTF-8 size; the least recently used ones are evicted once either
+    limit is exceeded, and a result larger than ``max_bytes`` is returned
+    without being cached. Concurrent misses on the same key may both
+    render; the last one stored wins, which is harmless for pure renders.
+
+    ``get`` and ``put`` do the two halves separately, for values produced
+    somewhere a render function cannot wrap; ``put`` takes the size to
+    charge, so values need not be strings.
+    """
+
+    def __init__(self, max_entries=64, max_bytes=32 * 2**20):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.render_seconds = 0.0
+
+    def get_or_render(self, key, render):
+        """Return the cached value for ``key``, rendering and caching it on a miss."""
+        value = self.get(key)
+        if value is not None:
+            return value
+        started = time.perf_counter()
+        value = render()
+        self.put(key, value, len(value.encode('utf-8')), time.perf_counter() - started)
+        return value
+
+    def get(self, key):
+        """Return the cached value for ``key`` or None, counting a hit or miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+            return None
+
+    def put(self, key, value, size, seconds=0.0):
+        """Cache ``value`` charged ``size`` bytes, recording ``seconds`` spent producing it."""
+        with self._lock:
+            self.render_seconds += seconds
+            if size > self.max_bytes:
+                return
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._entries[key] = (value, size)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._bytes -= evicted
+                self.evictions += 1
+
+    def clear(self):
+        """Drop every entry; statistics are kept."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        """Return a JSON-ready dict of size, hit and render-time statistics."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'render_ms_total': self.render_seconds * 1000,
+                'render_ms_avg': self.render_seconds * 1000 / self.misses if self.misses else 0.0,
+            }
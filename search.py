@@ -0,0 +1,139 @@
+"""
+Expense Search
+Inverted index over tokenized expense descriptions, with prefix matching,
+shared by the in-memory stores.
+"""
+
+import re
+from bisect import bisect_left, bisect_right
+from datetime import date
+from heapq import merge
+
+TOKEN = re.compile(r'\w+')
+
+
+def tokenize(text):
+    """Return the distinct lower-cased word tokens of ``text``, in order."""
+    return list(dict.fromkeys(TOKEN.findall(text.lower())))
+
+
+class SearchIndex:
+    """Maps description tokens to sorted id postings.
+
+    Terms are kept in a sorted list so a prefix query bisects to the
+    matching run. New terms first go to a small pending list that queries
+    scan directly, and are merged into the sorted list in batches, keeping
+    adds cheap. Deletes only count stale postings; queries re-check every
+    candidate against the live row, and the owner rebuilds the index once
+    ``stale`` grows past the live row count.
+
+    Mutations happen under the owning store's lock. Readers take no lock:
+    the term list is replaced rather than reordered, and postings are
+    walked with a monotonic id check, so a concurrent insert can at worst
+    be missed.
+    """
+
+    merge_min = 1024
+
+    def __init__(self):
+        self._postings = {}
+        self._terms = []
+        self._pending = []
+        self.stale = 0
+
+    def add(self, expense_id, text):
+        """Index ``text`` under ``expense_id``."""
+        for token in tokenize(text):
+            postings = self._postings.get(token)
+            if postings is None:
+                self._postings[token] = [expense_id]
+                self._pending.append(token)
+            elif postings[-1] < expense_id:
+                postings.append(expense_id)
+            else:
+                position = bisect_left(postings, expense_id)
+                if position == len(postings) or postings[position] != expense_id:
+                    postings.insert(position, expense_id)
+        if len(self._pending) > max(self.merge_min, len(self._terms) // 64):
+            # Two sorted runs: timsort merges them in linear time.
+            self._terms = sorted(self._terms + sorted(self._pending))
+            self._pending = []
+
+    def discard(self):
+        """Note that one indexed row was deleted."""
+        self.stale += 1
+
+    def terms(self, prefix):
+        """Return the indexed terms starting with ``prefix``."""
+        terms = self._terms
+        low = bisect_left(terms, prefix)
+        high = bisect_right(terms, prefix + '\U0010ffff', low)
+        return terms[low:high] + [t for t in list(self._pending) if t.startswith(prefix)]
+
+    def count(self, prefix, cap=100_000):
+        """Return the posting count for ``prefix``, stopping early past ``cap``."""
+        total = 0
+        for term in self.terms(prefix):
+            total += len(self._postings[term])
+            if total > cap:
+                break
+        return total
+
+    def candidates(self, prefix, after_id=0):
+        """Yield ids above ``after_id`` posted under any term with ``prefix``, ascending."""
+        runs = [_walk(self._postings[term], after_id) for term in self.terms(prefix)]
+        last = after_id
+        for expense_id in merge(*runs):
+            if expense_id > last:
+                last = expense_id
+                yield expense_id
+
+
+def _walk(postings, after_id):
+    # Walk by position instead of copying; long postings would cost more
+    # to slice than the few entries a limited query reads.
+    for position in range(bisect_right(postings, after_id), len(postings)):
+        yield postings[position]
+
+
+def matches(text, prefixes):
+    """True if every query prefix starts some token of ``text``."""
+    tokens = tokenize(text)
+    return all(any(token.startswith(prefix) for token in tokens) for prefix in prefixes)
+
+
+def _word_starts(prefixes):
+    # Same test as ``matches`` without re-tokenizing each candidate: a
+    # prefix starts a token exactly where no word character precedes it.
+    return [re.compile(r'(?<!\w)' + re.escape(prefix)).search for prefix in prefixes]
+
+
+def run_search(index, get, query, after_id=0, limit=50, category=None, first=None, last=None):
+    """Return up to ``limit`` expenses matching ``query`` with ids above ``after_id``.
+
+    Every query token must prefix-match a description token. Candidates
+    come from the rarest query token's postings and are checked against
+    the live row, which also applies the category and date ordinal filters.
+    """
+    prefixes = tokenize(query)
+    if not prefixes:
+        return []
+    first = date.fromordinal(first).isoformat() if first is not None else None
+    last = date.fromordinal(last).isoformat() if last is not None else None
+    rarest = min(prefixes, key=index.count)
+    word_starts = _word_starts(prefixes)
+    results = []
+    for expense_id in index.candidates(rarest, after_id):
+        expense = get(expense_id)
+        if (expense is None
+                or (category is not None and expense.category != category)
+                or (first is not None and expense.date < first)
+                or (last is not None and expense.date > last)):
+            continue
+        description = expense.description.lower()
+        if not all(search(description) for search in word_starts):
+            continue
+        results.append(expense)
+        if len(results) >= limit:
+            break
+    return results
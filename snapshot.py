@@ -0,0 +1,198 @@
+"""
+Expense Snapshots
+Versioned, fixed-width binary snapshot format for expenses that can be
+memory-mapped and served without parsing.
+
+Layout (little-endian, sections padded to 8 bytes)::
+
+    header      magic 'EXPSNAP\\0', version u32, category count u32,
+                row count u64, description blob size u64
+    categories  per category: row count u64, amount sum f64,
+                name length u32, UTF-8 name
+    ids         i64[rows]
+    amounts     f64[rows]
+    dates       i32[rows]     (date ordinals)
+    codes       u16[rows]     (index into the category table)
+    offsets     u64[rows + 1] (description start offsets into the blob)
+    blob        UTF-8 descriptions
+"""
+
+import mmap
+import os
+import struct
+import sys
+from array import array
+from collections import namedtuple
+from datetime import date
+
+from models import Expense
+
+MAGIC = b'EXPSNAP\0'
+VERSION = 1
+HEADER = struct.Struct('<8sIIQQ')
+CATEGORY = struct.Struct('<QdI')
+
+SnapshotColumns = namedtuple(
+    'SnapshotColumns', 'ids amounts dates codes descriptions category_names')
+
+
+class SnapshotError(ValueError):
+    """Raised when a file is not a readable expense snapshot."""
+
+
+def _pad(size):
+    return -size % 8
+
+
+class StringTable:
+    """Strings decoded on access from a mapped blob, with appends kept aside.
+
+    The mapped part is read-only; appended strings live in a plain list so
+    new rows never force the whole table to be decoded.
+    """
+
+    def __init__(self, offsets, blob):
+        self._offsets = offsets
+        self._blob = blob
+        self._mapped = len(offsets) - 1
+        self._appended = []
+
+    def __len__(self):
+        return self._mapped + len(self._appended)
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        if index >= self._mapped:
+            return self._appended[index - self._mapped]
+        start, end = self._offsets[index], self._offsets[index + 1]
+        return str(self._blob[start:end], 'utf-8')
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+    def append(self, value):
+        self._appended.append(value)
+
+
+def capture(store):
+    """Copy the live rows of ``store`` into SnapshotColumns."""
+    if hasattr(store, 'snapshot_columns'):
+        return store.snapshot_columns()
+    names, codes_by_name = [], {}
+    ids, amounts, dates, codes = array('q'), array('d'), array('i'), array('H')
+    descriptions = []
+    for expense in store:
+        code = codes_by_name.get(expense.category)
+        if code is None:
+            code = codes_by_name[expense.category] = len(names)
+            names.append(expense.category)
+        ids.append(expense.id)
+        amounts.append(expense.amount)
+        dates.append(date.fromisoformat(expense.date).toordinal())
+        codes.append(code)
+        descriptions.append(expense.description)
+    return SnapshotColumns(ids, amounts, dates, codes, descriptions, names)
+
+
+def write_snapshot(path, columns):
+    """Write SnapshotColumns to ``path`` atomically (temp file, fsync, rename)."""
+    counts = [0] * len(columns.category_names)
+    sums = [0.0] * len(columns.category_names)
+    for code, amount in zip(columns.codes, columns.amounts):
+        counts[code] += 1
+        sums[code] += amount
+
+    offsets = array('Q', [0])
+    chunks = []
+    for description in columns.descriptions:
+        encoded = description.encode('utf-8')
+        chunks.append(encoded)
+        offsets.append(offsets[-1] + len(encoded))
+    blob = b''.join(chunks)
+
+    def native(values, typecode):
+        values = array(typecode, values)
+        if sys.byteorder != 'little':
+            values.byteswap()
+        return values.tobytes()
+
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as f:
+        def section(data):
+            f.write(data)
+            f.write(b'\0' * _pad(len(data)))
+
+        f.write(HEADER.pack(MAGIC, VERSION, len(columns.category_names),
+                            len(columns.ids), len(blob)))
+        table = bytearray()
+        for name, count, total in zip(columns.category_names, counts, sums):
+            encoded = name.encode('utf-8')
+            table += CATEGORY.pack(count, total, len(encoded)) + encoded
+        section(bytes(table))
+        section(native(columns.ids, 'q'))
+        section(native(columns.amounts, 'd'))
+        section(native(columns.dates, 'i'))
+        section(native(columns.codes, 'H'))
+        section(native(offsets, 'Q'))
+        f.write(blob)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+class MappedSnapshot:
+    """A snapshot file mapped into memory, exposing zero-copy columns."""
+
+    def __init__(self, path):
+        if sys.byteorder != 'little':
+            raise SnapshotError('Mapped snapshots require a little-endian host')
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self._map)
+        if len(view) < HEADER.size:
+            raise SnapshotError(f'{path} is too short to be a snapshot')
+        magic, version, category_count, rows, blob_size = HEADER.unpack_from(view)
+        if magic != MAGIC:
+            raise SnapshotError(f'{path} is not an expense snapshot')
+        if version != VERSION:
+            raise SnapshotError(f'Unsupported snapshot version {version} in {path}')
+
+        pos = HEADER.size
+        self.category_names, self.category_counts, self.category_sums = [], [], []
+        table_start = pos
+        for _ in range(category_count):
+            count, total, size = CATEGORY.unpack_from(view, pos)
+            pos += CATEGORY.size
+            self.category_names.append(str(view[pos:pos + size], 'utf-8'))
+            self.category_counts.append(count)
+            self.category_sums.append(total)
+            pos += size
+        pos += _pad(pos - table_start)
+
+        def column(typecode, count):
+            nonlocal pos
+            size = struct.calcsize(typecode) * count
+            if pos + size > len(view):
+                raise SnapshotError(f'{path} is truncated')
+            col = view[pos:pos + size].cast(typecode)
+            pos += size + _pad(size)
+            return col
+
+        self.ids = column('q', rows)
+        self.amounts = column('d', rows)
+        self.dates = column('i', rows)
+        self.codes = column('H', rows)
+        offsets = column('Q', rows + 1)
+        if pos + blob_size > len(view):
+            raise SnapshotError(f'{path} is truncated')
+        self.descriptions = StringTable(offsets, view[pos:pos + blob_size])
+        self.rows = rows
+
+    def __iter__(self):
+        """Yield Expense objects for every row."""
+        names, descriptions = self.category_names, self.descriptions
+        for row in range(self.rows):
+            yield Expense(self.amounts[row], names[self.codes[row]], descriptions[row],
+                          date.fromordinal(self.dates[row]).isoformat(),
+                          expense_id=self.ids[row])
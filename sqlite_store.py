@@ -0,0 +1,548 @@
+"""
+SQLite Expense Store
+Persistent expense storage backed by SQLite in WAL mode, with one
+connection per thread. Several processes can share one database file.
+"""
+
+import os
+import sqlite3
+import threading
+import weakref
+from array import array
+from datetime import date
+
+from analytics import AnalyticsColumns
+from models import MAX_EXPENSE_ID, Expense, advance_ids
+from search import tokenize
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS expenses (
+    id INTEGER PRIMARY KEY,
+    amount REAL NOT NULL,
+    category TEXT NOT NULL,
+    description TEXT NOT NULL,
+    date TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_expenses_category ON expenses (category);
+CREATE INDEX IF NOT EXISTS idx_expenses_date ON expenses (date);
+
+CREATE TABLE IF NOT EXISTS category_totals (
+    category TEXT PRIMARY KEY,
+    count INTEGER NOT NULL,
+    total REAL NOT NULL
+);
+CREATE TRIGGER IF NOT EXISTS trg_expenses_insert AFTER INSERT ON expenses
+BEGIN
+    INSERT INTO category_totals (category, count, total)
+    VALUES (NEW.category, 1, NEW.amount)
+    ON CONFLICT (category) DO UPDATE
+    SET count = count + 1, total = total + NEW.amount;
+END;
+CREATE TRIGGER IF NOT EXISTS trg_expenses_delete AFTER DELETE ON expenses
+BEGIN
+    UPDATE category_totals SET count = count - 1, total = total - OLD.amount
+    WHERE category = OLD.category;
+    DELETE FROM category_totals WHERE category = OLD.category AND count = 0;
+END;
+
+-- Day and month rollups per category, maintained like category_totals.
+CREATE TABLE IF NOT EXISTS daily_totals (
+    day TEXT NOT NULL,
+    category TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    total REAL NOT NULL,
+    PRIMARY KEY (day, category)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS monthly_totals (
+    month TEXT NOT NULL,
+    category TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    total REAL NOT NULL,
+    PRIMARY KEY (month, category)
+) WITHOUT ROWID;
+CREATE TRIGGER IF NOT EXISTS trg_expenses_rollup_insert AFTER INSERT ON expenses
+BEGIN
+    INSERT INTO daily_totals (day, category, count, total)
+    VALUES (NEW.date, NEW.category, 1, NEW.amount)
+    ON CONFLICT (day, category) DO UPDATE
+    SET count = count + 1, total = total + NEW.amount;
+    INSERT INTO monthly_totals (month, category, count, total)
+    VALUES (substr(NEW.date, 1, 7), NEW.category, 1, NEW.amount)
+    ON CONFLICT (month, category) DO UPDATE
+    SET count = count + 1, total = total + NEW.amount;
+END;
+CREATE TRIGGER IF NOT EXISTS trg_expenses_rollup_delete AFTER DELETE ON expenses
+BEGIN
+    UPDATE daily_totals SET count = count - 1, total = total - OLD.amount
+    WHERE day = OLD.date AND category = OLD.category;
+    DELETE FROM daily_totals WHERE day = OLD.date AND category = OLD.category AND count = 0;
+    UPDATE monthly_totals SET count = count - 1, total = total - OLD.amount
+    WHERE month = substr(OLD.date, 1, 7) AND category = OLD.category;
+    DELETE FROM monthly_totals
+    WHERE month = substr(OLD.date, 1, 7) AND category = OLD.category AND count = 0;
+END;
+
+-- Full-text index over descriptions; external content, so the text is
+-- stored once in expenses and the triggers keep the index in step.
+-- Two- and three-letter prefixes are indexed too, so short search-as-you-
+-- type queries don't have to merge every term they prefix.
+CREATE VIRTUAL TABLE IF NOT EXISTS expenses_fts USING fts5 (
+    description, content = 'expenses', content_rowid = 'id',
+    tokenize = 'unicode61 remove_diacritics 0', prefix = '2 3'
+);
+CREATE TRIGGER IF NOT EXISTS trg_expenses_fts_insert AFTER INSERT ON expenses
+BEGIN
+    INSERT INTO expenses_fts (rowid, description) VALUES (NEW.id, NEW.description);
+END;
+CREATE TRIGGER IF NOT EXISTS trg_expenses_fts_delete AFTER DELETE ON expenses
+BEGIN
+    INSERT INTO expenses_fts (expenses_fts, rowid, description)
+    VALUES ('delete', OLD.id, OLD.description);
+END;
+
+CREATE TABLE IF NOT EXISTS store_meta (
+    key TEXT PRIMARY KEY,
+    value
+);
+INSERT OR IGNORE INTO store_meta (key, value) VALUES ('version', 0);
+INSERT OR IGNORE INTO store_meta (key, value) VALUES ('epoch', lower(hex(randomblob(4))));
+INSERT OR IGNORE INTO store_meta (key, value)
+SELECT 'next_id', COALESCE(MAX(id), 0) + 1 FROM expenses;
+"""
+
+# Statements are module constants so each connection's statement cache
+# reuses the prepared form instead of re-parsing them.
+COLUMNS = 'id, amount, category, description, date'
+INSERT = f'INSERT INTO expenses ({COLUMNS}) VALUES (?, ?, ?, ?, ?)'
+SELECT_BY_ID = f'SELECT {COLUMNS} FROM expenses WHERE id = ?'
+SELECT_PAGE = f'SELECT {COLUMNS} FROM expenses WHERE id > ? ORDER BY id LIMIT ?'
+SELECT_CATEGORY_PAGE = (f'SELECT {COLUMNS} FROM expenses WHERE category = ? AND id > ? '
+                        'ORDER BY id LIMIT ?')
+SELECT_CATEGORY = f'SELECT {COLUMNS} FROM expenses WHERE category = ? ORDER BY id'
+SELECT_DATES = (f'SELECT {COLUMNS} FROM expenses WHERE date >= ? AND date <= ? '
+                'ORDER BY date, id')
+SELECT_CATEGORY_DATES = (f'SELECT {COLUMNS} FROM expenses WHERE category = ? '
+                         'AND date >= ? AND date <= ? ORDER BY date, id')
+RANGE_TOTALS = ('SELECT category, COUNT(*), SUM(amount) FROM expenses WHERE date >= ? AND date <= ? '
+                'GROUP BY category')
+# Driven from the FTS table in rowid order, so a limited search stops after
+# the first matching rows instead of collecting every match first.
+SEARCH = ('SELECT e.id, e.amount, e.category, e.description, e.date '
+          'FROM expenses_fts f JOIN expenses e ON e.id = f.rowid '
+          'WHERE expenses_fts MATCH ? AND f.rowid > ? AND e.date >= ? AND e.date <= ? '
+          'AND (? IS NULL OR e.category = ?) ORDER BY f.rowid LIMIT ?')
+ROLLUPS = {
+    'day': ('SELECT day, category, count, total FROM daily_totals '
+            'WHERE day >= ? AND day <= ? ORDER BY day, category'),
+    'month': ('SELECT month, category, count, total FROM monthly_totals '
+              'WHERE month >= ? AND month <= ? ORDER BY month, category'),
+}
+# julianday('0001-01-01') is 1721425.5 and that date is ordinal 1.
+ANALYTICS_ROWS = ('SELECT amount, category, CAST(julianday(date) - 1721424.5 AS INTEGER) '
+                  'FROM expenses')
+TABLE_NAMES = "SELECT name FROM sqlite_master WHERE type = 'table'"
+REBUILD_FTS = "INSERT INTO expenses_fts (expenses_fts) VALUES ('rebuild')"
+FILL_DAILY_TOTALS = ('INSERT INTO daily_totals SELECT date, category, COUNT(*), SUM(amount) '
+                     'FROM expenses GROUP BY date, category')
+FILL_MONTHLY_TOTALS = ('INSERT INTO monthly_totals SELECT substr(date, 1, 7), category, '
+                       'COUNT(*), SUM(amount) FROM expenses GROUP BY substr(date, 1, 7), category')
+SELECT_AT = f'SELECT {COLUMNS} FROM expenses ORDER BY id LIMIT 1 OFFSET ?'
+DELETE_BY_ID = f'DELETE FROM expenses WHERE id = ? RETURNING {COLUMNS}'
+EXISTS_BY_ID = 'SELECT 1 FROM expenses WHERE id = ?'
+COUNT = 'SELECT COALESCE(SUM(count), 0) FROM category_totals'
+MAX_ID = 'SELECT COALESCE(MAX(id), 0) FROM expenses'
+CATEGORY_TOTALS = 'SELECT category, total FROM category_totals'
+CATEGORY_ROW = 'SELECT count, total FROM category_totals WHERE category = ?'
+SELECT_META = 'SELECT value FROM store_meta WHERE key = ?'
+BUMP_VERSION = "UPDATE store_meta SET value = value + 1 WHERE key = 'version'"
+# The id counter never falls behind the highest stored id, so ids written
+# explicitly, or by a worker that raced a clear, are not handed out again.
+NEXT_ID = "max(value, (SELECT COALESCE(MAX(id), 0) + 1 FROM expenses))"
+ALLOCATE_IDS = f"UPDATE store_meta SET value = {NEXT_ID} + ? WHERE key = 'next_id' RETURNING value"
+PEEK_ID = f"SELECT {NEXT_ID} FROM store_meta WHERE key = 'next_id'"
+ADVANCE_IDS = "UPDATE store_meta SET value = max(value, ?) WHERE key = 'next_id'"
+RESET_IDS = "UPDATE store_meta SET value = ? WHERE key = 'next_id'"
+
+PAGE_SIZE = 1000
+
+# Open stores, so a forked child can drop the connections it inherited.
+_stores = weakref.WeakSet()
+# Connections inherited across fork(), kept referenced so they are never closed
+_inherited = []
+
+
+class _ConnectionHolder:
+    """Holds one thread's connection; freed with the thread's locals when it ends."""
+
+    __slots__ = ('conn', '__weakref__')
+
+    def __init__(self, conn):
+        self.conn = conn
+
+
+def _release(connections, lock, conn):
+    """Close a finished thread's connection, unless ``close()`` already did."""
+    with lock:
+        if connections.pop(conn, None) is None:
+            return
+    conn.close()
+
+
+def _storable(expense_id):
+    """Return whether ``expense_id`` is in the range every store accepts.
+
+    Ids outside it are never stored, and the largest ones cannot even be
+    bound as SQLite integers.
+    """
+    return 0 <= expense_id <= MAX_EXPENSE_ID
+
+
+def _check_ids(expenses):
+    for expense in expenses:
+        if not _storable(expense.id):
+            raise ValueError(f'Expense id out of range: {expense.id}')
+
+
+def _forget_connections():
+    """Give every store fresh connections in a forked child.
+
+    SQLite connections must not cross fork(). The inherited ones are dropped
+    without closing them, since closing could checkpoint or remove the WAL
+    the parent is still using.
+    """
+    for store in list(_stores):
+        for conn, finalizer in store._connections.items():
+            finalizer.detach()
+            _inherited.append(conn)
+        store.lock = threading.RLock()
+        store._local = threading.local()
+        store._connections = {}
+        store._connections_lock = threading.Lock()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_forget_connections)
+
+
+def _date_bounds(first, last):
+    """ISO strings for an inclusive ordinal range; None bounds become open ends."""
+    return (date.fromordinal(first).isoformat() if first is not None else '',
+            date.fromordinal(last).isoformat() if last is not None else '9999-99-99')
+
+
+def _to_expense(row):
+    expense_id, amount, category, description, day = row
+    return Expense(amount, category, description, day, expense_id=expense_id)
+
+
+class SQLiteExpenseStore:
+    """Expense store persisted in a SQLite database.
+
+    The database runs in WAL mode so readers never block the writer. Each
+    thread gets its own connection, created on first use and closed when
+    the thread ends. Per-category counts and sums live in a
+    ``category_totals`` table maintained by triggers, so summaries stay
+    O(#categories); ``daily_totals`` and ``monthly_totals`` do the same
+    for time-series rollups. Rows are returned in id order, which is
+    insertion order for allocated ids.
+
+    SQLite serializes writers itself, so the store needs no Python-level
+    mutation lock; ``lock`` exists only so callers can group a store change
+    with other bookkeeping.
+
+    ``version`` lives in the ``store_meta`` table and is bumped in the same
+    transaction as each mutation, and ``epoch`` is fixed when the database
+    is created, so both are shared by every process using the file.
+
+    Descriptions are searched through an FTS5 ``expenses_fts`` table kept
+    in sync by triggers.
+
+    Processes forked after the store is opened (pre-fork servers) open
+    their own connections on first use. ``id_allocator`` hands out ids from
+    a counter in the database, for workers that add expenses concurrently.
+    """
+
+    def __init__(self, path='expenses.db', timeout=5.0):
+        self.path = path
+        self.timeout = timeout
+        self.lock = threading.RLock()
+        self._local = threading.local()
+        # connection: finalizer that closes it when its thread ends
+        self._connections = {}
+        self._connections_lock = threading.Lock()
+        with self._connection() as conn:
+            # Databases created before the search index or rollups get them
+            # filled once from the existing rows.
+            tables = {name for name, in conn.execute(TABLE_NAMES)}
+            conn.executescript(SCHEMA)
+            if 'expenses_fts' not in tables:
+                conn.execute(REBUILD_FTS)
+            if 'daily_totals' not in tables:
+                conn.execute(FILL_DAILY_TOTALS)
+                conn.execute(FILL_MONTHLY_TOTALS)
+        self.epoch = self._scalar(SELECT_META, ('epoch',))
+        advance_ids(self.max_id())
+        _stores.add(self)
+
+    def _connection(self):
+        """Return this thread's connection, opening it on first use."""
+        holder = getattr(self._local, 'holder', None)
+        if holder is None:
+            # Connections stay thread-affine; check_same_thread is off only so
+            # close() can run from whichever thread shuts the store down.
+            conn = sqlite3.connect(self.path, timeout=self.timeout,
+                                   check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            holder = self._local.holder = _ConnectionHolder(conn)
+            with self._connections_lock:
+                self._connections[conn] = weakref.finalize(
+                    holder, _release, self._connections, self._connections_lock, conn)
+        return holder.conn
+
+    def _scalar(self, sql, params=()):
+        return self._connection().execute(sql, params).fetchone()[0]
+
+    def close(self):
+        """Close every open connection."""
+        with self._connections_lock:
+            for conn, finalizer in self._connections.items():
+                finalizer.detach()
+                conn.close()
+            self._connections.clear()
+        self._local = threading.local()
+
+    def id_allocator(self):
+        """Return an id allocator backed by this database, shared by every process."""
+        return SQLiteIdAllocator(self)
+
+    def add(self, expense):
+        """Store an expense; raise ValueError if its id is already taken."""
+        _check_ids([expense])
+        try:
+            with self._connection() as conn:
+                conn.execute(INSERT, (expense.id, expense.amount, expense.category,
+                                      expense.description, expense.date))
+                conn.execute(BUMP_VERSION)
+        except sqlite3.IntegrityError:
+            raise ValueError(f'Duplicate expense id: {expense.id}') from None
+        return expense
+
+    append = add
+
+    def add_many(self, expenses):
+        """Store several expenses in one transaction, or none if any id is taken."""
+        expenses = list(expenses)
+        if not expenses:
+            return expenses
+        _check_ids(expenses)
+        try:
+            with self._connection() as conn:
+                conn.executemany(INSERT, [(e.id, e.amount, e.category, e.description, e.date)
+                                          for e in expenses])
+                conn.execute(BUMP_VERSION)
+        except sqlite3.IntegrityError:
+            raise ValueError('Duplicate expense id in batch') from None
+        return expenses
+
+    def get(self, expense_id, default=None):
+        """Return the expense with the given id, or ``default``."""
+        if not _storable(expense_id):
+            return default
+        row = self._connection().execute(SELECT_BY_ID, (expense_id,)).fetchone()
+        return _to_expense(row) if row else default
+
+    def delete(self, expense_id):
+        """Remove and return the expense with the given id, or None."""
+        if not _storable(expense_id):
+            return None
+        # One statement, so concurrent deletes of the same id cannot both win.
+        with self._connection() as conn:
+            row = conn.execute(DELETE_BY_ID, (expense_id,)).fetchone()
+            if row:
+                conn.execute(BUMP_VERSION)
+        return _to_expense(row) if row else None
+
+    def clear(self):
+        """Remove all expenses."""
+        with self._connection() as conn:
+            conn.execute('DELETE FROM expenses')
+            conn.execute('DELETE FROM category_totals')
+            conn.execute('DELETE FROM daily_totals')
+            conn.execute('DELETE FROM monthly_totals')
+            conn.execute(BUMP_VERSION)
+
+    @property
+    def version(self):
+        """Number of committed mutations, as recorded in the database."""
+        return self._scalar(SELECT_META, ('version',))
+
+    def by_category(self, category):
+        """Return the expenses in a category, in insertion order."""
+        rows = self._connection().execute(SELECT_CATEGORY, (category,))
+        return [_to_expense(row) for row in rows]
+
+    def category_count(self, category):
+        """Return the number of expenses in a category."""
+        row = self._connection().execute(CATEGORY_ROW, (category,)).fetchone()
+        return row[0] if row else 0
+
+    def category_total(self, category):
+        """Return the summed amount of a category."""
+        row = self._connection().execute(CATEGORY_ROW, (category,)).fetchone()
+        return row[1] if row else 0
+
+    def category_totals(self):
+        """Return a category -> summed amount mapping."""
+        return dict(self._connection().execute(CATEGORY_TOTALS))
+
+    def total(self):
+        """Return the summed amount of all expenses."""
+        return sum(self.category_totals().values())
+
+    def max_id(self):
+        """Return the largest id in the store, or 0 when it is empty."""
+        return self._scalar(MAX_ID)
+
+    def page(self, after_id=0, limit=100, category=None):
+        """Return up to ``limit`` expenses with ids above ``after_id``, in id order.
+
+        With ``category``, the category index (which ends in the rowid)
+        serves the range directly.
+        """
+        if after_id > MAX_EXPENSE_ID:
+            return []
+        if category is None:
+            rows = self._connection().execute(SELECT_PAGE, (after_id, limit))
+        else:
+            rows = self._connection().execute(SELECT_CATEGORY_PAGE, (category, after_id, limit))
+        return [_to_expense(row) for row in rows]
+
+    def date_range(self, first=None, last=None, category=None):
+        """Return expenses dated between ordinals ``first`` and ``last`` inclusive.
+
+        Dates stay ISO text, which sorts like the dates themselves, so the
+        date index serves the range directly.
+        """
+        bounds = _date_bounds(first, last)
+        if category is None:
+            rows = self._connection().execute(SELECT_DATES, bounds)
+        else:
+            rows = self._connection().execute(SELECT_CATEGORY_DATES, (category,) + bounds)
+        return [_to_expense(row) for row in rows]
+
+    def range_summary(self, first=None, last=None):
+        """Return ``(category -> summed amount, count)`` for a date range."""
+        rows = self._connection().execute(RANGE_TOTALS, _date_bounds(first, last)).fetchall()
+        return {category: total for category, _, total in rows}, sum(row[1] for row in rows)
+
+    def rollup(self, granularity, first=None, last=None):
+        """Return ``(period, category, count, total)`` rows per day or month.
+
+        Read from the ``daily_totals``/``monthly_totals`` tables, which
+        triggers keep current like ``category_totals``.
+        """
+        if granularity not in ROLLUPS:
+            raise ValueError(f"granularity must be one of: {', '.join(ROLLUPS)}")
+        low, high = _date_bounds(first, last)
+        if granularity == 'month':
+            low, high = low[:7], high[:7]
+        return self._connection().execute(ROLLUPS[granularity], (low, high)).fetchall()
+
+    def analytics_columns(self):
+        """Return the amount, category code and date ordinal columns for analytics.
+
+        One query with the dates converted to ordinals in SQL, instead of
+        building an Expense per row.
+        """
+        names, codes_by_name = [], {}
+        amounts, codes, dates = array('d'), array('H'), array('i')
+        for amount, category, ordinal in self._connection().execute(ANALYTICS_ROWS):
+            code = codes_by_name.get(category)
+            if code is None:
+                code = codes_by_name[category] = len(names)
+                names.append(category)
+            amounts.append(amount)
+            codes.append(code)
+            dates.append(ordinal)
+        return AnalyticsColumns(amounts, codes, dates, names)
+
+    def search(self, query, after_id=0, limit=50, category=None, first=None, last=None):
+        """Return up to ``limit`` expenses whose descriptions match ``query``, in id order.
+
+        Each query word becomes an FTS5 prefix term, so matching follows
+        the in-memory stores: every word must start a description word.
+        """
+        terms = ' '.join(f'"{token}"*' for token in tokenize(query))
+        if not terms or after_id > MAX_EXPENSE_ID:
+            return []
+        rows = self._connection().execute(
+            SEARCH, (terms, after_id) + _date_bounds(first, last) + (category, category, limit))
+        return [_to_expense(row) for row in rows]
+
+    def __contains__(self, expense_id):
+        if not _storable(expense_id):
+            return False
+        return self._connection().execute(EXISTS_BY_ID, (expense_id,)).fetchone() is not None
+
+    def __len__(self):
+        return self._scalar(COUNT)
+
+    def __iter__(self):
+        # Walk the table a page at a time by id so no cursor stays open
+        # across yields.
+        last_id = 0
+        while True:
+            page = self.page(last_id, PAGE_SIZE)
+            yield from page
+            if len(page) < PAGE_SIZE:
+                return
+            last_id = page[-1].id
+
+    def __getitem__(self, index):
+        """Positional access in id order (kept for list callers)."""
+        if index < 0:
+            index += len(self)
+        row = None
+        if index >= 0:
+            row = self._connection().execute(SELECT_AT, (index,)).fetchone()
+        if row is None:
+            raise IndexError('expense index out of range')
+        return _to_expense(row)
+
+
+class SQLiteIdAllocator:
+    """Hands out expense ids from the ``next_id`` counter in ``store_meta``.
+
+    A drop-in for models.IdAllocator when several processes add expenses to
+    one database: each allocation is a single write transaction, which
+    SQLite serializes across processes, so no two workers receive the same
+    id.
+    """
+
+    def __init__(self, store):
+        self._store = store
+
+    def allocate(self):
+        """Return the next unused id."""
+        return self.allocate_block(1)[0]
+
+    def allocate_block(self, count):
+        """Reserve ``count`` consecutive ids and return them as a range."""
+        with self._store._connection() as conn:
+            end = conn.execute(ALLOCATE_IDS, (count,)).fetchone()[0]
+        return range(end - count, end)
+
+    def advance(self, last_id):
+        """Make sure newly allocated ids come after ``last_id``."""
+        with self._store._connection() as conn:
+            conn.execute(ADVANCE_IDS, (last_id + 1,))
+
+    def reset(self, start=1):
+        """Restart allocation from ``start`` (or past the highest stored id)."""
+        with self._store._connection() as conn:
+            conn.execute(RESET_IDS, (start,))
+
+    def peek(self):
+        """Return the id the next allocation will use."""
+        return self._store._scalar(PEEK_ID)
@@ -0,0 +1,922 @@
+"""
+Expense Store
+Indexed in-memory storage for expenses with constant-time lookup and delete,
+plus running per-category counts and sums, and a columnar variant that keeps
+rows in typed arrays to cut per-row memory. ``create_store`` picks a backend
+by name, including the persistent SQLite store.
+"""
+
+import os
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import date
+from itertools import islice
+
+from analytics import AnalyticsColumns
+from models import CATEGORIES, MAX_EXPENSE_ID, Expense, use_id_allocator
+from search import SearchIndex, run_search
+from snapshot import MappedSnapshot, SnapshotColumns
+from sqlite_store import SQLiteExpenseStore
+
+# Date index keys pack (date ordinal, id) into one int64, so a flat array
+# bisects by date and orders same-day rows by id.
+_ID_BITS = MAX_EXPENSE_ID.bit_length()
+_ID_MASK = (1 << _ID_BITS) - 1
+
+# Rollup periods: ISO days (YYYY-MM-DD) and months (YYYY-MM).
+GRANULARITIES = ('day', 'month')
+
+
+class ExpenseStore:
+    """Holds expenses keyed by id while preserving insertion order.
+
+    The backing dict gives O(1) lookup, delete and existence checks, and
+    because dicts keep insertion order it also serves as the ordered
+    structure used by iteration. The list-style helpers (``append``,
+    ``clear``, ``len`` and positional indexing) keep existing callers
+    working unchanged.
+
+    Per-category rows and sums are maintained on every add, delete and
+    clear, so summaries cost O(#categories) instead of O(#expenses).
+
+    Mutations hold ``lock``. Reads take no lock: each one is a single
+    C-level dict operation or copy, which the GIL makes atomic, so readers
+    never see a half-applied mutation of the structure they read.
+
+    A sorted id list backs keyset pagination. Deleted ids stay in it until
+    they outnumber the live ones and the list is rebuilt, so deletes stay
+    O(1) amortized and ``page`` bisects to the cursor instead of scanning
+    earlier rows. A date index of packed (ordinal, id) keys works the same
+    way for ``date_range`` queries, which cost O(log n + k). The inverted
+    index over descriptions is built on the first ``search`` and maintained
+    from then on, so stores that are never searched pay nothing for it.
+    Day and month totals per category are maintained like the category
+    sums, so ``rollup`` costs O(#periods x #categories).
+
+    ``version`` increases after every successful mutation and ``epoch`` is
+    random per instance, so together they identify the store's contents
+    for conditional GETs, also across restarts.
+    """
+
+    def __init__(self, expenses=None):
+        self.lock = threading.RLock()
+        self.epoch = os.urandom(4).hex()
+        self.version = 0
+        self._rows = {}
+        self._by_category = {}
+        self._category_sums = {}
+        self._id_index = []
+        self._date_index = array('q')
+        self._search = None
+        self._rollups = _Rollups()
+        for expense in expenses or ():
+            self.add(expense)
+
+    def add(self, expense):
+        """Store an expense; raise ValueError if its id is already taken."""
+        key = _date_key(_ordinal(expense.date), expense.id)
+        with self.lock:
+            if expense.id in self._rows:
+                raise ValueError(f'Duplicate expense id: {expense.id}')
+            self._insert(expense, key)
+            self.version += 1
+        return expense
+
+    append = add
+
+    def add_many(self, expenses):
+        """Store several expenses as one change, or none if any id is taken.
+
+        The version is bumped once for the whole batch.
+        """
+        expenses = list(expenses)
+        if not expenses:
+            return expenses
+        keys = [_date_key(_ordinal(expense.date), expense.id) for expense in expenses]
+        with self.lock:
+            _check_new_ids(expenses, self.__contains__)
+            for expense in expenses:
+                self._insert(expense, None)
+            _merge_sorted(self._date_index, keys)
+            self.version += 1
+        return expenses
+
+    def _insert(self, expense, date_key):
+        """Add ``expense``; a None ``date_key`` leaves the date index to the caller."""
+        self._rows[expense.id] = expense
+        _insert_sorted(self._id_index, expense.id)
+        if date_key is not None:
+            _insert_sorted(self._date_index, date_key)
+        if self._search is not None:
+            self._search.add(expense.id, expense.description)
+        self._by_category.setdefault(expense.category, {})[expense.id] = expense
+        self._category_sums[expense.category] = (
+            self._category_sums.get(expense.category, 0) + expense.amount
+        )
+        self._rollups.add(expense.date, expense.category, expense.amount)
+
+    def get(self, expense_id, default=None):
+        """Return the expense with the given id, or ``default``."""
+        return self._rows.get(expense_id, default)
+
+    def delete(self, expense_id):
+        """Remove and return the expense with the given id, or None."""
+        with self.lock:
+            expense = self._rows.pop(expense_id, None)
+            if expense is None:
+                return None
+            rows = self._by_category[expense.category]
+            del rows[expense_id]
+            if rows:
+                self._category_sums[expense.category] -= expense.amount
+            else:
+                # Drop empty categories so they vanish from summaries, as before.
+                del self._by_category[expense.category]
+                del self._category_sums[expense.category]
+            self._rollups.remove(expense.date, expense.category, expense.amount)
+            if len(self._id_index) > 2 * len(self._rows) + 1024:
+                # Publish a rebuilt list; readers keep walking the old one.
+                self._id_index = sorted(self._rows)
+            if len(self._date_index) > 2 * len(self._rows) + 1024:
+                self._date_index = array('q', sorted(_date_key(_ordinal(e.date), e.id)
+                                                     for e in self._rows.values()))
+            _discard_search(self, len(self._rows))
+            self.version += 1
+        return expense
+
+    def clear(self):
+        """Remove all expenses."""
+        with self.lock:
+            self._rows.clear()
+            self._by_category.clear()
+            self._category_sums.clear()
+            self._rollups = _Rollups()
+            self._id_index = []
+            self._date_index = array('q')
+            self._search = None
+            self.version += 1
+
+    def page(self, after_id=0, limit=100, category=None):
+        """Return up to ``limit`` expenses with ids above ``after_id``, in id order.
+
+        With ``category``, only that category's expenses are returned; the
+        walk skips other rows, so a full pass stays O(n) overall.
+        """
+        index, rows, page = self._id_index, self._rows, []
+        if category is not None:
+            rows = self._by_category.get(category, {})
+        position = bisect_right(index, after_id)
+        while position < len(index) and len(page) < limit:
+            expense_id = index[position]
+            position += 1
+            # Concurrent out-of-order inserts can shift ids back under us.
+            if expense_id > after_id:
+                expense = rows.get(expense_id)
+                if expense is not None:
+                    page.append(expense)
+                    after_id = expense_id
+        return page
+
+    def date_range(self, first=None, last=None, category=None):
+        """Return expenses dated between ordinals ``first`` and ``last`` inclusive.
+
+        Either bound may be None for an open range. Rows come in date
+        order, then id order, optionally limited to one category.
+        """
+        rows = self._rows if category is None else self._by_category.get(category, {})
+        result, day, iso_day = [], None, None
+        for key in _date_span(self._date_index, first, last):
+            expense = rows.get(key & _ID_MASK)
+            if expense is None:
+                continue
+            if key >> _ID_BITS != day:
+                day = key >> _ID_BITS
+                iso_day = date.fromordinal(day).isoformat()
+            # Keys of deleted (or re-added with another date) rows linger
+            # until the index is rebuilt; compare dates to skip them.
+            if expense.date == iso_day or _ordinal(expense.date) == day:
+                result.append(expense)
+        return result
+
+    def range_summary(self, first=None, last=None):
+        """Return ``(category -> summed amount, count)`` for a date range."""
+        totals, count = {}, 0
+        for expense in self.date_range(first, last):
+            totals[expense.category] = totals.get(expense.category, 0) + expense.amount
+            count += 1
+        return totals, count
+
+    def rollup(self, granularity, first=None, last=None):
+        """Return ``(period, category, count, total)`` rows per day or month.
+
+        ``granularity`` is ``'day'`` (periods ``YYYY-MM-DD``) or ``'month'``
+        (``YYYY-MM``). Rows are sorted by period, then category, and limited
+        to the periods overlapping the date ordinals ``first``..``last``.
+        """
+        return self._rollups.rows(granularity, first, last)
+
+    def search(self, query, after_id=0, limit=50, category=None, first=None, last=None):
+        """Return up to ``limit`` expenses whose descriptions match ``query``, in id order.
+
+        Every word of ``query`` must start a word of the description;
+        ``category`` and the date ordinals ``first``/``last`` narrow the
+        matches further. Pass the last id seen as ``after_id`` to page.
+        """
+        index = self._search
+        if index is None:
+            with self.lock:
+                if self._search is None:
+                    index = SearchIndex()
+                    for expense in self._rows.values():
+                        index.add(expense.id, expense.description)
+                    self._search = index
+                index = self._search
+        return run_search(index, self.get, query, after_id, limit, category, first, last)
+
+    def by_category(self, category):
+        """Return the expenses in a category, in insertion order."""
+        return list(self._by_category.get(category, {}).values())
+
+    def category_count(self, category):
+        """Return the number of expenses in a category."""
+        return len(self._by_category.get(category, ()))
+
+    def category_total(self, category):
+        """Return the summed amount of a category."""
+        return self._category_sums.get(category, 0)
+
+    def category_totals(self):
+        """Return a category -> summed amount mapping."""
+        return dict(self._category_sums)
+
+    def total(self):
+        """Return the summed amount of all expenses."""
+        return sum(self._category_sums.values())
+
+    def max_id(self):
+        """Return the largest id in the store, or 0 when it is empty."""
+        index, rows = self._id_index, self._rows
+        # The index keeps deleted ids until its next rebuild; skip them.
+        for position in range(len(index) - 1, -1, -1):
+            if index[position] in rows:
+                return index[position]
+        return 0
+
+    def __contains__(self, expense_id):
+        return expense_id in self._rows
+
+    def __len__(self):
+        return len(self._rows)
+
+    def __iter__(self):
+        return iter(list(self._rows.values()))
+
+    def __getitem__(self, index):
+        """Positional access in insertion order (O(n); kept for list callers)."""
+        return list(self._rows.values())[index]
+
+
+class _Rollups:
+    """Running (count, total) per (day, category) and (month, category).
+
+    Entries are replaced with new tuples rather than updated in place, so
+    lock-free readers copying the dicts always see consistent pairs.
+    Periods are ISO strings (``YYYY-MM-DD`` and ``YYYY-MM``), which sort
+    like the dates themselves.
+    """
+
+    __slots__ = ('day', 'month')
+
+    def __init__(self):
+        self.day = {}
+        self.month = {}
+
+    def add(self, day, category, amount):
+        for totals, key in ((self.day, (day, category)), (self.month, (day[:7], category))):
+            count, total = totals.get(key, (0, 0))
+            totals[key] = (count + 1, total + amount)
+
+    def remove(self, day, category, amount):
+        for totals, key in ((self.day, (day, category)), (self.month, (day[:7], category))):
+            count, total = totals[key]
+            if count == 1:
+                del totals[key]  # Drop empty periods rather than keep a float residue
+            else:
+                totals[key] = (count - 1, total - amount)
+
+    def rows(self, granularity, first=None, last=None):
+        """Return sorted ``(period, category, count, total)`` rows; see ``rollup``."""
+        _check_granularity(granularity)
+        totals = self.day if granularity == 'day' else self.month
+        low, high = _period_bounds(granularity, first, last)
+        return sorted((period, category, count, total)
+                      for (period, category), (count, total) in list(totals.items())
+                      if low <= period <= high)
+
+
+class _Columns:
+    """One consistent set of column buffers for ColumnarExpenseStore."""
+
+    __slots__ = ('ids', 'amounts', 'codes', 'dates', 'descriptions', 'live')
+
+    def __init__(self, ids=None, amounts=None, codes=None, dates=None,
+                 descriptions=None, live=None):
+        self.ids = array('q') if ids is None else ids
+        self.amounts = array('d') if amounts is None else amounts
+        self.codes = array('H') if codes is None else codes
+        self.dates = array('i') if dates is None else dates
+        self.descriptions = [] if descriptions is None else descriptions
+        self.live = bytearray() if live is None else live
+
+    def select(self, rows):
+        """Return new columns holding only ``rows``, in order."""
+        return _Columns(
+            array('q', (self.ids[row] for row in rows)),
+            array('d', (self.amounts[row] for row in rows)),
+            array('H', (self.codes[row] for row in rows)),
+            array('i', (self.dates[row] for row in rows)),
+            [self.descriptions[row] for row in rows],
+            bytearray(b'\x01') * len(rows),
+        )
+
+
+class ColumnarExpenseStore:
+    """Array-backed expense store that materializes Expense objects on demand.
+
+    Ids and amounts live in ``array('q')``/``array('d')``, categories as
+    small integer codes into ``CATEGORIES`` (unknown categories get new
+    codes), dates as ordinal ints and descriptions in a plain list. Rows are
+    kept sorted by id, which matches insertion order for allocated ids, so
+    lookups bisect the id column instead of holding a per-row dict.
+
+    Deletes only clear a row's live flag; the columns are compacted once
+    dead rows outnumber live ones, keeping delete amortized O(log n).
+    Category counts and sums are kept per code, so totals stay
+    O(#categories); listing a category scans the code column.
+
+    ``load_snapshot`` serves the columns straight from a memory-mapped
+    snapshot file. They are copied into arrays only when rows are added or
+    compacted; mapped descriptions are never copied.
+
+    Mutations hold ``lock``; reads are lock-free. Appends extend the
+    columns in place and set the live flag last, so readers bounded by the
+    live column only see complete rows. Anything that moves rows
+    (compaction, out-of-order inserts, copying mapped columns) builds a new
+    ``_Columns`` and publishes it with a single assignment; readers work
+    from the bundle they started with.
+
+    ``version`` and ``epoch`` identify the contents as in ``ExpenseStore``.
+
+    The date index of packed (ordinal, id) keys, the search index and the
+    day/month rollups are built on the first ``date_range``, ``search`` or
+    ``rollup`` call rather than on load, so mapping a snapshot stays
+    instant; after that they are maintained like ``ExpenseStore``'s.
+    """
+
+    # Dead rows tolerated before compaction is considered.
+    compact_min = 1024
+
+    def __init__(self, expenses=None):
+        self.lock = threading.RLock()
+        self.epoch = os.urandom(4).hex()
+        self.version = 0
+        self._category_names = list(CATEGORIES)
+        self._category_codes = {name: code for code, name in enumerate(CATEGORIES)}
+        self._reset()
+        for expense in expenses or ():
+            self.add(expense)
+
+    def _reset(self):
+        self._cols = _Columns()
+        self._count = 0
+        self._code_counts = [0] * len(self._category_names)
+        self._code_sums = [0.0] * len(self._category_names)
+        self._snapshot = None
+        self._date_index = None
+        self._search = None
+        self._rollups = None
+
+    def load_snapshot(self, path):
+        """Replace the contents with a memory-mapped snapshot, without copying."""
+        snapshot = MappedSnapshot(path)
+        with self.lock:
+            self._category_names = list(snapshot.category_names)
+            self._category_codes = {name: code
+                                    for code, name in enumerate(self._category_names)}
+            self._code_counts = list(snapshot.category_counts)
+            self._code_sums = list(snapshot.category_sums)
+            self._count = snapshot.rows
+            self._snapshot = snapshot
+            self._date_index = None
+            self._search = None
+            self._rollups = None
+            self._cols = _Columns(snapshot.ids, snapshot.amounts, snapshot.codes,
+                                  snapshot.dates, snapshot.descriptions,
+                                  bytearray(b'\x01') * snapshot.rows)
+            self.version += 1
+
+    @property
+    def is_mapped(self):
+        """True while the numeric columns are still served from a snapshot."""
+        return not isinstance(self._cols.ids, array)
+
+    def _writable(self):
+        """Copy mapped columns into arrays before they are modified."""
+        cols = self._cols
+        if self.is_mapped:
+            self._cols = _Columns(
+                _copy_column('q', cols.ids), _copy_column('d', cols.amounts),
+                _copy_column('H', cols.codes), _copy_column('i', cols.dates),
+                cols.descriptions, cols.live)
+        return self._cols
+
+    def snapshot_columns(self):
+        """Return copies of the live rows' columns for writing a snapshot."""
+        with self.lock:
+            cols = self._cols
+            if self._count == len(cols.live):
+                return SnapshotColumns(
+                    _copy_column('q', cols.ids), _copy_column('d', cols.amounts),
+                    _copy_column('i', cols.dates), _copy_column('H', cols.codes),
+                    list(cols.descriptions), list(self._category_names))
+            live = cols.select([row for row in range(len(cols.live)) if cols.live[row]])
+            return SnapshotColumns(live.ids, live.amounts, live.dates, live.codes,
+                                   live.descriptions, list(self._category_names))
+
+    def analytics_columns(self):
+        """Return copies of the live rows' amount, code and date columns for analytics."""
+        with self.lock:
+            cols = self._cols
+            if self._count == len(cols.live):
+                amounts = _copy_column('d', cols.amounts)
+                codes = _copy_column('H', cols.codes)
+                dates = _copy_column('i', cols.dates)
+            else:
+                rows = [row for row in range(len(cols.live)) if cols.live[row]]
+                amounts = array('d', (cols.amounts[row] for row in rows))
+                codes = array('H', (cols.codes[row] for row in rows))
+                dates = array('i', (cols.dates[row] for row in rows))
+            return AnalyticsColumns(amounts, codes, dates, list(self._category_names))
+
+    def _code_for(self, category):
+        code = self._category_codes.get(category)
+        if code is None:
+            code = len(self._category_names)
+            self._code_counts.append(0)
+            self._code_sums.append(0.0)
+            self._category_names.append(category)
+            self._category_codes[category] = code
+        return code
+
+    @staticmethod
+    def _find(cols, expense_id):
+        """Return the row of ``cols`` holding ``expense_id`` (live or dead), or -1."""
+        row = bisect_left(cols.ids, expense_id, 0, len(cols.live))
+        if row < len(cols.live) and cols.ids[row] == expense_id:
+            return row
+        return -1
+
+    def _materialize(self, cols, row):
+        return Expense(
+            cols.amounts[row],
+            self._category_names[cols.codes[row]],
+            cols.descriptions[row],
+            date.fromordinal(cols.dates[row]).isoformat(),
+            expense_id=cols.ids[row],
+        )
+
+    def add(self, expense):
+        """Store an expense; raise ValueError if its id is already taken."""
+        ordinal = _ordinal(expense.date)
+        key = _date_key(ordinal, expense.id)
+        with self.lock:
+            row = self._find(self._cols, expense.id)
+            if row >= 0 and self._cols.live[row]:
+                raise ValueError(f'Duplicate expense id: {expense.id}')
+            self._insert(expense, ordinal, row, key)
+            self.version += 1
+        return expense
+
+    append = add
+
+    def add_many(self, expenses):
+        """Store several expenses as one change, or none if any id is taken.
+
+        The version is bumped once for the whole batch.
+        """
+        expenses = list(expenses)
+        if not expenses:
+            return expenses
+        ordinals = [_ordinal(expense.date) for expense in expenses]
+        keys = [_date_key(ordinal, expense.id) for expense, ordinal in zip(expenses, ordinals)]
+        with self.lock:
+            _check_new_ids(expenses, self.__contains__)
+            for expense, ordinal in zip(expenses, ordinals):
+                self._insert(expense, ordinal, self._find(self._cols, expense.id), None)
+            if self._date_index is not None:
+                _merge_sorted(self._date_index, keys)
+            self.version += 1
+        return expenses
+
+    def _insert(self, expense, ordinal, row, date_key):
+        """Add ``expense`` given its dead row from ``_find``, or -1.
+
+        A None ``date_key`` leaves the date index to the caller.
+        """
+        if self._date_index is not None and date_key is not None:
+            _insert_sorted(self._date_index, date_key)
+        if self._search is not None:
+            self._search.add(expense.id, expense.description)
+        if self._rollups is not None:
+            self._rollups.add(expense.date, expense.category, expense.amount)
+        code = self._code_for(expense.category)
+        cols = self._writable()
+        if row >= 0:
+            # Revive a dead row in place; it already sits at the right
+            # position and stays invisible until its live flag is set.
+            cols.amounts[row] = expense.amount
+            cols.codes[row] = code
+            cols.dates[row] = ordinal
+            self._own_descriptions(cols)[row] = expense.description
+            cols.live[row] = 1
+        elif cols.ids and cols.ids[-1] > expense.id:
+            # Out-of-order id: rebuild so rows stay sorted, then publish.
+            row = bisect_left(cols.ids, expense.id)
+            moved = cols.select(range(len(cols.live)))
+            moved.live = bytearray(cols.live)
+            moved.ids.insert(row, expense.id)
+            moved.amounts.insert(row, expense.amount)
+            moved.codes.insert(row, code)
+            moved.dates.insert(row, ordinal)
+            moved.descriptions.insert(row, expense.description)
+            moved.live.insert(row, 1)
+            self._cols = moved
+        else:
+            cols.ids.append(expense.id)
+            cols.amounts.append(expense.amount)
+            cols.codes.append(code)
+            cols.dates.append(ordinal)
+            cols.descriptions.append(expense.description)
+            cols.live.append(1)
+        self._count += 1
+        self._code_counts[code] += 1
+        self._code_sums[code] += expense.amount
+
+    def get(self, expense_id, default=None):
+        """Return the expense with the given id, or ``default``."""
+        cols = self._cols
+        row = self._find(cols, expense_id)
+        if row < 0 or not cols.live[row]:
+            return default
+        return self._materialize(cols, row)
+
+    def delete(self, expense_id):
+        """Remove and return the expense with the given id, or None."""
+        with self.lock:
+            cols = self._cols
+            row = self._find(cols, expense_id)
+            if row < 0 or not cols.live[row]:
+                return None
+            expense = self._materialize(cols, row)
+            code = cols.codes[row]
+            cols.live[row] = 0
+            if self._rollups is not None:
+                self._rollups.remove(expense.date, expense.category, expense.amount)
+            self._count -= 1
+            self._code_counts[code] -= 1
+            if self._code_counts[code]:
+                self._code_sums[code] -= expense.amount
+            else:
+                self._code_sums[code] = 0.0
+            if len(cols.live) - self._count > max(self._count, self.compact_min):
+                self._cols = cols.select([r for r in range(len(cols.live)) if cols.live[r]])
+            if self._date_index is not None and len(self._date_index) > 2 * self._count + 1024:
+                self._date_index = None  # Rebuilt without the dead keys on next use
+            _discard_search(self, self._count)
+            self.version += 1
+        return expense
+
+    @staticmethod
+    def _own_descriptions(cols):
+        """Decode mapped descriptions into a list for edits other than append."""
+        if not isinstance(cols.descriptions, list):
+            cols.descriptions = list(cols.descriptions)
+        return cols.descriptions
+
+    def clear(self):
+        """Remove all expenses."""
+        with self.lock:
+            self._reset()
+            self.version += 1
+
+    def by_category(self, category):
+        """Return the expenses in a category, in insertion order."""
+        code = self._category_codes.get(category)
+        if code is None or not self._code_counts[code]:
+            return []
+        cols = self._cols
+        codes, live = cols.codes, cols.live
+        return [self._materialize(cols, row) for row in range(len(live))
+                if live[row] and codes[row] == code]
+
+    def _built_date_index(self):
+        index = self._date_index
+        if index is None:
+            with self.lock:
+                if self._date_index is None:
+                    cols = self._cols
+                    ids, dates, live = cols.ids, cols.dates, cols.live
+                    self._date_index = array('q', sorted(
+                        dates[row] << _ID_BITS | ids[row]
+                        for row in range(len(live)) if live[row]))
+                index = self._date_index
+        return index
+
+    def _date_rows(self, first, last, code=None):
+        """Yield ``(cols, row)`` for live rows dated ``first``..``last``, in date order."""
+        keys = _date_span(self._built_date_index(), first, last)
+        cols = self._cols
+        for key in keys:
+            row = self._find(cols, key & _ID_MASK)
+            # Skip keys left by deleted or re-dated rows.
+            if (row >= 0 and cols.live[row] and cols.dates[row] == key >> _ID_BITS
+                    and (code is None or cols.codes[row] == code)):
+                yield cols, row
+
+    def date_range(self, first=None, last=None, category=None):
+        """Return expenses dated between ordinals ``first`` and ``last`` inclusive.
+
+        Either bound may be None for an open range. Rows come in date
+        order, then id order, optionally limited to one category.
+        """
+        code = None
+        if category is not None:
+            code = self._category_codes.get(category)
+            if code is None:
+                return []
+        return [self._materialize(cols, row) for cols, row in self._date_rows(first, last, code)]
+
+    def range_summary(self, first=None, last=None):
+        """Return ``(category -> summed amount, count)`` for a date range."""
+        sums, count = {}, 0
+        for cols, row in self._date_rows(first, last):
+            code = cols.codes[row]
+            sums[code] = sums.get(code, 0) + cols.amounts[row]
+            count += 1
+        return {self._category_names[code]: total for code, total in sums.items()}, count
+
+    def rollup(self, granularity, first=None, last=None):
+        """Return ``(period, category, count, total)`` rows per day or month.
+
+        Same rows as ``ExpenseStore.rollup``.
+        """
+        _check_granularity(granularity)
+        rollups = self._rollups
+        if rollups is None:
+            with self.lock:
+                if self._rollups is None:
+                    rollups = _Rollups()
+                    cols = self._cols
+                    amounts, codes, dates, live = cols.amounts, cols.codes, cols.dates, cols.live
+                    days = {}
+                    for row in range(len(live)):
+                        if live[row]:
+                            ordinal = dates[row]
+                            day = days.get(ordinal)
+                            if day is None:
+                                day = days[ordinal] = date.fromordinal(ordinal).isoformat()
+                            rollups.add(day, self._category_names[codes[row]], amounts[row])
+                    self._rollups = rollups
+                rollups = self._rollups
+        return rollups.rows(granularity, first, last)
+
+    def search(self, query, after_id=0, limit=50, category=None, first=None, last=None):
+        """Return up to ``limit`` expenses whose descriptions match ``query``, in id order.
+
+        Same matching as ``ExpenseStore.search``.
+        """
+        index = self._search
+        if index is None:
+            with self.lock:
+                if self._search is None:
+                    index = SearchIndex()
+                    cols = self._cols
+                    ids, descriptions, live = cols.ids, cols.descriptions, cols.live
+                    for row in range(len(live)):
+                        if live[row]:
+                            index.add(ids[row], descriptions[row])
+                    self._search = index
+                index = self._search
+        return run_search(index, self.get, query, after_id, limit, category, first, last)
+
+    def category_count(self, category):
+        """Return the number of expenses in a category."""
+        code = self._category_codes.get(category)
+        return 0 if code is None else self._code_counts[code]
+
+    def category_total(self, category):
+        """Return the summed amount of a category."""
+        code = self._category_codes.get(category)
+        if code is None or not self._code_counts[code]:
+            return 0
+        return self._code_sums[code]
+
+    def category_totals(self):
+        """Return a category -> summed amount mapping."""
+        counts, sums, names = self._code_counts, self._code_sums, self._category_names
+        return {names[code]: sums[code] for code in range(len(counts)) if counts[code]}
+
+    def total(self):
+        """Return the summed amount of all expenses."""
+        return sum(self._code_sums)
+
+    def max_id(self):
+        """Return the largest id in the store, or 0 when it is empty."""
+        cols = self._cols
+        for row in range(len(cols.live) - 1, -1, -1):
+            if cols.live[row]:
+                return cols.ids[row]
+        return 0
+
+    def __contains__(self, expense_id):
+        cols = self._cols
+        row = self._find(cols, expense_id)
+        return row >= 0 and bool(cols.live[row])
+
+    def __len__(self):
+        return self._count
+
+    def __iter__(self):
+        cols, row, last_id = self._cols, 0, None
+        while True:
+            if cols is not self._cols:
+                # Rows were moved into new columns; resume after the last id yielded.
+                cols = self._cols
+                row = 0 if last_id is None else self._find_after(cols, last_id)
+            if row >= len(cols.live):
+                return
+            if cols.live[row]:
+                last_id = cols.ids[row]
+                yield self._materialize(cols, row)
+            row += 1
+
+    def page(self, after_id=0, limit=100, category=None):
+        """Return up to ``limit`` expenses with ids above ``after_id``, in id order.
+
+        With ``category``, only rows with that category code are returned.
+        """
+        cols, page = self._cols, []
+        code = None
+        if category is not None:
+            code = self._category_codes.get(category)
+            if code is None:
+                return page
+        codes, live = cols.codes, cols.live
+        row = self._find_after(cols, after_id)
+        while row < len(live) and len(page) < limit:
+            if live[row] and (code is None or codes[row] == code):
+                page.append(self._materialize(cols, row))
+            row += 1
+        return page
+
+    @staticmethod
+    def _find_after(cols, expense_id):
+        return bisect_left(cols.ids, expense_id + 1, 0, len(cols.live))
+
+    def __getitem__(self, index):
+        """Positional access in insertion order (O(n); kept for list callers)."""
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError('expense index out of range')
+        return next(islice(iter(self), index, None))
+
+
+def _ordinal(day):
+    return date.fromisoformat(day).toordinal()
+
+
+def _date_key(ordinal, expense_id):
+    """Pack a date ordinal and id into a date index key."""
+    if not 0 <= expense_id <= _ID_MASK:
+        raise ValueError(f'Expense id out of range: {expense_id}')
+    return ordinal << _ID_BITS | expense_id
+
+
+def _date_span(index, first, last):
+    """Return a copy of the keys in ``index`` dated ``first``..``last`` (None: open)."""
+    low = 0 if first is None else bisect_left(index, first << _ID_BITS)
+    high = len(index) if last is None else bisect_left(index, (last + 1) << _ID_BITS)
+    return index[low:high]
+
+
+def _insert_sorted(index, key):
+    """Insert ``key`` into the sorted sequence ``index`` unless already present."""
+    if not index or index[-1] < key:
+        index.append(key)
+        return
+    position = bisect_left(index, key)
+    if position == len(index) or index[position] != key:
+        index.insert(position, key)
+
+
+def _merge_sorted(index, keys):
+    """Merge ``keys`` into the sorted array ``index``, skipping keys already present.
+
+    Inserting a batch key by key moves the tail of the index once per key,
+    which makes back-dated imports quadratic; the tail after the smallest
+    new key is copied once instead, in slices between the new keys.
+    """
+    keys = sorted(keys)
+    if not keys:
+        return
+    start = bisect_left(index, keys[0])
+    if start == len(index):
+        index.extend(keys)
+        return
+    merged = array(index.typecode)
+    previous = start
+    for key in keys:
+        position = bisect_left(index, key, previous)
+        merged.extend(index[previous:position])
+        if position == len(index) or index[position] != key:
+            merged.append(key)
+        previous = position
+    merged.extend(index[previous:])
+    index[start:] = merged
+
+
+def _check_granularity(granularity):
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"granularity must be one of: {', '.join(GRANULARITIES)}")
+
+
+def _period_bounds(granularity, first, last):
+    """ISO period bounds for inclusive date ordinals; None bounds become open ends."""
+    low = date.fromordinal(first).isoformat() if first is not None else ''
+    high = date.fromordinal(last).isoformat() if last is not None else '9999-99-99'
+    if granularity == 'month':
+        low, high = low[:7], high[:7]
+    return low, high
+
+
+def _discard_search(store, live):
+    """Note a deleted row in ``store``'s search index, dropping it once mostly stale."""
+    index = store._search
+    if index is not None:
+        index.discard()
+        if index.stale > max(live, 1024):
+            store._search = None  # Rebuilt from the live rows on next use
+
+
+def _check_new_ids(expenses, exists):
+    """Raise ValueError if any id in ``expenses`` is repeated or already stored."""
+    seen = set()
+    for expense in expenses:
+        if expense.id in seen or exists(expense.id):
+            raise ValueError(f'Duplicate expense id: {expense.id}')
+        seen.add(expense.id)
+
+
+def _copy_column(typecode, column):
+    """Copy an array or mapped column into a new array with one memcpy."""
+    copy = array(typecode)
+    copy.frombytes(memoryview(column).cast('B'))
+    return copy
+
+
+STORES = {
+    'memory': ExpenseStore,
+    'columnar': ColumnarExpenseStore,
+    'sqlite': SQLiteExpenseStore,
+}
+
+
+def create_store(kind='memory', **options):
+    """Create an expense store by configured name."""
+    try:
+        store_class = STORES[kind]
+    except KeyError:
+        raise ValueError(f'Unknown expense store: {kind!r}') from None
+    return store_class(**options)
+
+
+def store_from_config(config):
+    """Create the expense store selected by an app config mapping."""
+    kind = config.get('EXPENSE_STORE', 'memory')
+    options = {}
+    if kind == 'sqlite':
+        options['path'] = config.get('EXPENSE_DB_PATH', 'expenses.db')
+    store = create_store(kind, **options)
+    if config.get('EXPENSE_MULTIPROCESS'):
+        # Every worker must see the same rows, version and id counter.
+        if not hasattr(store, 'id_allocator'):
+            raise ValueError('EXPENSE_MULTIPROCESS requires EXPENSE_STORE=sqlite')
+        use_id_allocator(store.id_allocator())
+    snapshot_path = config.get('EXPENSE_SNAPSHOT_PATH')
+    if snapshot_path and os.path.exists(snapshot_path):
+        if not hasattr(store, 'load_snapshot'):
+            raise ValueError('EXPENSE_SNAPSHOT_PATH requires EXPENSE_STORE=columnar')
+        store.load_snapshot(snapshot_path)
+    return store
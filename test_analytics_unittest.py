@@ -0,0 +1,97 @@
+"""
+Test Suite for Expense Analytics (using unittest)
+Tests the statistics and monthly deltas of both analytics backends.
+Run with: python test_analytics_unittest.py
+"""
+
+import unittest
+from datetime import date
+
+import analytics
+from analytics import analyze, columns
+from models import Expense
+from store import ColumnarExpenseStore, ExpenseStore
+
+
+def sample_store(store_class=ExpenseStore):
+    """Return a store with two categories over three months."""
+    store = store_class()
+    for amount, category, day in ((1.00, 'Other', '2024-01-31'),
+                                  (5.00, 'Other', '2024-02-01'),
+                                  (7.00, 'Other', '2024-02-02'),
+                                  (10.00, 'Shopping', '2024-01-05'),
+                                  (20.00, 'Shopping', '2024-03-01')):
+        store.add(Expense(amount, category, 'Row', date=day))
+    return store
+
+
+class TestAnalyticsPython(unittest.TestCase):
+    """Test the pure-Python analytics backend."""
+    
+    use_numpy = False
+    
+    def analyze(self, store, *bounds):
+        """Analyze a store with this test's backend."""
+        return analyze(columns(store), *bounds, use_numpy=self.use_numpy)
+    
+    def test_statistics(self):
+        """Test per-category statistics use linear percentiles and population std."""
+        other = self.analyze(sample_store())['by_category']['Other']
+        
+        self.assertEqual((other['count'], other['total']), (3, 13.00))
+        self.assertAlmostEqual(other['mean'], 13 / 3)
+        self.assertAlmostEqual(other['median'], 5.00)
+        self.assertAlmostEqual(other['p90'], 6.60)
+        self.assertAlmostEqual(other['p99'], 6.96)
+        self.assertAlmostEqual(other['std'], (((1 - 13 / 3) ** 2 + (5 - 13 / 3) ** 2
+                                                + (7 - 13 / 3) ** 2) / 3) ** 0.5)
+    
+    def test_monthly_deltas(self):
+        """Test every category gets every month, with deltas from the previous one."""
+        shopping = self.analyze(sample_store())['by_category']['Shopping']['monthly']
+        
+        self.assertEqual([(m['month'], m['total'], m['delta']) for m in shopping],
+                         [('2024-01', 10.00, None), ('2024-02', 0.00, -10.00),
+                          ('2024-03', 20.00, 20.00)])
+        self.assertEqual([m['pct_change'] for m in shopping], [None, -1.0, None])
+    
+    def test_date_bounds(self):
+        """Test rows outside the bounds are left out."""
+        result = self.analyze(sample_store(), date(2024, 2, 1).toordinal())
+        
+        self.assertEqual(result['count'], 3)
+        self.assertEqual([m['month'] for m in result['by_category']['Other']['monthly']],
+                         ['2024-02', '2024-03'])
+    
+    def test_empty(self):
+        """Test an empty store has no categories."""
+        self.assertEqual(self.analyze(ExpenseStore())['by_category'], {})
+    
+    def test_columnar_store(self):
+        """Test the columnar store's columns, with a deleted row, give the same result."""
+        memory, columnar = sample_store(), sample_store(ColumnarExpenseStore)
+        memory.delete(memory[1].id)
+        columnar.delete(columnar[1].id)
+        
+        self.assertEqual(self.analyze(columnar), self.analyze(memory))
+
+
+@unittest.skipIf(analytics.np is None, 'NumPy is not installed')
+class TestAnalyticsNumpy(TestAnalyticsPython):
+    """Run the analytics tests against the NumPy backend."""
+    
+    use_numpy = True
+    
+    def test_matches_python(self):
+        """Test both backends agree."""
+        store = sample_store()
+        numpy_result = analyze(columns(store), use_numpy=True)
+        python_result = analyze(columns(store), use_numpy=False)
+        
+        self.assertEqual(numpy_result.pop('backend'), 'numpy')
+        self.assertEqual(python_result.pop('backend'), 'python')
+        self.assertEqual(numpy_result, python_result)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -5,12 +5,25 @@ Run with: python test_app_unittest.py
 """
 
 import unittest
+import csv
+import gzip
+import io
 import json
-from datetime import datetime
+import os
+import tempfile
+import threading
+import zlib
+from datetime import datetime, timedelta
 import sys
+from unittest import mock
+
+from flask.json.provider import DefaultJSONProvider
 
 # Import the Flask app
-from app import app, expenses, Expense, CATEGORIES
+from app import app, expenses, render_cache, compressed_cache, metrics, Expense, CATEGORIES
+import compression
+import fast_json
+from models import MAX_EXPENSE_ID
 
 
 class TestExpenseClass(unittest.TestCase):
@@ -53,6 +66,12 @@ class TestExpenseClass(unittest.TestCase):
         self.assertEqual(expense_dict['date'], '2024-02-01')
         self.assertIn('id', expense_dict)
     
+    def test_expense_has_no_instance_dict(self):
+        """Test that Expense uses __slots__ instead of a per-row __dict__."""
+        expense = Expense(10.00, 'Other', 'Test')
+        
+        self.assertFalse(hasattr(expense, '__dict__'))
+    
     def test_expense_unique_ids(self):
         """Test that each expense gets a unique ID."""
         expense1 = Expense(10.00, 'Food & Dining', 'Coffee')
@@ -149,6 +168,31 @@ class TestRoutes(unittest.TestCase):
         self.assertIn(b'must be greater than zero', response.data)
         self.assertEqual(len(expenses), 0)
     
+    def test_add_expense_non_finite_amount(self):
+        """Test nan and infinite amounts are rejected."""
+        for amount in ('nan', 'inf', '-inf', '1e999'):
+            response = self.client.post('/add', data={
+                'amount': amount,
+                'category': 'Food & Dining',
+                'description': 'Test',
+                'date': '2024-02-09'
+            }, follow_redirects=True)
+            
+            self.assertIn(b'Invalid amount', response.data)
+        self.assertEqual(len(expenses), 0)
+    
+    def test_add_expense_invalid_date(self):
+        """Test adding expense with a malformed date."""
+        response = self.client.post('/add', data={
+            'amount': '10.00',
+            'category': 'Food & Dining',
+            'description': 'Test',
+            'date': '09/02/2024'
+        }, follow_redirects=True)
+        
+        self.assertIn(b'Invalid date', response.data)
+        self.assertEqual(len(expenses), 0)
+    
     def test_delete_expense_success(self):
         """Test deleting an existing expense."""
         sample_expense = Expense(50.00, 'Food & Dining', 'Lunch at restaurant', date='2024-02-09')
@@ -167,6 +211,13 @@ class TestRoutes(unittest.TestCase):
         
         self.assertIn(b'not found', response.data)
     
+    def test_delete_expense_id_beyond_64_bits(self):
+        """Test deleting an id no store can hold reports it as not found."""
+        response = self.client.post(f'/delete/{2**64}', follow_redirects=True)
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'not found', response.data)
+    
     def test_filter_by_category(self):
         """Test filtering expenses by category."""
         # Add multiple expenses
@@ -192,6 +243,34 @@ class TestRoutes(unittest.TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertIn(b'All expenses cleared', response.data)
         self.assertEqual(len(expenses), 0)
+    
+    def test_clear_does_not_reuse_ids(self):
+        """Test an add that allocated its id before a clear cannot collide after it."""
+        self.client.post('/clear')
+        in_flight = Expense(5.00, 'Other', 'Allocated before clear')
+        self.client.post('/clear')
+        expenses.add(in_flight)
+        
+        response = self.client.post('/add', data={
+            'amount': '7.50',
+            'category': 'Other',
+            'description': 'Added after clear'
+        }, follow_redirects=True)
+        
+        self.assertIn(b'added successfully', response.data)
+        self.assertEqual(len(expenses), 2)
+    
+    def test_add_expense_store_error(self):
+        """Test a store error is not reported as an invalid amount."""
+        with mock.patch.object(expenses, 'add', side_effect=ValueError('Duplicate expense id: 1')):
+            response = self.client.post('/add', data={
+                'amount': '7.50',
+                'category': 'Other',
+                'description': 'Rejected by the store'
+            }, follow_redirects=True)
+        
+        self.assertIn(b'Duplicate expense id: 1', response.data)
+        self.assertNotIn(b'Invalid amount', response.data)
 
 
 class TestAPI(unittest.TestCase):
@@ -249,6 +328,20 @@ class TestAPI(unittest.TestCase):
         self.assertEqual(data['by_category']['Food & Dining'], 55.00)
         self.assertEqual(data['by_category']['Shopping'], 100.00)
     
+    def test_get_summary_api_after_delete(self):
+        """Test summary API reflects deleted expenses."""
+        expenses.append(Expense(25.00, 'Food & Dining', 'Breakfast'))
+        shopping = Expense(100.00, 'Shopping', 'Groceries')
+        expenses.append(shopping)
+        
+        self.client.post(f'/delete/{shopping.id}')
+        response = self.client.get('/api/summary')
+        data = json.loads(response.data)
+        
+        self.assertEqual(data['total'], 25.00)
+        self.assertEqual(data['count'], 1)
+        self.assertEqual(data['by_category'], {'Food & Dining': 25.00})
+    
     def test_api_content_type(self):
         """Test API returns JSON content type."""
         response = self.client.get('/api/expenses')
@@ -256,6 +349,980 @@ class TestAPI(unittest.TestCase):
         self.assertIn('application/json', response.content_type)
 
 
+class TestPagination(unittest.TestCase):
+    """Test keyset pagination of /api/expenses."""
+    
+    def setUp(self):
+        """Set up test client and a few expenses."""
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+        expenses.clear()
+        self.rows = [Expense(i + 1, 'Other', f'Row {i}') for i in range(5)]
+        for expense in self.rows:
+            expenses.append(expense)
+    
+    def get(self, query):
+        """GET /api/expenses with a query string and decode the JSON."""
+        response = self.client.get(f'/api/expenses?{query}')
+        return response, json.loads(response.data)
+    
+    def test_walk_pages(self):
+        """Test following next_cursor visits every expense once."""
+        seen, cursor = [], ''
+        while True:
+            response, data = self.get(f'limit=2&cursor={cursor}')
+            self.assertEqual(response.status_code, 200)
+            seen += [e['id'] for e in data['expenses']]
+            cursor = data['next_cursor']
+            if cursor is None:
+                break
+        
+        self.assertEqual(seen, [e.id for e in self.rows])
+    
+    def test_last_page_has_no_cursor(self):
+        """Test an exactly full final page reports no next cursor."""
+        response, data = self.get('limit=5')
+        
+        self.assertEqual(len(data['expenses']), 5)
+        self.assertIsNone(data['next_cursor'])
+    
+    def test_cursor_skips_deleted(self):
+        """Test a page after a deleted row still starts at the next live id."""
+        expenses.delete(self.rows[2].id)
+        
+        response, data = self.get(f'limit=2&cursor={self.rows[1].id}')
+        
+        self.assertEqual([e['id'] for e in data['expenses']], [self.rows[3].id, self.rows[4].id])
+    
+    def test_default_limit(self):
+        """Test a cursor alone uses the default page size."""
+        response, data = self.get('cursor=0')
+        
+        self.assertEqual(len(data['expenses']), 5)
+    
+    def test_invalid_arguments(self):
+        """Test malformed or out-of-range pagination args are rejected."""
+        for query in ('limit=abc', 'limit=0', 'limit=100000', 'cursor=-1', 'cursor=x',
+                      f'cursor={MAX_EXPENSE_ID + 1}', f'cursor={2**63}'):
+            response, data = self.get(query)
+            self.assertEqual(response.status_code, 400, query)
+            self.assertIn('error', data)
+    
+    def test_largest_cursor(self):
+        """Test the largest id as cursor is an empty last page."""
+        response, data = self.get(f'cursor={MAX_EXPENSE_ID}')
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(data['expenses'], [])
+        self.assertIsNone(data['next_cursor'])
+    
+    def test_unpaginated_still_a_list(self):
+        """Test the legacy full list is returned without pagination args."""
+        response, data = self.get('')
+        
+        self.assertEqual(len(data), 5)
+
+
+class TestStreaming(unittest.TestCase):
+    """Test streamed /api/expenses responses."""
+    
+    def setUp(self):
+        """Set up test client and more expenses than one stream batch."""
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+        self.batch_size = app.config['API_STREAM_BATCH_SIZE']
+        app.config['API_STREAM_BATCH_SIZE'] = 2
+        expenses.clear()
+        self.rows = [Expense(i + 1, 'Other', f'Row "{i}"') for i in range(5)]
+        for expense in self.rows:
+            expenses.append(expense)
+    
+    def tearDown(self):
+        """Restore the stream batch size."""
+        app.config['API_STREAM_BATCH_SIZE'] = self.batch_size
+    
+    def test_ndjson(self):
+        """Test Accept: application/x-ndjson streams one object per line."""
+        response = self.client.get('/api/expenses',
+                                   headers={'Accept': 'application/x-ndjson'})
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'application/x-ndjson')
+        lines = response.data.decode('utf-8').splitlines()
+        self.assertEqual([json.loads(line) for line in lines],
+                         [e.to_dict() for e in self.rows])
+    
+    def test_chunked_json(self):
+        """Test ?stream=1 streams the same array the buffered endpoint returns."""
+        streamed = self.client.get('/api/expenses?stream=1')
+        buffered = self.client.get('/api/expenses')
+        
+        self.assertTrue(streamed.is_streamed)
+        self.assertEqual(streamed.mimetype, 'application/json')
+        self.assertEqual(json.loads(streamed.data), json.loads(buffered.data))
+    
+    def test_empty_store(self):
+        """Test streaming an empty store yields valid empty documents."""
+        expenses.clear()
+        
+        self.assertEqual(json.loads(self.client.get('/api/expenses?stream=1').data), [])
+        ndjson = self.client.get('/api/expenses', headers={'Accept': 'application/x-ndjson'})
+        self.assertEqual(ndjson.data, b'')
+
+
+class TestConditionalGet(unittest.TestCase):
+    """Test ETag / If-None-Match handling on the API."""
+    
+    def setUp(self):
+        """Set up test client with one expense."""
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+        expenses.clear()
+        self.expense = Expense(10.00, 'Other', 'Test')
+        expenses.append(self.expense)
+    
+    def test_etag_and_not_modified(self):
+        """Test a repeated poll with the ETag gets an empty 304."""
+        for path in ('/api/expenses', '/api/summary', '/api/expenses?limit=1'):
+            first = self.client.get(path)
+            etag = first.headers['ETag']
+            
+            again = self.client.get(path, headers={'If-None-Match': etag})
+            
+            self.assertEqual(again.status_code, 304, path)
+            self.assertEqual(again.data, b'')
+            self.assertEqual(again.headers['ETag'], etag)
+    
+    def test_mutations_change_etag(self):
+        """Test add, delete and clear each invalidate the previous ETag."""
+        etags = [self.client.get('/api/summary').headers['ETag']]
+        self.client.post('/add', data={'amount': '5', 'category': 'Other',
+                                       'description': 'New'})
+        etags.append(self.client.get('/api/summary').headers['ETag'])
+        self.client.post(f'/delete/{self.expense.id}')
+        etags.append(self.client.get('/api/summary').headers['ETag'])
+        self.client.post('/clear')
+        
+        response = self.client.get('/api/summary', headers={'If-None-Match': etags[-1]})
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(set(etags + [response.headers['ETag']])), 4)
+    
+    def test_ndjson_has_its_own_etag(self):
+        """Test the JSON and NDJSON forms of /api/expenses are tagged apart."""
+        ndjson = {'Accept': 'application/x-ndjson'}
+        plain = self.client.get('/api/expenses')
+        streamed = self.client.get('/api/expenses', headers=ndjson)
+        
+        response = self.client.get('/api/expenses',
+                                   headers={**ndjson, 'If-None-Match': plain.headers['ETag']})
+        
+        self.assertNotEqual(plain.headers['ETag'], streamed.headers['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'application/x-ndjson')
+        for tagged in (plain, streamed, response):
+            self.assertIn('Accept', tagged.headers['Vary'])
+        again = self.client.get('/api/expenses',
+                                headers={**ndjson, 'If-None-Match': streamed.headers['ETag']})
+        self.assertEqual(again.status_code, 304)
+        self.assertIn('Accept', again.headers['Vary'])
+    
+    def test_error_has_no_etag(self):
+        """Test rejected requests are not tagged."""
+        response = self.client.get('/api/expenses?limit=0')
+        
+        self.assertEqual(response.status_code, 400)
+        self.assertNotIn('ETag', response.headers)
+
+
+class TestRenderCache(unittest.TestCase):
+    """Test the index page's render cache."""
+    
+    def setUp(self):
+        """Set up test client with one expense and an empty cache."""
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+        expenses.clear()
+        expenses.append(Expense(10.00, 'Food & Dining', 'Lunch'))
+        render_cache.clear()
+    
+    def test_repeat_view_hits_cache(self):
+        """Test an unchanged page is served from the cache."""
+        first = self.client.get('/?category=Food+%26+Dining')
+        hits = render_cache.hits
+        second = self.client.get('/?category=Food+%26+Dining')
+        
+        self.assertEqual(render_cache.hits, hits + 1)
+        self.assertEqual(first.data, second.data)
+    
+    def test_mutation_invalidates(self):
+        """Test a new expense shows up on the next view."""
+        self.client.get('/')
+        self.client.post('/add', data={'amount': '5', 'category': 'Other',
+                                       'description': 'Coffee beans'})
+        
+        response = self.client.get('/')
+        
+        self.assertIn(b'Coffee beans', response.data)
+        self.assertIn(b'$15.00', response.data)
+    
+    def test_flash_stays_dynamic(self):
+        """Test flash messages appear on a page whose fragment is cached."""
+        self.client.get('/')
+        response = self.client.post('/delete/999999', follow_redirects=True)
+        
+        self.assertIn(b'Expense not found!', response.data)
+        self.assertIn(b'Lunch', response.data)
+    
+    def test_stats_endpoint(self):
+        """Test the stats endpoint reports hits and render time."""
+        self.client.get('/')
+        self.client.get('/')
+        
+        data = json.loads(self.client.get('/api/cache/stats').data)
+        
+        self.assertGreaterEqual(data['hits'], 1)
+        self.assertGreater(data['render_ms_total'], 0)
+        self.assertIn('hit_rate', data)
+
+
+class TestBulkCreate(unittest.TestCase):
+    """Test POST /api/expenses/bulk."""
+    
+    def setUp(self):
+        """Set up test client and clear expenses."""
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+        expenses.clear()
+    
+    def post_json(self, rows, query=''):
+        """POST rows as a JSON array and decode the response."""
+        response = self.client.post(f'/api/expenses/bulk{query}', json=rows)
+        return response, json.loads(response.data)
+    
+    def test_json_array(self):
+        """Test a JSON array creates every row with contiguous ids."""
+        response, data = self.post_json([
+            {'amount': 12.5, 'category': 'Food & Dining', 'description': 'Lunch',
+             'date': '2024-03-01'},
+            {'amount': '7', 'category': 'Transportation', 'description': 'Bus'},
+        ])
+        
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual((data['created'], data['errors']), (2, []))
+        self.assertEqual(data['last_id'], data['first_id'] + 1)
+        self.assertEqual(expenses.get(data['first_id']).date, '2024-03-01')
+        self.assertEqual(expenses.total(), 19.50)
+    
+    def test_csv(self):
+        """Test a CSV body with a header row is imported."""
+        body = ('amount,category,description,date\n'
+                '10.00,Shopping,"Socks, wool",2024-03-02\n'
+                '5.00,Other,Stamps,\n')
+        
+        response = self.client.post('/api/expenses/bulk', data=body, content_type='text/csv')
+        
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(expenses), 2)
+        self.assertEqual(expenses[0].description, 'Socks, wool')
+    
+    def test_csv_header_read_like_import(self):
+        """Test a BOM and padded, capitalized header names are accepted as by /import."""
+        body = '\ufeff Amount ,CATEGORY,Description\n4.00,Other,Pens\n'.encode('utf-8')
+        
+        response = self.client.post('/api/expenses/bulk', data=body, content_type='text/csv')
+        
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual((expenses[0].amount, expenses[0].description), (4.00, 'Pens'))
+        bad = self.client.post('/api/expenses/bulk', data=b'amount,category,description\n\xff',
+                               content_type='text/csv')
+        self.assertEqual(bad.status_code, 400)
+    
+    def test_row_errors_reject_batch(self):
+        """Test invalid rows are reported by index and nothing is created."""
+        response, data = self.post_json([
+            {'amount': 1, 'category': 'Other', 'description': 'Fine'},
+            {'amount': -1, 'category': 'Other', 'description': 'Negative'},
+            {'amount': 'x', 'category': 'Other', 'description': 'Text'},
+            {'amount': 1, 'category': 'Other'},
+            {'amount': 1, 'category': 'Other', 'description': 'Date', 'date': '03/01/2024'},
+            'not a row',
+            {'amount': 'NaN', 'category': 'Other', 'description': 'Not a number'},
+            {'amount': 'Infinity', 'category': 'Other', 'description': 'Infinite'},
+        ])
+        
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual([e['row'] for e in data['errors']], [1, 2, 3, 4, 5, 6, 7])
+        self.assertEqual(data['errors'][0]['error'], 'Amount must be greater than zero!')
+        self.assertEqual(len(expenses), 0)
+    
+    def test_huge_and_boolean_amounts_rejected(self):
+        """Test integers too large for a float and JSON booleans are invalid amounts."""
+        response = self.client.post(
+            '/api/expenses/bulk', content_type='application/json',
+            data='[{"amount": 1%s, "category": "Other", "description": "Huge"},'
+                 ' {"amount": true, "category": "Other", "description": "True"},'
+                 ' {"amount": false, "category": "Other", "description": "False"}]' % ('0' * 400))
+        data = json.loads(response.data)
+        
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual([e['row'] for e in data['errors']], [0, 1, 2])
+        self.assertEqual({e['error'] for e in data['errors']},
+                         {'Invalid amount! Please enter a valid number.'})
+        self.assertEqual(len(expenses), 0)
+    
+    def test_partial(self):
+        """Test ?partial=1 creates the valid rows and reports the rest."""
+        response, data = self.post_json([
+            {'amount': 1, 'category': 'Other', 'description': 'Fine'},
+            {'amount': 0, 'category': 'Other', 'description': 'Zero'},
+        ], query='?partial=1')
+        
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(data['created'], 1)
+        self.assertEqual(data['errors'][0]['row'], 1)
+        self.assertEqual(len(expenses), 1)
+    
+    def test_unreadable_body(self):
+        """Test bodies that are not an array or lack CSV columns are rejected."""
+        response, _ = self.post_json({'amount': 1})
+        self.assertEqual(response.status_code, 400)
+        
+        response = self.client.post('/api/expenses/bulk', data='amount,category\n1,Other\n',
+                                    content_type='text/csv')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn(b'description', response.data)
+    
+    def test_row_limit(self):
+        """Test requests over the row limit are refused."""
+        limit = app.config['API_BULK_MAX_ROWS']
+        app.config['API_BULK_MAX_ROWS'] = 2
+        self.addCleanup(app.config.__setitem__, 'API_BULK_MAX_ROWS', limit)
+        
+        response, _ = self.post_json([{'amount': 1, 'category': 'Other',
+                                       'description': 'Row'}] * 3)
+        
+        self.assertEqual(response.status_code, 413)
+
+
+class TestImportApi(unittest.TestCase):
+    """Test POST /api/expenses/import."""
+    
+    def setUp(self):
+        """Set up test client, clear expenses and use a temporary reject dir."""
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+        expenses.clear()
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        reject_dir = app.config['IMPORT_REJECT_DIR']
+        self.addCleanup(app.config.__setitem__, 'IMPORT_REJECT_DIR', reject_dir)
+        app.config['IMPORT_REJECT_DIR'] = tmp.name
+    
+    def post(self, body):
+        """POST a CSV body and decode the response."""
+        response = self.client.post('/api/expenses/import', data=body.encode('utf-8'),
+                                    content_type='text/csv')
+        return response, json.loads(response.data)
+    
+    def test_import_keeps_valid_rows(self):
+        """Test valid rows are created and the rest written to a reject file."""
+        response, data = self.post('\ufeffamount,category,description\n'
+                                   '4,Other,Pens\n0,Other,Free\n6,Other,Ink\n')
+        
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual((data['created'], data['rejected']), (2, 1))
+        self.assertEqual(data['errors'], [{'line': 3, 'error': 'Amount must be greater than zero!'}])
+        with open(data['reject_file'], encoding='utf-8') as f:
+            self.assertIn('Free', f.read())
+        self.assertEqual(expenses.total(), 10.00)
+    
+    def test_clean_import_has_no_reject_file(self):
+        """Test no reject file is kept when every row is valid."""
+        response, data = self.post('amount,category,description\n4,Other,Pens\n')
+        
+        self.assertIsNone(data['reject_file'])
+        self.assertEqual(os.listdir(app.config['IMPORT_REJECT_DIR']), [])
+    
+    def test_missing_header(self):
+        """Test a body without the required columns is rejected."""
+        response, data = self.post('amount,category\n4,Other\n')
+        
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('description', data['error'])
+        self.assertEqual(os.listdir(app.config['IMPORT_REJECT_DIR']), [])
+    
+    def test_store_error_leaves_no_reject_file(self):
+        """Test a failed import without rejected rows removes its reject file."""
+        with mock.patch.object(expenses, 'add_many', side_effect=OSError('disk full')), \
+                self.assertLogs(app.logger, 'ERROR'):
+            response, data = self.post('amount,category,description\n4,Other,Pens\n')
+        
+        self.assertEqual(response.status_code, 500)
+        self.assertEqual(data['error'], 'disk full')
+        self.assertEqual(os.listdir(app.config['IMPORT_REJECT_DIR']), [])
+    
+    def test_failure_part_way_reports_created_rows(self):
+        """Test an import failing after stored batches reports how many were created."""
+        add_many, calls = expenses.add_many, []
+        
+        def fail_second_batch(batch):
+            calls.append(len(batch))
+            if len(calls) > 1:
+                raise OSError('disk full')
+            return add_many(batch)
+        
+        body = 'amount,category,description\n' + '4,Other,Pens\n' * 15_000
+        with mock.patch.object(expenses, 'add_many', side_effect=fail_second_batch), \
+                self.assertLogs(app.logger, 'ERROR'):
+            response, data = self.post(body)
+        
+        self.assertEqual(response.status_code, 500)
+        self.assertEqual(data['error'], 'disk full')
+        self.assertEqual(data['created'], 10_000)
+        self.assertEqual(len(expenses), 10_000)
+    
+    def test_undecodable_row_rejected(self):
+        """Test a row that is not UTF-8 is rejected and the rest imported."""
+        body = (b'amount,category,description\n4,Other,Pens\n'
+                b'5,Other,Caf\xe9\n6,Other,Ink\n')
+        response = self.client.post('/api/expenses/import', data=body, content_type='text/csv')
+        data = json.loads(response.data)
+        
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual((data['created'], data['rejected']), (2, 1))
+        self.assertEqual(data['errors'][0]['line'], 3)
+        with open(data['reject_file'], 'rb') as f:
+            self.assertIn(b'Caf\xe9', f.read())
+        self.assertEqual(expenses.total(), 10.00)
+
+
+class TestExport(unittest.TestCase):
+    """Test GET /api/expenses/export."""
+    
+    def setUp(self):
+        """Set up test client and expenses in two categories."""
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+        self.batch_size = app.config['API_STREAM_BATCH_SIZE']
+        app.config['API_STREAM_BATCH_SIZE'] = 2
+        self.addCleanup(app.config.__setitem__, 'API_STREAM_BATCH_SIZE', self.batch_size)
+        expenses.clear()
+        self.rows = [Expense(i + 0.25, 'Shopping' if i % 2 else 'Other',
+                             f'Item, "{i}"', date=f'2024-03-0{i + 1}') for i in range(5)]
+        for expense in self.rows:
+            expenses.append(expense)
+    
+    def read_csv(self, data):
+        """Parse an export body into dict rows."""
+        return list(csv.DictReader(io.StringIO(data.decode('utf-8'))))
+    
+    def test_csv(self):
+        """Test every expense is exported with a header row."""
+        response = self.client.get('/api/expenses/export?format=csv')
+        
+        self.assertTrue(response.is_streamed)
+        self.assertEqual(response.mimetype, 'text/csv')
+        self.assertIn('attachment', response.headers['Content-Disposition'])
+        rows = self.read_csv(response.data)
+        self.assertEqual([int(r['id']) for r in rows], [e.id for e in self.rows])
+        self.assertEqual(rows[0]['description'], 'Item, "0"')
+        self.assertEqual(float(rows[1]['amount']), 1.25)
+    
+    def test_category_filter(self):
+        """Test the category filter matches the index page's."""
+        response = self.client.get('/api/expenses/export?category=Shopping')
+        
+        self.assertEqual([int(r['id']) for r in self.read_csv(response.data)],
+                         [e.id for e in expenses.by_category('Shopping')])
+    
+    def test_gzip(self):
+        """Test gzip=1 returns the same CSV compressed."""
+        plain = self.client.get('/api/expenses/export').data
+        response = self.client.get('/api/expenses/export?gzip=1')
+        
+        self.assertEqual(response.mimetype, 'application/gzip')
+        self.assertEqual(gzip.decompress(response.data), plain)
+    
+    def test_reimport(self):
+        """Test an export can be fed back through the CSV importer."""
+        body = self.client.get('/api/expenses/export').data
+        expenses.clear()
+        
+        self.client.post('/api/expenses/import', data=body, content_type='text/csv')
+        
+        self.assertEqual([(e.amount, e.category, e.description, e.date) for e in expenses],
+                         [(e.amount, e.category, e.description, e.date) for e in self.rows])
+    
+    def test_unknown_format(self):
+        """Test unsupported formats are rejected."""
+        response = self.client.get('/api/expenses/export?format=xlsx')
+        
+        self.assertEqual(response.status_code, 400)
+
+
+class TestDateRange(unittest.TestCase):
+    """Test from/to and period filters."""
+    
+    def setUp(self):
+        """Set up test client and expenses across several months."""
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+        expenses.clear()
+        render_cache.clear()
+        today = datetime.now().date()
+        self.today = today.isoformat()
+        self.old = (today.replace(day=1) - timedelta(days=40)).isoformat()
+        for amount, category, description, day in (
+                (10.00, 'Shopping', 'March shoes', '2024-03-15'),
+                (20.00, 'Other', 'February gift', '2024-02-10'),
+                (30.00, 'Shopping', 'February socks', '2024-02-29'),
+                (40.00, 'Other', 'Today', self.today),
+                (50.00, 'Other', 'Long ago', self.old)):
+            expenses.append(Expense(amount, category, description, date=day))
+    
+    def get_json(self, path):
+        """GET a path and decode its JSON body."""
+        response = self.client.get(path)
+        return response, json.loads(response.data)
+    
+    def test_api_range(self):
+        """Test from/to returns the range in date order."""
+        response, data = self.get_json('/api/expenses?from=2024-02-01&to=2024-03-15')
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([e['description'] for e in data],
+                         ['February gift', 'February socks', 'March shoes'])
+    
+    def test_api_open_range(self):
+        """Test a missing bound leaves that end open."""
+        response, data = self.get_json('/api/expenses?to=2024-02-29')
+        
+        self.assertEqual([e['description'] for e in data][-2:],
+                         ['February gift', 'February socks'])
+    
+    def test_api_invalid_range(self):
+        """Test malformed, reversed or paginated ranges are rejected."""
+        for query in ('from=2024-13-01', 'from=2024-03-01&to=2024-02-01',
+                      'from=2024-01-01&limit=10', 'period=fortnight'):
+            response, data = self.get_json(f'/api/expenses?{query}')
+            self.assertEqual(response.status_code, 400, query)
+    
+    def test_summary_range(self):
+        """Test the summary covers only the requested range."""
+        response, data = self.get_json('/api/summary?from=2024-02-01&to=2024-02-29')
+        
+        self.assertEqual(data['by_category'], {'Other': 20.00, 'Shopping': 30.00})
+        self.assertEqual((data['total'], data['count']), (50.00, 2))
+        self.assertEqual((data['from'], data['to']), ('2024-02-01', '2024-02-29'))
+    
+    def test_summary_periods(self):
+        """Test this-month and last-30-days include today but not older rows."""
+        for period in ('this-month', 'last-30-days'):
+            response, data = self.get_json(f'/api/summary?period={period}')
+            self.assertEqual(data['by_category'], {'Other': 40.00}, period)
+            self.assertLessEqual(data['from'], self.today)
+            self.assertGreaterEqual(data['to'], self.today)
+    
+    def test_index_range_filter(self):
+        """Test the index page filters by category and date range together."""
+        response = self.client.get('/?category=Shopping&from=2024-02-01&to=2024-02-29')
+        
+        self.assertIn(b'February socks', response.data)
+        self.assertNotIn(b'February gift', response.data)
+        self.assertNotIn(b'March shoes', response.data)
+        self.assertIn(b'$30.00', response.data)
+        self.assertIn(b'value="2024-02-01"', response.data)
+    
+    def test_index_invalid_range(self):
+        """Test an invalid date on the index page flashes and shows everything."""
+        response = self.client.get('/?from=yesterday')
+        
+        self.assertIn(b'Invalid date!', response.data)
+        self.assertIn(b'March shoes', response.data)
+
+
+class TestSearch(unittest.TestCase):
+    """Test the description search endpoint."""
+    
+    def setUp(self):
+        """Set up test client and a few searchable expenses."""
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+        expenses.clear()
+        self.ids = [expenses.append(Expense(amount, category, description, date=day)).id
+                    for amount, category, description, day in (
+                        (12.00, 'Food & Dining', 'Team lunch downtown', '2024-02-01'),
+                        (30.00, 'Transportation', 'Taxi downtown', '2024-03-01'),
+                        (8.00, 'Shopping', 'Lunchbox', '2024-02-15'),
+                        (9.00, 'Food & Dining', 'Lunch with Sam', '2024-03-10'))]
+    
+    def search(self, query):
+        """GET a search and decode its JSON body."""
+        response = self.client.get(f'/api/expenses/search?{query}')
+        return response, json.loads(response.data)
+    
+    def test_prefix_match(self):
+        """Test every query word must start a description word."""
+        response, data = self.search('q=lun')
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([e['id'] for e in data['expenses']],
+                         [self.ids[0], self.ids[2], self.ids[3]])
+        self.assertIsNone(data['next_cursor'])
+        _, data = self.search('q=Lunch+DOWN')
+        self.assertEqual([e['description'] for e in data['expenses']], ['Team lunch downtown'])
+    
+    def test_filters(self):
+        """Test category and date filters narrow the matches."""
+        _, data = self.search('q=lunch&category=Food+%26+Dining&from=2024-03-01')
+        
+        self.assertEqual([e['description'] for e in data['expenses']], ['Lunch with Sam'])
+    
+    def test_paging(self):
+        """Test results page by cursor in id order."""
+        _, first = self.search('q=lunch&limit=2')
+        _, second = self.search(f"q=lunch&limit=2&cursor={first['next_cursor']}")
+        
+        self.assertEqual(first['next_cursor'], str(self.ids[2]))
+        self.assertEqual([e['id'] for e in second['expenses']], [self.ids[3]])
+        self.assertIsNone(second['next_cursor'])
+    
+    def test_sees_changes(self):
+        """Test added and deleted expenses show up in later searches."""
+        self.search('q=museum')
+        added = expenses.append(Expense(15.00, 'Entertainment', 'Museum ticket'))
+        expenses.delete(self.ids[1])
+        
+        self.assertEqual([e['id'] for e in self.search('q=museum')[1]['expenses']], [added.id])
+        self.assertEqual(self.search('q=taxi')[1]['expenses'], [])
+    
+    def test_invalid(self):
+        """Test a missing query or bad paging and dates are rejected."""
+        for query in ('', 'q=+', 'q=lunch&limit=0', 'q=lunch&from=2024-13-01',
+                      f'q=lunch&cursor={2**63}'):
+            response, data = self.search(query)
+            self.assertEqual(response.status_code, 400, query)
+            self.assertIn('error', data)
+
+
+class TestTimeseries(unittest.TestCase):
+    """Test the per-day and per-month summary endpoint."""
+    
+    def setUp(self):
+        """Set up test client and expenses over two months."""
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+        expenses.clear()
+        for amount, category, day in ((10.00, 'Shopping', '2024-01-05'),
+                                      (20.00, 'Other', '2024-01-05'),
+                                      (5.00, 'Shopping', '2024-01-20'),
+                                      (7.00, 'Other', '2024-02-02')):
+            expenses.append(Expense(amount, category, 'Row', date=day))
+    
+    def get_json(self, path):
+        """GET a path and decode its JSON body."""
+        response = self.client.get(path)
+        return response, json.loads(response.data)
+    
+    def test_monthly_by_default(self):
+        """Test the default series has one point per month with category totals."""
+        response, data = self.get_json('/api/summary/timeseries')
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(data['granularity'], 'month')
+        self.assertEqual(data['series'], [
+            {'period': '2024-01', 'total': 35.00, 'count': 3,
+             'by_category': {'Other': 20.00, 'Shopping': 15.00}},
+            {'period': '2024-02', 'total': 7.00, 'count': 1, 'by_category': {'Other': 7.00}}])
+    
+    def test_daily_range_and_category(self):
+        """Test daily points honour the date range and category filter."""
+        _, data = self.get_json('/api/summary/timeseries?granularity=day'
+                                '&from=2024-01-01&to=2024-01-31&category=Shopping')
+        
+        self.assertEqual([(p['period'], p['total']) for p in data['series']],
+                         [('2024-01-05', 10.00), ('2024-01-20', 5.00)])
+        self.assertEqual((data['from'], data['to']), ('2024-01-01', '2024-01-31'))
+    
+    def test_follows_mutations(self):
+        """Test adds and deletes show up in the next series."""
+        added = expenses.append(Expense(3.00, 'Other', 'Row', date='2024-02-10'))
+        expenses.delete(added.id)
+        expenses.append(Expense(1.00, 'Other', 'Row', date='2024-03-01'))
+        
+        _, data = self.get_json('/api/summary/timeseries')
+        
+        self.assertEqual([(p['period'], p['total']) for p in data['series']],
+                         [('2024-01', 35.00), ('2024-02', 7.00), ('2024-03', 1.00)])
+    
+    def test_invalid(self):
+        """Test unknown granularities and bad dates are rejected."""
+        for query in ('granularity=week', 'from=2024-02-30'):
+            response, _ = self.get_json(f'/api/summary/timeseries?{query}')
+            self.assertEqual(response.status_code, 400, query)
+
+
+class TestAnalytics(unittest.TestCase):
+    """Test the analytics endpoint."""
+    
+    def setUp(self):
+        """Set up test client and expenses over two months."""
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+        expenses.clear()
+        for amount, category, day in ((10.00, 'Shopping', '2024-01-05'),
+                                      (30.00, 'Shopping', '2024-02-05'),
+                                      (4.00, 'Other', '2024-02-07')):
+            expenses.append(Expense(amount, category, 'Row', date=day))
+    
+    def test_statistics_and_deltas(self):
+        """Test the endpoint reports per-category statistics and monthly changes."""
+        response = self.client.get('/api/analytics')
+        data = json.loads(response.data)
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(data['count'], 3)
+        shopping = data['by_category']['Shopping']
+        self.assertEqual((shopping['mean'], shopping['median'], shopping['std']),
+                         (20.00, 20.00, 10.00))
+        self.assertEqual([(m['month'], m['delta']) for m in shopping['monthly']],
+                         [('2024-01', None), ('2024-02', 20.00)])
+        self.assertIn(data['backend'], ('numpy', 'python'))
+    
+    def test_range(self):
+        """Test from/to limits the rows analyzed."""
+        data = json.loads(self.client.get('/api/analytics?from=2024-02-01').data)
+        
+        self.assertEqual(data['count'], 2)
+        self.assertEqual(data['from'], '2024-02-01')
+        self.assertEqual(self.client.get('/api/analytics?to=2024-13-01').status_code, 400)
+
+
+class TestJSONEncoding(unittest.TestCase):
+    """Test cached row encodings and the JSON provider."""
+    
+    def setUp(self):
+        """Set up test client and a few expenses."""
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+        expenses.clear()
+        for i in range(3):
+            expenses.append(Expense(1.25 + i, 'Food & Dining', f'Café "{i}"', date='2024-03-01'))
+    
+    def test_to_json_is_cached(self):
+        """Test an expense encodes like jsonify(to_dict()) once and reuses the bytes."""
+        expense = Expense(9.99, 'Other', 'Ünïcode \\ "quoted"\n', date='2024-01-02')
+        
+        encoded = expense.to_json()
+        with app.app_context():
+            self.assertEqual(encoded, DefaultJSONProvider(app).dumps(
+                expense.to_dict(), separators=(',', ':')).encode())
+        self.assertIs(expense.to_json(), encoded)
+    
+    def test_list_and_page_match_rows(self):
+        """Test joined fragments decode to the same rows as to_dict()."""
+        rows = [e.to_dict() for e in expenses]
+        
+        self.assertEqual(self.client.get('/api/expenses').get_json(), rows)
+        page = self.client.get('/api/expenses?limit=2').get_json()
+        self.assertEqual(page, {'expenses': rows[:2], 'next_cursor': str(rows[1]['id'])})
+        self.assertEqual(self.client.get('/api/expenses?from=2024-03-01').get_json(), rows)
+    
+    def test_standard_library_fallback(self):
+        """Test responses are unchanged without orjson."""
+        with mock.patch.object(fast_json, 'orjson', None):
+            response = self.client.get('/api/summary')
+        
+        self.assertEqual(response.get_json(), self.client.get('/api/summary').get_json())
+    
+    def test_provider_matches_default_encoding(self):
+        """Test the provider writes the same values and key order as Flask's default."""
+        payload = {'b': 1, 'a': [1.5, None, True], 'when': datetime(2024, 1, 2, 3, 4, 5)}
+        default = DefaultJSONProvider(app)
+        
+        with app.app_context():
+            self.assertEqual(json.loads(app.json.dumps(payload)), json.loads(default.dumps(payload)))
+            self.assertTrue(app.json.dumps(payload).startswith('{"a"'))
+
+
+class TestCompression(unittest.TestCase):
+    """Test negotiated response compression and the compressed-body cache."""
+    
+    def setUp(self):
+        """Set up test client with enough expenses to pass the size threshold."""
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+        expenses.clear()
+        for i in range(200):
+            expenses.append(Expense(1.00 + i, 'Shopping', f'Item {i}', date='2024-01-01'))
+        compressed_cache.clear()
+    
+    def get(self, path, encoding='gzip', **headers):
+        """GET ``path`` accepting ``encoding``."""
+        return self.client.get(path, headers={'Accept-Encoding': encoding, **headers})
+    
+    def test_gzip_large_response(self):
+        """Test a large JSON body is gzipped, varies on Accept-Encoding and has a weak ETag."""
+        plain = self.client.get('/api/expenses')
+        response = self.get('/api/expenses')
+        
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response.headers['Vary'])
+        self.assertEqual(gzip.decompress(response.data), plain.data)
+        self.assertLess(len(response.data), len(plain.data) // 3)
+        self.assertEqual(response.headers['ETag'], 'W/' + plain.headers['ETag'])
+    
+    def test_negotiation(self):
+        """Test deflate is used when preferred and nothing is compressed without the header."""
+        plain = self.client.get('/api/expenses')
+        deflated = self.get('/api/expenses', 'gzip;q=0.5, deflate')
+        
+        self.assertNotIn('Content-Encoding', plain.headers)
+        self.assertEqual(deflated.headers['Content-Encoding'], 'deflate')
+        self.assertEqual(zlib.decompress(deflated.data), plain.data)
+        self.assertNotIn('Content-Encoding', self.get('/api/expenses', 'identity').headers)
+    
+    def test_small_response_not_compressed(self):
+        """Test bodies under COMPRESS_MIN_BYTES are sent as they are."""
+        response = self.get('/api/summary')
+        
+        self.assertNotIn('Content-Encoding', response.headers)
+        self.assertIn('Accept-Encoding', response.headers['Vary'])
+    
+    def test_repeated_poll_served_from_cache(self):
+        """Test an identical poll reuses the compressed body until the data changes."""
+        first = self.get('/api/expenses?limit=100')
+        hits = compressed_cache.hits
+        second = self.get('/api/expenses?limit=100')
+        
+        self.assertEqual(compressed_cache.hits, hits + 1)
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(second.headers['ETag'], first.headers['ETag'])
+        
+        self.client.post('/delete/' + str(expenses[0].id))
+        third = self.get('/api/expenses?limit=100')
+        self.assertNotEqual(third.headers['ETag'], first.headers['ETag'])
+        self.assertNotIn(b'Item 0"', gzip.decompress(third.data))
+    
+    def test_weak_etag_revalidates(self):
+        """Test the weak ETag of a compressed body still yields 304."""
+        etag = self.get('/api/expenses').headers['ETag']
+        
+        response = self.get('/api/expenses', **{'If-None-Match': etag})
+        
+        self.assertEqual(response.status_code, 304)
+    
+    def test_streams_compressed(self):
+        """Test NDJSON and CSV streams are compressed chunk by chunk."""
+        ndjson = {'Accept': 'application/x-ndjson'}
+        plain = self.client.get('/api/expenses', headers=ndjson).data
+        response = self.get('/api/expenses', **ndjson)
+        
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(response.data), plain)
+        export = self.get('/api/expenses/export?format=csv')
+        self.assertEqual(gzip.decompress(export.data),
+                         self.client.get('/api/expenses/export?format=csv').data)
+    
+    def test_ndjson_not_served_cached_json(self):
+        """Test an NDJSON request after a cached JSON poll still gets NDJSON."""
+        self.get('/api/expenses')
+        self.get('/api/expenses')
+        
+        response = self.get('/api/expenses', Accept='application/x-ndjson')
+        lines = gzip.decompress(response.data).splitlines()
+        
+        self.assertEqual(response.mimetype, 'application/x-ndjson')
+        self.assertEqual(len(lines), 200)
+        self.assertEqual(json.loads(lines[0])['description'], 'Item 0')
+    
+    def test_gzip_export_not_compressed_twice(self):
+        """Test an already gzipped download is left alone."""
+        response = self.get('/api/expenses/export?format=csv&gzip=1')
+        
+        self.assertNotIn('Content-Encoding', response.headers)
+        self.assertTrue(gzip.decompress(response.data).startswith(b'id,'))
+    
+    @unittest.skipIf(compression.brotli is None, 'brotli is not installed')
+    def test_brotli(self):
+        """Test brotli is preferred when installed and accepted."""
+        plain = self.client.get('/api/expenses')
+        response = self.get('/api/expenses', 'gzip, br')
+        
+        self.assertEqual(response.headers['Content-Encoding'], 'br')
+        self.assertEqual(compression.brotli.decompress(response.data), plain.data)
+    
+    def test_stats_endpoint(self):
+        """Test the cache stats include the compressed-body cache."""
+        self.get('/api/expenses')
+        self.get('/api/expenses')
+        
+        data = self.client.get('/api/cache/stats').get_json()
+        
+        self.assertGreaterEqual(data['compression']['hits'], 1)
+
+
+class TestMetrics(unittest.TestCase):
+    """Test request instrumentation and the /metrics endpoint."""
+    
+    def setUp(self):
+        """Set up test client, one expense and empty metrics."""
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+        expenses.clear()
+        expenses.append(Expense(10.00, 'Other', 'Test'))
+        metrics.reset()
+    
+    def scrape(self):
+        """Return the /metrics response and its samples as a dict."""
+        response = self.client.get('/metrics')
+        lines = response.get_data(as_text=True).splitlines()
+        return response, dict(line.rsplit(' ', 1) for line in lines if not line.startswith('#'))
+    
+    def test_routes_are_counted(self):
+        """Test requests are counted by endpoint, method and status."""
+        self.client.get('/')
+        self.client.get('/api/expenses')
+        self.client.post('/add', data={'amount': '5', 'category': 'Other', 'description': 'A'})
+        self.client.post('/delete/999999')
+        self.client.get('/api/summary?from=bad')
+        self.client.get('/no-such-page')
+        
+        response, samples = self.scrape()
+        
+        self.assertEqual(response.mimetype, 'text/plain')
+        for labels in ('route="index",method="GET",status="200"',
+                       'route="get_expenses_api",method="GET",status="200"',
+                       'route="add_expense",method="POST",status="302"',
+                       'route="delete_expense",method="POST",status="302"',
+                       'route="get_summary_api",method="GET",status="400"',
+                       'route="unmatched",method="GET",status="404"'):
+            self.assertEqual(samples[f'expense_http_requests_total{{{labels}}}'], '1', labels)
+        self.assertEqual(samples['expense_http_request_duration_seconds_count'
+                                 '{route="index",method="GET"}'], '1')
+    
+    def test_size_records_bytes_sent(self):
+        """Test the size histogram records the compressed length when compressing."""
+        for i in range(200):
+            expenses.append(Expense(1.00, 'Other', f'Row {i}'))
+        sent = len(self.client.get('/api/expenses', headers={'Accept-Encoding': 'gzip'}).data)
+        
+        _, samples = self.scrape()
+        
+        self.assertEqual(samples['expense_http_response_size_bytes_sum'
+                                 '{route="get_expenses_api",method="GET"}'], str(sent))
+    
+    def test_store_gauges(self):
+        """Test the row count and version gauges follow the store."""
+        self.client.post('/add', data={'amount': '5', 'category': 'Other', 'description': 'A'})
+        
+        _, samples = self.scrape()
+        
+        self.assertEqual(samples['expense_store_rows'], '2')
+        self.assertEqual(samples['expense_store_version'], str(expenses.version))
+
+
 class TestIntegration(unittest.TestCase):
     """Integration tests for complete workflows."""
     
@@ -316,6 +1383,37 @@ class TestIntegration(unittest.TestCase):
         self.assertIn(b'36.25', response.data)
 
 
+class TestConcurrency(unittest.TestCase):
+    """Test routes under concurrent requests."""
+    
+    def setUp(self):
+        """Set up and clear expenses."""
+        app.config['TESTING'] = True
+        expenses.clear()
+    
+    def test_concurrent_adds_get_unique_ids(self):
+        """Test concurrent POSTs to /add never produce duplicate ids."""
+        def worker(n):
+            client = app.test_client()
+            for i in range(25):
+                client.post('/add', data={
+                    'amount': '1.00',
+                    'category': 'Other',
+                    'description': f'Thread {n} #{i}',
+                    'date': '2024-02-09'
+                })
+        
+        threads = [threading.Thread(target=worker, args=(n,)) for n in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        ids = [e.id for e in expenses]
+        self.assertEqual(len(ids), 200)
+        self.assertEqual(len(set(ids)), 200)
+
+
 def run_tests():
     """Run all tests with verbose output."""
     # Create test suite
@@ -326,7 +1424,22 @@ def run_tests():
     suite.addTests(loader.loadTestsFromTestCase(TestExpenseClass))
     suite.addTests(loader.loadTestsFromTestCase(TestRoutes))
     suite.addTests(loader.loadTestsFromTestCase(TestAPI))
+    suite.addTests(loader.loadTestsFromTestCase(TestPagination))
+    suite.addTests(loader.loadTestsFromTestCase(TestStreaming))
+    suite.addTests(loader.loadTestsFromTestCase(TestConditionalGet))
+    suite.addTests(loader.loadTestsFromTestCase(TestRenderCache))
+    suite.addTests(loader.loadTestsFromTestCase(TestBulkCreate))
+    suite.addTests(loader.loadTestsFromTestCase(TestImportApi))
+    suite.addTests(loader.loadTestsFromTestCase(TestExport))
+    suite.addTests(loader.loadTestsFromTestCase(TestDateRange))
+    suite.addTests(loader.loadTestsFromTestCase(TestSearch))
+    suite.addTests(loader.loadTestsFromTestCase(TestTimeseries))
+    suite.addTests(loader.loadTestsFromTestCase(TestAnalytics))
+    suite.addTests(loader.loadTestsFromTestCase(TestJSONEncoding))
+    suite.addTests(loader.loadTestsFromTestCase(TestCompression))
+    suite.addTests(loader.loadTestsFromTestCase(TestMetrics))
     suite.addTests(loader.loadTestsFromTestCase(TestIntegration))
+    suite.addTests(loader.loadTestsFromTestCase(TestConcurrency))
     
     # Run tests with verbose output
     runner = unittest.TextTestRunner(verbosity=2)
@@ -0,0 +1,145 @@
+"""
+Test Suite for the ASGI Entry Point (using unittest)
+Tests routing through the event loop, streamed bodies in both directions,
+slow clients and disconnects.
+Run with: python test_asgi_unittest.py
+"""
+
+import asyncio
+import json
+import unittest
+
+import asgi
+from app import app, expenses
+from models import Expense
+
+
+class Client:
+    """Drives one ASGI request with scripted receive messages."""
+    
+    def __init__(self, method, path, query=b'', body=(b'',), headers=(), send_delay=None,
+                 disconnect=False):
+        self.scope = {
+            'type': 'http', 'method': method, 'path': path, 'query_string': query,
+            'headers': list(headers), 'http_version': '1.1', 'scheme': 'http',
+            'server': ('testserver', 80), 'client': ('127.0.0.1', 5000), 'root_path': '',
+        }
+        self.incoming = [{'type': 'http.request', 'body': chunk,
+                          'more_body': i < len(body) - 1} for i, chunk in enumerate(body)]
+        if disconnect:
+            self.incoming.append({'type': 'http.disconnect'})
+        self.send_delay = send_delay
+        self.sent = []
+    
+    async def receive(self):
+        """Return the next scripted message, then wait as an idle client does."""
+        if self.incoming:
+            return self.incoming.pop(0)
+        await asyncio.Event().wait()
+    
+    async def send(self, message):
+        """Record a message, optionally reading it slowly."""
+        if self.send_delay is not None:
+            await self.send_delay()
+        self.sent.append(message)
+    
+    async def run(self):
+        """Run the request through the ASGI app."""
+        await asgi.app(self.scope, self.receive, self.send)
+        return self
+    
+    @property
+    def status(self):
+        return self.sent[0]['status']
+    
+    @property
+    def body(self):
+        return b''.join(m.get('body', b'') for m in self.sent[1:])
+
+
+def run(client):
+    """Run one request to completion."""
+    return asyncio.run(client.run())
+
+
+class TestAsgi(unittest.TestCase):
+    """Test serving the Flask app through the ASGI entry point."""
+    
+    def setUp(self):
+        """Set up a store with a few thousand expenses."""
+        app.config['TESTING'] = True
+        expenses.clear()
+        for i in range(2500):
+            expenses.append(Expense(1.00, 'Other', f'Row {i}', date='2024-01-01'))
+    
+    def test_json_route_matches_flask(self):
+        """Test a JSON route returns the same status, body and ETag as under WSGI."""
+        client = run(Client('GET', '/api/summary'))
+        response = app.test_client().get('/api/summary')
+        
+        self.assertEqual(client.status, 200)
+        self.assertEqual(json.loads(client.body), response.get_json())
+        self.assertIn((b'etag', response.headers['ETag'].encode()), client.sent[0]['headers'])
+    
+    def test_stream_arrives_in_chunks(self):
+        """Test an NDJSON stream is sent as several body messages."""
+        client = run(Client('GET', '/api/expenses', b'stream=1',
+                            headers=[(b'accept', b'application/x-ndjson')]))
+        
+        self.assertEqual(len(client.body.splitlines()), 2500)
+        self.assertGreater(len(client.sent), 3)
+        self.assertFalse(client.sent[-1]['more_body'])
+    
+    def test_streamed_upload(self):
+        """Test a request body split over several messages reaches the view."""
+        expenses.clear()
+        client = run(Client('POST', '/api/expenses/import',
+                            body=(b'amount,category,descr', b'iption\n1.50,Other,Tea\n', b''),
+                            headers=[(b'content-type', b'text/csv')]))
+        
+        self.assertEqual(client.status, 201)
+        self.assertEqual(json.loads(client.body)['created'], 1)
+        self.assertEqual(expenses[0].description, 'Tea')
+    
+    def test_slow_client_does_not_block_others(self):
+        """Test a request completes while a slow client is still reading a stream."""
+        async def scenario():
+            reading = asyncio.Event()
+            slow = Client('GET', '/api/expenses', b'stream=1', send_delay=reading.wait)
+            slow_task = asyncio.ensure_future(slow.run())
+            fast = await asyncio.wait_for(Client('GET', '/api/summary').run(), timeout=5)
+            self.assertFalse(slow_task.done())
+            reading.set()
+            await asyncio.wait_for(slow_task, timeout=5)
+            return slow, fast
+        
+        slow, fast = asyncio.run(scenario())
+        
+        self.assertEqual(fast.status, 200)
+        self.assertEqual(len(json.loads(slow.body)), 2500)
+    
+    def test_disconnect_stops_stream(self):
+        """Test a client that goes away stops the stream early."""
+        client = run(Client('GET', '/api/expenses', b'stream=1', disconnect=True,
+                            headers=[(b'accept', b'application/x-ndjson')]))
+        
+        self.assertLess(len(client.body.splitlines()), 2500)
+    
+    def test_lifespan(self):
+        """Test startup and shutdown are acknowledged."""
+        incoming = [{'type': 'lifespan.startup'}, {'type': 'lifespan.shutdown'}]
+        sent = []
+        
+        async def receive():
+            return incoming.pop(0)
+        
+        async def send(message):
+            sent.append(message['type'])
+        
+        asyncio.run(asgi.app({'type': 'lifespan'}, receive, send))
+        
+        self.assertEqual(sent, ['lifespan.startup.complete', 'lifespan.shutdown.complete'])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
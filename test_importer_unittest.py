@@ -0,0 +1,136 @@
+"""
+Test Suite for the Expense Importer (using unittest)
+Tests chunking, validation, reject files and pooled parsing of CSV imports.
+Run with: python test_importer_unittest.py
+"""
+
+import csv
+import io
+import unittest
+
+from importer import UNDECODABLE, import_csv, read_chunks
+from store import ExpenseStore
+
+CSV = (
+    'amount,category,description,date\r\n'
+    '10.00,Food & Dining,"Dinner, with ""friends""",2024-01-02\r\n'
+    '-5,Other,Refund,2024-01-03\r\n'
+    '3.50,Other,"Two\r\nlines",\r\n'
+    '\r\n'
+    'abc,Shopping,Socks,2024-01-04\r\n'
+    '7.25,Pets,Treats,2024-13-01\r\n'
+    '20,Shopping,Shoes,2024-01-05\r\n'
+)
+
+
+class TestReadChunks(unittest.TestCase):
+    """Test splitting CSV lines into record-aligned chunks."""
+    
+    def test_quoted_newline_stays_in_chunk(self):
+        """Test a record spanning lines is never split across chunks."""
+        lines = io.StringIO(CSV, newline='').readlines()[1:]
+        
+        chunks = list(read_chunks(lines, chunk_rows=3))
+        
+        self.assertEqual([start for start, _ in chunks], [2, 6, 9])
+        self.assertEqual([len(chunk) for _, chunk in chunks], [4, 3, 1])
+
+
+class TestImportCsv(unittest.TestCase):
+    """Test streaming CSV imports into a store."""
+    
+    def setUp(self):
+        """Set up an empty store and a reject file."""
+        self.store = ExpenseStore()
+        self.rejects = io.StringIO()
+    
+    def run_import(self, **options):
+        """Import the sample CSV with small chunks."""
+        return import_csv(io.StringIO(CSV, newline=''), self.store, chunk_rows=2,
+                          rejects=self.rejects, **options)
+    
+    def test_valid_rows_created(self):
+        """Test valid rows are inserted in file order with their fields."""
+        stats = self.run_import()
+        
+        self.assertEqual((stats.rows, stats.created, stats.rejected), (6, 3, 3))
+        self.assertEqual([e.description for e in self.store],
+                         ['Dinner, with "friends"', 'Two\r\nlines', 'Shoes'])
+        self.assertEqual(self.store.total(), 33.50)
+    
+    def test_reject_file(self):
+        """Test rejected rows are written with their line and error."""
+        self.run_import()
+        
+        rows = list(csv.reader(io.StringIO(self.rejects.getvalue())))
+        
+        self.assertEqual(rows[0], ['amount', 'category', 'description', 'date', 'line', 'error'])
+        self.assertEqual([(row[2], row[4]) for row in rows[1:]],
+                         [('Refund', '3'), ('Socks', '7'), ('Treats', '8')])
+        self.assertEqual(rows[1][5], 'Amount must be greater than zero!')
+    
+    def test_progress(self):
+        """Test progress is reported after each chunk."""
+        seen = []
+        
+        self.run_import(progress=lambda stats: seen.append(stats.rows))
+        
+        self.assertEqual(seen, sorted(seen))
+        self.assertEqual(seen[-1], 6)
+    
+    def test_process_pool(self):
+        """Test parsing in worker processes gives the same result."""
+        self.run_import(workers=2)
+        
+        self.assertEqual([e.description for e in self.store],
+                         ['Dinner, with "friends"', 'Two\r\nlines', 'Shoes'])
+    
+    def test_non_finite_amount_rejected(self):
+        """Test nan and infinite amounts are rejected and leave the total intact."""
+        stats = import_csv(io.StringIO('amount,category,description\n'
+                                       'nan,Other,A\ninf,Other,B\n2,Other,C\n'),
+                           self.store, rejects=self.rejects)
+        
+        self.assertEqual((stats.created, stats.rejected), (1, 2))
+        self.assertEqual(self.store.total(), 2.0)
+    
+    def test_undecodable_row_rejected(self):
+        """Test a row that is not UTF-8 is rejected and written back byte for byte."""
+        raw = io.BytesIO(b'amount,category,description\n4,Other,Pens\n5,Other,Caf\xe9\n')
+        rejects = io.BytesIO()
+        text_rejects = io.TextIOWrapper(rejects, encoding='utf-8', errors=UNDECODABLE,
+                                        newline='')
+        
+        stats = import_csv(io.TextIOWrapper(raw, encoding='utf-8', errors=UNDECODABLE,
+                                            newline=''), self.store, rejects=text_rejects)
+        text_rejects.flush()
+        
+        self.assertEqual((stats.created, stats.rejected), (1, 1))
+        self.assertEqual(stats.errors[0]['line'], 3)
+        self.assertIn(b'Caf\xe9,3,', rejects.getvalue())
+    
+    def test_store_error_carries_stats(self):
+        """Test a store failure is raised with the counts of the import so far."""
+        class FullStore(ExpenseStore):
+            def add_many(self, expenses):
+                if len(self):
+                    raise OSError('disk full')
+                return super().add_many(expenses)
+        
+        self.store = FullStore()
+        with self.assertRaises(OSError) as caught:
+            self.run_import()
+        
+        self.assertEqual(caught.exception.stats.created, len(self.store))
+        self.assertGreater(len(self.store), 0)
+    
+    def test_missing_column(self):
+        """Test a header without required columns is rejected up front."""
+        with self.assertRaises(ValueError):
+            import_csv(io.StringIO('amount,category\n1,Other\n'), self.store)
+        
+        self.assertEqual(len(self.store), 0)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,215 @@
+"""
+Test Suite for the Expense Journal (using unittest)
+Tests journaling, snapshots and crash recovery of in-memory stores.
+Run with: python test_journal_unittest.py
+"""
+
+import os
+import tempfile
+import threading
+import unittest
+
+from journal import ExpenseJournal, open_journal
+from models import Expense
+from store import ColumnarExpenseStore, ExpenseStore
+
+
+class TestExpenseJournal(unittest.TestCase):
+    """Test journal writes and recovery."""
+    
+    def setUp(self):
+        """Set up a journal in a temporary directory."""
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.directory = tmp.name
+        self.store = ExpenseStore()
+        self.journal = self.open(self.store)
+    
+    def open(self, store, **options):
+        """Open and recover a journal over the test directory."""
+        journal = ExpenseJournal(self.directory, commit_delay=0, **options)
+        self.addCleanup(journal.close)
+        journal.recover(store)
+        return journal
+    
+    def add(self, amount, description, **kwargs):
+        """Add an expense to the store and journal it."""
+        expense = self.store.add(Expense(amount, 'Other', description, date='2024-05-01', **kwargs))
+        self.journal.record_add(expense)
+        return expense
+    
+    def reopen(self, store_class=ExpenseStore):
+        """Close the journal and recover a fresh store from disk."""
+        self.journal.close()
+        store = store_class()
+        self.open(store)
+        return store
+    
+    def test_replay_add_and_delete(self):
+        """Test that adds and deletes are replayed on recovery."""
+        first = self.add(10.00, 'First')
+        second = self.add(20.00, 'Second')
+        self.store.delete(first.id)
+        self.journal.record_delete(first.id)
+        
+        recovered = self.reopen()
+        
+        self.assertEqual([e.to_dict() for e in recovered], [second.to_dict()])
+    
+    def test_replay_add_many(self):
+        """Test that a bulk add is journaled row by row and replayed."""
+        batch = [Expense(i + 1, 'Other', f'Bulk {i}', date='2024-05-01') for i in range(3)]
+        self.journal.add_many(self.store, batch)
+        
+        recovered = self.reopen()
+        
+        self.assertEqual([e.to_dict() for e in recovered], [e.to_dict() for e in batch])
+    
+    def test_replay_clear(self):
+        """Test that a clear record empties the recovered store."""
+        self.add(10.00, 'Gone')
+        self.store.clear()
+        self.journal.record_clear()
+        kept = self.add(5.00, 'Kept')
+        
+        recovered = self.reopen()
+        
+        self.assertEqual([e.id for e in recovered], [kept.id])
+    
+    def test_snapshot_then_tail(self):
+        """Test recovery loads the snapshot and replays only the tail."""
+        for i in range(5):
+            self.add(1.00, f'Before {i}')
+        self.journal.snapshot(self.store, wait=True)
+        tail = self.add(2.00, 'After')
+        self.journal.close()
+        
+        recovered = ExpenseStore()
+        journal = ExpenseJournal(self.directory, commit_delay=0)
+        self.addCleanup(journal.close)
+        replayed = journal.recover(recovered)
+        
+        self.assertEqual(replayed, 1)
+        self.assertEqual(len(recovered), 6)
+        self.assertEqual(recovered.get(tail.id).description, 'After')
+    
+    def test_snapshot_retires_old_files(self):
+        """Test older segments and snapshots are deleted after a snapshot."""
+        self.add(1.00, 'One')
+        self.journal.snapshot(self.store, wait=True)
+        self.add(1.00, 'Two')
+        self.journal.snapshot(self.store, wait=True)
+        
+        names = sorted(os.listdir(self.directory))
+        
+        self.assertEqual(len([n for n in names if n.startswith('snapshot-')]), 1)
+        self.assertEqual(len([n for n in names if n.startswith('journal-')]), 1)
+    
+    def test_automatic_snapshot(self):
+        """Test maybe_snapshot fires once enough records accumulate."""
+        self.journal.close()
+        journal = self.open(self.store, snapshot_every=3)
+        for i in range(3):
+            journal.record_add(self.store.add(Expense(1.00, 'Other', f'Row {i}')))
+        
+        journal.maybe_snapshot(self.store)
+        journal.close()
+        
+        self.assertTrue(any(n.startswith('snapshot-') for n in os.listdir(self.directory)))
+    
+    def test_torn_record_ignored(self):
+        """Test a partially written last record does not break recovery."""
+        kept = self.add(3.00, 'Kept')
+        self.journal.close()
+        segment = [n for n in os.listdir(self.directory) if n.startswith('journal-')][0]
+        with open(os.path.join(self.directory, segment), 'ab') as f:
+            f.write(b'["add",99,1.0,"Oth')
+        
+        recovered = ExpenseStore()
+        self.open(recovered)
+        
+        self.assertEqual([e.id for e in recovered], [kept.id])
+    
+    def test_torn_first_record_of_segment_is_cut(self):
+        """Test records added after recovering from a torn segment survive the next restart."""
+        first = self.add(1.00, 'Snapshotted')
+        self.journal.snapshot(self.store, wait=True)
+        self.journal.close()
+        segment = [n for n in os.listdir(self.directory) if n.startswith('journal-')][0]
+        with open(os.path.join(self.directory, segment), 'ab') as f:
+            f.write(b'["add",99,1.0,"Oth')
+        
+        self.store = ExpenseStore()
+        self.journal = self.open(self.store)
+        later = [self.add(2.00, 'Later 1'), self.add(3.00, 'Later 2')]
+        recovered = self.reopen()
+        
+        self.assertEqual([e.id for e in recovered], [first.id] + [e.id for e in later])
+    
+    def test_recovers_into_columnar_store(self):
+        """Test the journal can rebuild a columnar store."""
+        expense = self.add(7.50, 'Columnar')
+        
+        recovered = self.reopen(ColumnarExpenseStore)
+        
+        self.assertEqual(recovered.get(expense.id).to_dict(), expense.to_dict())
+    
+    def test_group_commit_from_many_threads(self):
+        """Test concurrent writers are all durable once they return."""
+        def writer(offset):
+            for i in range(50):
+                self.journal.record_add(Expense(1.00, 'Other', 'Thread', date='2024-05-01',
+                                                expense_id=offset + i))
+        
+        threads = [threading.Thread(target=writer, args=(1000 * (n + 1),)) for n in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        recovered = self.reopen()
+        
+        self.assertEqual(len(recovered), 200)
+    
+    def test_concurrent_apply_matches_store(self):
+        """Test journaled adds and deletes from many threads replay to the same store."""
+        def worker(n):
+            for i in range(40):
+                expense = self.journal.add(self.store, Expense(1.00, 'Other', f'T{n} #{i}',
+                                                               date='2024-05-01'))
+                if i % 2:
+                    self.journal.delete(self.store, expense.id)
+        
+        threads = [threading.Thread(target=worker, args=(n,)) for n in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        recovered = self.reopen()
+        
+        self.assertEqual([e.to_dict() for e in recovered], [e.to_dict() for e in self.store])
+        self.assertEqual(len(recovered), 80)
+
+
+class TestOpenJournal(unittest.TestCase):
+    """Test journal configuration."""
+    
+    def test_disabled_without_directory(self):
+        """Test no journal is opened unless a directory is configured."""
+        self.assertIsNone(open_journal({}, ExpenseStore()))
+    
+    def test_rejects_sqlite(self):
+        """Test the journal refuses to wrap the SQLite store."""
+        with self.assertRaises(ValueError):
+            open_journal({'EXPENSE_JOURNAL_DIR': 'unused', 'EXPENSE_STORE': 'sqlite'}, None)
+    
+    def test_rejects_snapshot_path(self):
+        """Test the journal refuses to start over a mapped seed snapshot."""
+        with self.assertRaises(ValueError):
+            open_journal({'EXPENSE_JOURNAL_DIR': 'unused', 'EXPENSE_STORE': 'columnar',
+                          'EXPENSE_SNAPSHOT_PATH': 'seed.bin'}, None)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
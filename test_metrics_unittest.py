@@ -0,0 +1,92 @@
+"""
+Test Suite for Request Metrics (using unittest)
+Tests histogram bucketing, status counts and the Prometheus text format.
+Run with: python test_metrics_unittest.py
+"""
+
+import unittest
+
+from metrics import FLUSH_EVERY, LATENCY_BUCKETS, RequestMetrics
+
+
+def samples(text):
+    """Return the ``name{labels} value`` lines of a scrape as a dict."""
+    return dict(line.rsplit(' ', 1) for line in text.splitlines() if not line.startswith('#'))
+
+
+class TestRequestMetrics(unittest.TestCase):
+    """Test the RequestMetrics class."""
+    
+    def setUp(self):
+        """Set up empty metrics."""
+        self.metrics = RequestMetrics()
+    
+    def test_latency_buckets_are_cumulative(self):
+        """Test each bucket counts every request at or under its bound."""
+        for seconds in (0.0004, 0.001, 0.003, 20.0):
+            self.metrics.observe('index', 'GET', 200, seconds)
+        
+        lines = samples(self.metrics.render())
+        bucket = 'expense_http_request_duration_seconds_bucket{route="index",method="GET",le="%s"}'
+        self.assertEqual(lines[bucket % 0.0005], '1')
+        self.assertEqual(lines[bucket % 0.001], '2')
+        self.assertEqual(lines[bucket % 0.005], '3')
+        self.assertEqual(lines[bucket % LATENCY_BUCKETS[-1]], '3')
+        self.assertEqual(lines[bucket % '+Inf'], '4')
+        self.assertEqual(
+            lines['expense_http_request_duration_seconds_count{route="index",method="GET"}'], '4')
+        self.assertAlmostEqual(float(
+            lines['expense_http_request_duration_seconds_sum{route="index",method="GET"}']), 20.0044)
+    
+    def test_status_counts_and_sizes(self):
+        """Test requests are counted per status and only known sizes are observed."""
+        self.metrics.observe('add_expense', 'POST', 302, 0.01, 200)
+        self.metrics.observe('add_expense', 'POST', 302, 0.01, 5000)
+        self.metrics.observe('add_expense', 'POST', 400, 0.01, None)
+        
+        lines = samples(self.metrics.render())
+        self.assertEqual(lines['expense_http_requests_total'
+                               '{route="add_expense",method="POST",status="302"}'], '2')
+        self.assertEqual(lines['expense_http_requests_total'
+                               '{route="add_expense",method="POST",status="400"}'], '1')
+        size = 'expense_http_response_size_bytes_%s{route="add_expense",method="POST"%s}'
+        self.assertEqual(lines[size % ('bucket', ',le="256"')], '1')
+        self.assertEqual(lines[size % ('bucket', ',le="+Inf"')], '2')
+        self.assertEqual(lines[size % ('sum', '')], '5200')
+    
+    def test_gauges_and_types(self):
+        """Test gauges are appended with HELP and TYPE lines."""
+        text = self.metrics.render([('expense_store_rows', 'Expenses stored.', 7)])
+        
+        self.assertIn('# TYPE expense_store_rows gauge\nexpense_store_rows 7\n', text)
+        self.assertIn('# TYPE expense_http_request_duration_seconds histogram', text)
+        self.assertTrue(text.endswith('\n'))
+    
+    def test_label_escaping(self):
+        """Test quotes and backslashes in label values are escaped."""
+        self.metrics.observe('a"b\\c', 'GET', 200, 0.1)
+        
+        self.assertIn('route="a\\"b\\\\c"', self.metrics.render())
+    
+    def test_observations_flush_in_batches(self):
+        """Test queued observations are folded in every FLUSH_EVERY and on render."""
+        for _ in range(FLUSH_EVERY + 3):
+            self.metrics.observe('index', 'GET', 200, 0.001)
+        
+        self.assertEqual(len(self.metrics._pending), 3)
+        lines = samples(self.metrics.render())
+        self.assertEqual(
+            lines['expense_http_requests_total{route="index",method="GET",status="200"}'],
+            str(FLUSH_EVERY + 3))
+        self.assertEqual(len(self.metrics._pending), 0)
+    
+    def test_reset(self):
+        """Test reset forgets every observation."""
+        self.metrics.observe('index', 'GET', 200, 0.1)
+        self.metrics.reset()
+        
+        self.assertNotIn('route="index"', self.metrics.render())
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
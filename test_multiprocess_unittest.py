@@ -0,0 +1,120 @@
+"""
+Test Suite for Multi-Process Mode (using unittest)
+Tests several worker processes sharing one SQLite database: rows, ids,
+ETags and rendered pages must agree whichever worker serves a request.
+Run with: python test_multiprocess_unittest.py
+"""
+
+import multiprocessing
+import os
+import tempfile
+import unittest
+
+from models import Expense
+from sqlite_store import SQLiteExpenseStore
+
+WORKERS = 4
+ROWS = 25
+BULK_ROWS = 20
+
+
+def _app_worker(db_path, worker, barrier, results):
+    """Serve requests from a freshly started app process sharing ``db_path``."""
+    os.environ.update(EXPENSE_STORE='sqlite', EXPENSE_DB_PATH=db_path, EXPENSE_MULTIPROCESS='1')
+    from app import app
+    
+    client = app.test_client()
+    before = client.get('/api/summary').headers['ETag']
+    client.get('/')
+    barrier.wait()
+    for i in range(ROWS):
+        client.post('/add', data={'amount': '1.00', 'category': 'Other',
+                                  'description': f'Worker {worker} row {i}'})
+    rows = [{'amount': 2.00, 'category': 'Food & Dining', 'description': f'Worker {worker} bulk'}
+            for _ in range(BULK_ROWS)]
+    bulk = client.post('/api/expenses/bulk', json=rows).get_json()
+    barrier.wait()
+    summary = client.get('/api/summary')
+    page = client.get('/').get_data(as_text=True)
+    ids = [e['id'] for e in client.get('/api/expenses?limit=1000').get_json()['expenses']]
+    results.put({
+        'worker': worker,
+        'created': bulk['created'],
+        'etag_before': before,
+        'etag': summary.headers['ETag'],
+        'summary': summary.get_json(),
+        'ids': ids,
+        'page_shows_all': all(f'Worker {w} row {ROWS - 1}' in page for w in range(WORKERS)),
+    })
+
+
+def _store_worker(store, results):
+    """Add rows through a store object inherited across fork()."""
+    inherited = len(store._connections)
+    allocator = store.id_allocator()
+    for i in range(ROWS):
+        store.add(Expense(1.00, 'Other', f'Forked {i}', expense_id=allocator.allocate()))
+    results.put(inherited)
+
+
+class TestMultiProcess(unittest.TestCase):
+    """Test worker processes stay consistent through a shared SQLite database."""
+    
+    def setUp(self):
+        """Set up an empty database path."""
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.db_path = os.path.join(tmp.name, 'expenses.db')
+    
+    def run_workers(self, context, target, args_for):
+        """Start WORKERS processes, collect one result from each and wait for them."""
+        results = context.Queue()
+        processes = [context.Process(target=target, args=args_for(worker) + (results,))
+                     for worker in range(WORKERS)]
+        for process in processes:
+            process.start()
+        collected = [results.get(timeout=60) for _ in processes]
+        for process in processes:
+            process.join(timeout=60)
+            self.assertEqual(process.exitcode, 0)
+        return collected
+    
+    def test_app_workers_share_state(self):
+        """Test concurrent writes from every worker are seen identically by all of them."""
+        context = multiprocessing.get_context('spawn')
+        barrier = context.Barrier(WORKERS)
+        results = self.run_workers(context, _app_worker,
+                                   lambda worker: (self.db_path, worker, barrier))
+        
+        expected = WORKERS * (ROWS + BULK_ROWS)
+        all_ids = results[0]['ids']
+        self.assertEqual(len(all_ids), expected)
+        self.assertEqual(len(set(all_ids)), expected)
+        for result in results:
+            self.assertEqual(result['created'], BULK_ROWS)
+            self.assertEqual(result['ids'], all_ids)
+            self.assertEqual(result['summary'], results[0]['summary'])
+            self.assertEqual(result['summary']['count'], expected)
+            self.assertEqual(result['etag'], results[0]['etag'])
+            self.assertNotEqual(result['etag'], result['etag_before'])
+            self.assertTrue(result['page_shows_all'])
+    
+    @unittest.skipUnless('fork' in multiprocessing.get_all_start_methods(),
+                         'fork() is not available')
+    def test_forked_workers_reopen_connections(self):
+        """Test workers forked after the store opened use their own connections."""
+        store = SQLiteExpenseStore(self.db_path)
+        self.addCleanup(store.close)
+        store.add(Expense(5.00, 'Other', 'Before fork', expense_id=store.id_allocator().allocate()))
+        
+        inherited = self.run_workers(multiprocessing.get_context('fork'), _store_worker,
+                                     lambda worker: (store,))
+        
+        self.assertEqual(inherited, [0] * WORKERS)
+        self.assertEqual(len(store), 1 + WORKERS * ROWS)
+        self.assertEqual(len({e.id for e in store}), 1 + WORKERS * ROWS)
+        self.assertEqual(store.version, 1 + WORKERS * ROWS)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
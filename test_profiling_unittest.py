@@ -0,0 +1,145 @@
+"""
+Test Suite for Request Profiling (using unittest)
+Tests header and sampled profiling, attachments, profile files and that
+profiling is off by default.
+Run with: python test_profiling_unittest.py
+"""
+
+import json
+import os
+import pstats
+import shutil
+import tempfile
+import unittest
+
+from werkzeug.test import Client
+
+import app as app_module
+from app import app, expenses
+from models import Expense
+from profiling import RequestProfiler, open_profiler
+
+
+class TestRequestProfiler(unittest.TestCase):
+    """Test the RequestProfiler middleware around the app."""
+    
+    def setUp(self):
+        """Set up a store with a few rows and a scratch directory."""
+        expenses.clear()
+        for i in range(3):
+            expenses.add(Expense(10.0 + i, 'Food', f'Lunch {i}', '2024-01-0%d' % (i + 1)))
+        self.directory = tempfile.mkdtemp()
+    
+    def tearDown(self):
+        """Remove the scratch directory."""
+        shutil.rmtree(self.directory, ignore_errors=True)
+    
+    def client(self, **options):
+        """Return a test client for the app wrapped in a profiler."""
+        return Client(RequestProfiler(app.wsgi_app, app.url_map, expenses, **options))
+    
+    def test_disabled_by_default(self):
+        """Test nothing wraps the app unless profiling is configured."""
+        self.assertIsNone(open_profiler({}, app.wsgi_app, app.url_map, expenses))
+        self.assertIsNone(app_module.profiler)
+        self.assertNotIsInstance(app.wsgi_app, RequestProfiler)
+    
+    def test_requests_without_header_are_served_normally(self):
+        """Test a request without the header gets the plain response."""
+        response = self.client(header='X-Profile').get('/api/summary')
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.get_data())['count'], 3)
+        self.assertNotIn('Content-Disposition', response.headers)
+    
+    def test_header_returns_report_attachment(self):
+        """Test a flagged request returns a text report with route and store size."""
+        response = self.client(header='X-Profile').get('/api/summary',
+                                                       headers={'X-Profile': '1'})
+        report = response.get_data(as_text=True)
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers['X-Profiled-Status'], '200 OK')
+        self.assertIn('attachment; filename="get_summary_api-3rows-',
+                      response.headers['Content-Disposition'])
+        self.assertIn('Route: get_summary_api (GET /api/summary)', report)
+        self.assertIn('Store rows: 3', report)
+        self.assertIn('cumulative', report)
+    
+    def test_token_must_match(self):
+        """Test the header only profiles when its value is the token."""
+        client = self.client(header='X-Profile', token='secret')
+        
+        wrong = client.get('/api/summary', headers={'X-Profile': 'guess'})
+        right = client.get('/api/summary', headers={'X-Profile': 'secret'})
+        
+        self.assertNotIn('Content-Disposition', wrong.headers)
+        self.assertIn('Content-Disposition', right.headers)
+    
+    def test_non_ascii_token_and_header(self):
+        """Test non-ASCII header values are compared as the UTF-8 bytes sent."""
+        client = self.client(header='X-Profile', token='clé')
+        # WSGI servers decode header bytes as latin-1
+        sent = 'clé'.encode('utf-8').decode('latin-1')
+        
+        wrong = client.get('/api/summary', headers={'X-Profile': 'naïve'})
+        right = client.get('/api/summary', headers={'X-Profile': sent})
+        
+        self.assertEqual(wrong.status_code, 200)
+        self.assertNotIn('Content-Disposition', wrong.headers)
+        self.assertIn('Content-Disposition', right.headers)
+    
+    def test_directory_keeps_response_and_writes_stats(self):
+        """Test stats go to a .prof file and the response is unchanged."""
+        client = self.client(header='X-Profile', directory=self.directory)
+        
+        response = client.get('/api/expenses', headers={'X-Profile': '1'})
+        path = response.headers['X-Profile-File']
+        
+        self.assertEqual(len(json.loads(response.get_data())), 3)
+        self.assertEqual(os.path.dirname(path), self.directory)
+        self.assertTrue(os.path.basename(path).startswith('get_expenses_api-3rows-'))
+        self.assertGreater(pstats.Stats(path).total_calls, 0)
+    
+    def test_streamed_body_is_profiled_whole(self):
+        """Test a streamed response is complete when profiled."""
+        client = self.client(header='X-Profile', directory=self.directory)
+        
+        response = client.get('/api/expenses', headers={'X-Profile': '1',
+                                                        'Accept': 'application/x-ndjson'})
+        
+        self.assertEqual(len(response.get_data().splitlines()), 3)
+        self.assertIn('X-Profile-File', response.headers)
+    
+    def test_sampling(self):
+        """Test a sample rate of 1 profiles every request to the directory."""
+        client = self.client(sample_rate=1.0, directory=self.directory)
+        
+        client.get('/')
+        client.get('/no-such-page')
+        
+        names = sorted(os.listdir(self.directory))
+        self.assertEqual(len(names), 2)
+        self.assertTrue(names[0].startswith('index-3rows-'))
+        self.assertTrue(names[1].startswith('unmatched-3rows-'))
+    
+    def test_sampling_requires_directory(self):
+        """Test sampled profiles cannot replace bodies clients did not ask for."""
+        with self.assertRaises(ValueError):
+            open_profiler({'PROFILE_SAMPLE_RATE': 0.1}, app.wsgi_app, app.url_map, expenses)
+        with self.assertRaises(ValueError):
+            self.client(sample_rate=2.0, directory=self.directory)
+    
+    def test_busy_profiler_serves_unprofiled(self):
+        """Test a request arriving during another profile is served normally."""
+        profiler = RequestProfiler(app.wsgi_app, app.url_map, expenses, header='X-Profile')
+        
+        with profiler._lock:
+            response = Client(profiler).get('/api/summary', headers={'X-Profile': '1'})
+        
+        self.assertNotIn('Content-Disposition', response.headers)
+        self.assertEqual(json.loads(response.get_data())['count'], 3)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,76 @@
+"""
+Test Suite for the Render Cache (using unittest)
+Tests LRU eviction, the memory cap and hit statistics.
+Run with: python test_render_cache_unittest.py
+"""
+
+import unittest
+
+from render_cache import RenderCache
+
+
+class TestRenderCache(unittest.TestCase):
+    """Test the RenderCache class."""
+    
+    def setUp(self):
+        """Set up a small cache and a counting renderer."""
+        self.cache = RenderCache(max_entries=2, max_bytes=100)
+        self.renders = []
+    
+    def render(self, value):
+        """Return a render function that records its calls."""
+        def render():
+            self.renders.append(value)
+            return value
+        return render
+    
+    def test_hit_skips_render(self):
+        """Test a repeated key is served without rendering again."""
+        self.cache.get_or_render('a', self.render('A'))
+        
+        self.assertEqual(self.cache.get_or_render('a', self.render('other')), 'A')
+        self.assertEqual(self.renders, ['A'])
+        stats = self.cache.stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['hit_rate']), (1, 1, 0.5))
+    
+    def test_evicts_least_recently_used(self):
+        """Test the entry limit evicts the least recently used key."""
+        self.cache.get_or_render('a', self.render('A'))
+        self.cache.get_or_render('b', self.render('B'))
+        self.cache.get_or_render('a', self.render('A'))
+        self.cache.get_or_render('c', self.render('C'))
+        
+        self.cache.get_or_render('a', self.render('A'))
+        self.cache.get_or_render('b', self.render('B'))
+        
+        self.assertEqual(self.renders, ['A', 'B', 'C', 'B'])
+        self.assertEqual(self.cache.stats()['evictions'], 2)
+    
+    def test_byte_cap(self):
+        """Test entries are evicted to stay under the byte cap."""
+        self.cache.get_or_render('a', self.render('x' * 60))
+        self.cache.get_or_render('b', self.render('y' * 60))
+        
+        stats = self.cache.stats()
+        self.assertEqual((stats['entries'], stats['bytes']), (1, 60))
+    
+    def test_oversized_value_not_cached(self):
+        """Test a value larger than the cap is returned but not stored."""
+        value = self.cache.get_or_render('a', self.render('é' * 60))
+        
+        self.assertEqual(value, 'é' * 60)
+        self.assertEqual(self.cache.stats()['entries'], 0)
+    
+    def test_get_and_put(self):
+        """Test values stored with put are charged the given size and found by get."""
+        self.assertIsNone(self.cache.get('a'))
+        self.cache.put('a', ('text/plain', b'abc'), 3, seconds=0.5)
+        
+        self.assertEqual(self.cache.get('a'), ('text/plain', b'abc'))
+        stats = self.cache.stats()
+        self.assertEqual((stats['bytes'], stats['hits'], stats['misses']), (3, 1, 1))
+        self.assertEqual(stats['render_ms_total'], 500)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,56 @@
+"""
+Test Suite for the Search Index (using unittest)
+Tests tokenizing, prefix term lookup and candidate merging.
+Run with: python test_search_unittest.py
+"""
+
+import unittest
+
+from search import SearchIndex, matches, tokenize
+
+
+class TestSearchIndex(unittest.TestCase):
+    """Test the SearchIndex class."""
+    
+    def setUp(self):
+        """Set up an index with a low merge threshold."""
+        self.index = SearchIndex()
+        self.index.merge_min = 2
+    
+    def test_tokenize(self):
+        """Test tokens are lower-cased, split on punctuation and deduplicated."""
+        self.assertEqual(tokenize('Café, CAFÉ & bar-b-q 2x'), ['café', 'bar', 'b', 'q', '2x'])
+    
+    def test_terms_span_merged_and_pending(self):
+        """Test prefix lookup sees both merged and not yet merged terms."""
+        for expense_id, text in enumerate(['apple', 'apricot', 'banana', 'avocado', 'apex'], 1):
+            self.index.add(expense_id, text)
+        
+        self.assertEqual(sorted(self.index.terms('ap')), ['apex', 'apple', 'apricot'])
+        self.assertEqual(self.index.terms('z'), [])
+        self.assertEqual(self.index.count('a'), 4)
+    
+    def test_candidates_merge_terms_in_id_order(self):
+        """Test ids posted under several matching terms come once, ascending."""
+        self.index.add(3, 'taxi tax')
+        self.index.add(1, 'taxes')
+        self.index.add(2, 'taxi')
+        
+        self.assertEqual(list(self.index.candidates('tax')), [1, 2, 3])
+        self.assertEqual(list(self.index.candidates('tax', after_id=1)), [2, 3])
+    
+    def test_readding_id_does_not_duplicate(self):
+        """Test indexing an id twice under one term keeps one posting."""
+        self.index.add(5, 'rent')
+        self.index.add(5, 'rent')
+        
+        self.assertEqual(list(self.index.candidates('rent')), [5])
+    
+    def test_matches(self):
+        """Test every prefix must start some token."""
+        self.assertTrue(matches('Team lunch downtown', ['lun', 'team']))
+        self.assertFalse(matches('Team lunch downtown', ['lun', 'town']))
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,182 @@
+"""
+Test Suite for Expense Snapshots (using unittest)
+Tests the binary snapshot format and memory-mapped columnar loading.
+Run with: python test_snapshot_unittest.py
+"""
+
+import os
+import tempfile
+import unittest
+
+from journal import ExpenseJournal
+from models import Expense
+from snapshot import HEADER, MAGIC, MappedSnapshot, SnapshotError, capture, write_snapshot
+from store import ColumnarExpenseStore, ExpenseStore, store_from_config
+
+
+def sample_store(store_class=ExpenseStore):
+    """Return a store holding a few expenses."""
+    store = store_class()
+    store.add(Expense(12.50, 'Food & Dining', 'Café crème', date='2024-01-02'))
+    store.add(Expense(40.00, 'Shopping', 'Shoes', date='2024-01-03'))
+    store.add(Expense(7.25, 'Pets', 'Treats', date='2024-01-04'))
+    return store
+
+
+class TestSnapshotFormat(unittest.TestCase):
+    """Test writing and mapping snapshot files."""
+    
+    def setUp(self):
+        """Set up a temporary snapshot path."""
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, 'expenses.bin')
+    
+    def test_round_trip(self):
+        """Test every field survives a write and map."""
+        store = sample_store()
+        write_snapshot(self.path, capture(store))
+        
+        mapped = MappedSnapshot(self.path)
+        
+        self.assertEqual(mapped.rows, 3)
+        self.assertEqual([e.to_dict() for e in mapped], [e.to_dict() for e in store])
+    
+    def test_category_table(self):
+        """Test per-category counts and sums are stored in the header."""
+        write_snapshot(self.path, capture(sample_store()))
+        
+        mapped = MappedSnapshot(self.path)
+        totals = dict(zip(mapped.category_names, mapped.category_sums))
+        
+        self.assertEqual(totals, {'Food & Dining': 12.50, 'Shopping': 40.00, 'Pets': 7.25})
+    
+    def test_empty_snapshot(self):
+        """Test an empty store round-trips."""
+        write_snapshot(self.path, capture(ExpenseStore()))
+        
+        self.assertEqual(list(MappedSnapshot(self.path)), [])
+    
+    def test_bad_magic(self):
+        """Test files that are not snapshots are rejected."""
+        with open(self.path, 'wb') as f:
+            f.write(b'{"not": "a snapshot"}' * 4)
+        
+        with self.assertRaises(SnapshotError):
+            MappedSnapshot(self.path)
+    
+    def test_unsupported_version(self):
+        """Test snapshots from another format version are rejected."""
+        with open(self.path, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, 99, 0, 0, 0))
+        
+        with self.assertRaises(SnapshotError):
+            MappedSnapshot(self.path)
+    
+    def test_truncated(self):
+        """Test a cut-off snapshot is rejected."""
+        write_snapshot(self.path, capture(sample_store()))
+        with open(self.path, 'r+b') as f:
+            f.truncate(os.path.getsize(self.path) - 20)
+        
+        with self.assertRaises(SnapshotError):
+            MappedSnapshot(self.path)
+
+
+class TestMappedColumnarStore(unittest.TestCase):
+    """Test serving a columnar store from a mapped snapshot."""
+    
+    def setUp(self):
+        """Set up a columnar store loaded from a snapshot."""
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, 'expenses.bin')
+        self.source = sample_store()
+        write_snapshot(self.path, capture(self.source))
+        self.store = ColumnarExpenseStore()
+        self.store.load_snapshot(self.path)
+    
+    def test_reads_without_copying(self):
+        """Test reads and summaries are served from the mapped columns."""
+        self.assertEqual([e.to_dict() for e in self.store], [e.to_dict() for e in self.source])
+        self.assertEqual(self.store.category_total('Shopping'), 40.00)
+        self.assertEqual(len(self.store), 3)
+        self.assertTrue(self.store.is_mapped)
+    
+    def test_delete_keeps_mapping(self):
+        """Test deletes only flip live flags and leave the mapping in place."""
+        first = self.source[0]
+        
+        self.store.delete(first.id)
+        
+        self.assertTrue(self.store.is_mapped)
+        self.assertNotIn(first.id, self.store)
+        self.assertEqual(self.store.category_totals(), {'Shopping': 40.00, 'Pets': 7.25})
+    
+    def test_add_copies_columns(self):
+        """Test adding a row copies the columns and keeps mapped rows readable."""
+        added = self.store.add(Expense(3.00, 'Other', 'New', date='2024-02-01'))
+        
+        self.assertFalse(self.store.is_mapped)
+        self.assertEqual(self.store.get(added.id).description, 'New')
+        self.assertEqual(self.store[0].description, 'Café crème')
+        self.assertEqual(len(self.store), 4)
+    
+    def test_rollup_matches_source(self):
+        """Test rollups are built from the mapped columns and kept current."""
+        self.assertEqual(self.store.rollup('month'), self.source.rollup('month'))
+        
+        self.store.delete(self.source[0].id)
+        self.source.delete(self.source[0].id)
+        
+        self.assertEqual(self.store.rollup('day'), self.source.rollup('day'))
+    
+    def test_snapshot_of_mapped_store(self):
+        """Test a mapped store can itself be snapshotted."""
+        other = os.path.join(os.path.dirname(self.path), 'copy.bin')
+        
+        write_snapshot(other, capture(self.store))
+        
+        self.assertEqual([e.to_dict() for e in MappedSnapshot(other)],
+                         [e.to_dict() for e in self.source])
+    
+    def test_store_from_config(self):
+        """Test EXPENSE_SNAPSHOT_PATH maps the snapshot at startup."""
+        store = store_from_config({'EXPENSE_STORE': 'columnar',
+                                   'EXPENSE_SNAPSHOT_PATH': self.path})
+        
+        self.assertTrue(store.is_mapped)
+        self.assertEqual(len(store), 3)
+    
+    def test_store_from_config_requires_columnar(self):
+        """Test the snapshot path is rejected for stores that cannot map it."""
+        with self.assertRaises(ValueError):
+            store_from_config({'EXPENSE_STORE': 'memory', 'EXPENSE_SNAPSHOT_PATH': self.path})
+
+
+class TestJournalBinarySnapshots(unittest.TestCase):
+    """Test the journal writes binary snapshots and maps them on recovery."""
+    
+    def test_recover_maps_snapshot(self):
+        """Test recovery into a columnar store maps the snapshot."""
+        with tempfile.TemporaryDirectory() as directory:
+            journal = ExpenseJournal(directory, commit_delay=0)
+            store = ColumnarExpenseStore()
+            journal.recover(store)
+            for expense in sample_store():
+                journal.record_add(store.add(expense))
+            journal.snapshot(store, wait=True)
+            journal.close()
+            
+            recovered = ColumnarExpenseStore()
+            journal = ExpenseJournal(directory, commit_delay=0)
+            journal.recover(recovered)
+            journal.close()
+            
+            self.assertTrue(any(n.endswith('.bin') for n in os.listdir(directory)))
+            self.assertTrue(recovered.is_mapped)
+            self.assertEqual([e.to_dict() for e in recovered], [e.to_dict() for e in store])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
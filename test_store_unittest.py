@@ -0,0 +1,702 @@
+"""
+Test Suite for the Expense Store (using unittest)
+Tests indexed storage used by the Expense Tracker application.
+Run with: python test_store_unittest.py
+"""
+
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import unittest
+from datetime import date
+
+import models
+from app import Expense
+from sqlite_store import SQLiteExpenseStore
+from store import ColumnarExpenseStore, ExpenseStore, create_store, store_from_config
+
+
+def ordinal(day):
+    """Return the date ordinal of an ISO date string."""
+    return date.fromisoformat(day).toordinal()
+
+
+def ids(rows):
+    """Return the ids of a sequence of expenses."""
+    return [e.id for e in rows]
+
+
+class TestExpenseStore(unittest.TestCase):
+    """Test the indexed ExpenseStore."""
+    
+    store_class = ExpenseStore
+    
+    def setUp(self):
+        """Set up an empty store."""
+        self.store = self.make_store()
+    
+    def make_store(self):
+        """Create the store under test."""
+        return self.store_class()
+    
+    def test_add_and_get(self):
+        """Test adding an expense and looking it up by id."""
+        expense = self.store.add(Expense(12.00, 'Shopping', 'Socks'))
+        
+        self.assertEqual(self.store.get(expense.id).to_dict(), expense.to_dict())
+        self.assertIn(expense.id, self.store)
+        self.assertEqual(len(self.store), 1)
+    
+    def test_get_missing(self):
+        """Test looking up an unknown id returns None."""
+        self.assertIsNone(self.store.get(424242))
+        self.assertNotIn(424242, self.store)
+    
+    def test_ids_out_of_range_are_missing(self):
+        """Test ids beyond MAX_EXPENSE_ID, even beyond 64 bits, are never found."""
+        self.store.add(Expense(1.00, 'Other', 'Kept'))
+        
+        for expense_id in (models.MAX_EXPENSE_ID + 1, 2**63, 2**70, -2**63 - 1):
+            self.assertIsNone(self.store.get(expense_id))
+            self.assertNotIn(expense_id, self.store)
+            self.assertIsNone(self.store.delete(expense_id))
+        self.assertEqual(self.store.page(2**63), [])
+        self.assertEqual(self.store.search('kept', after_id=2**63), [])
+        self.assertEqual(len(self.store), 1)
+    
+    def test_id_range(self):
+        """Test every store accepts ids up to MAX_EXPENSE_ID and refuses larger ones."""
+        largest = self.store.add(Expense(1.00, 'Other', 'Largest',
+                                         expense_id=models.MAX_EXPENSE_ID))
+        
+        self.assertEqual(self.store.get(largest.id).description, 'Largest')
+        self.assertEqual(ids(self.store.date_range()), [largest.id])
+        with self.assertRaises(ValueError):
+            self.store.add(Expense(1.00, 'Other', 'Too large',
+                                   expense_id=models.MAX_EXPENSE_ID + 1))
+        with self.assertRaises(ValueError):
+            self.store.add_many([Expense(1.00, 'Other', 'Too large', expense_id=2**63 - 1)])
+        self.assertEqual(len(self.store), 1)
+    
+    def test_delete_keeps_insertion_order(self):
+        """Test that deleting preserves the order of the remaining rows."""
+        rows = [self.store.add(Expense(i + 1, 'Other', f'Row {i}')) for i in range(5)]
+        
+        removed = self.store.delete(rows[2].id)
+        
+        self.assertEqual(removed.id, rows[2].id)
+        self.assertEqual(ids(self.store), [rows[i].id for i in (0, 1, 3, 4)])
+        self.assertEqual(self.store[2].id, rows[3].id)
+        self.assertEqual(self.store[-1].id, rows[4].id)
+    
+    def test_delete_missing(self):
+        """Test deleting an unknown id returns None."""
+        self.assertIsNone(self.store.delete(424242))
+    
+    def test_duplicate_id_rejected(self):
+        """Test that adding a second expense with the same id fails."""
+        expense = self.store.add(Expense(5.00, 'Other', 'First'))
+        
+        with self.assertRaises(ValueError):
+            self.store.add(Expense(6.00, 'Other', 'Second', expense_id=expense.id))
+    
+    def test_page(self):
+        """Test keyset pages walk the rows in id order without repeats."""
+        rows = [self.store.add(Expense(1.00, 'Other', f'Row {i}')) for i in range(7)]
+        self.store.delete(rows[3].id)
+        
+        first = self.store.page(0, 3)
+        second = self.store.page(first[-1].id, 3)
+        last = self.store.page(second[-1].id, 3)
+        
+        self.assertEqual(ids(first), ids(rows[:3]))
+        self.assertEqual(ids(second), ids(rows[4:7]))
+        self.assertEqual(last, [])
+    
+    def test_page_by_category(self):
+        """Test paging one category skips the others."""
+        rows = [self.store.add(Expense(1.00, 'Shopping' if i % 3 else 'Other', f'Row {i}'))
+                for i in range(9)]
+        other = [e for e in rows if e.category == 'Other']
+        
+        first = self.store.page(0, 2, 'Other')
+        
+        self.assertEqual(ids(first), ids(other[:2]))
+        self.assertEqual(ids(self.store.page(first[-1].id, 2, 'Other')), ids(other[2:]))
+        self.assertEqual(self.store.page(0, 2, 'Unknown'), [])
+    
+    def test_date_range(self):
+        """Test a date range returns rows by date, then id, with open ends."""
+        days = ['2024-03-05', '2024-01-31', '2024-02-01', '2024-02-29', '2024-02-01']
+        rows = [self.store.add(Expense(i + 1, 'Other' if i % 2 else 'Shopping', f'Row {i}',
+                                       date=day)) for i, day in enumerate(days)]
+        feb1, feb29 = ordinal('2024-02-01'), ordinal('2024-02-29')
+        
+        self.assertEqual(ids(self.store.date_range(feb1, feb29)),
+                         [rows[2].id, rows[4].id, rows[3].id])
+        self.assertEqual(ids(self.store.date_range(None, feb1)),
+                         [rows[1].id, rows[2].id, rows[4].id])
+        self.assertEqual(ids(self.store.date_range(feb1, None, 'Other')), [rows[3].id])
+        self.assertEqual(self.store.range_summary(feb1, feb29), ({'Shopping': 8, 'Other': 4}, 3))
+    
+    def test_date_range_after_delete_and_readd(self):
+        """Test deleted rows drop out and a re-added id shows under its new date."""
+        expense = self.store.add(Expense(5.00, 'Other', 'Moved', date='2024-01-10'))
+        self.store.delete(expense.id)
+        self.store.add(Expense(6.00, 'Other', 'Moved', date='2024-02-10', expense_id=expense.id))
+        
+        self.assertEqual(self.store.date_range(ordinal('2024-01-01'), ordinal('2024-01-31')), [])
+        self.assertEqual([e.amount for e in self.store.date_range()], [6.00])
+    
+    def test_rollup(self):
+        """Test day and month rollups track adds and deletes, within bounds."""
+        rows = [self.store.add(Expense(amount, category, 'Row', date=day))
+                for amount, category, day in ((10.00, 'Shopping', '2024-01-31'),
+                                              (5.00, 'Shopping', '2024-01-31'),
+                                              (2.50, 'Other', '2024-01-31'),
+                                              (4.00, 'Shopping', '2024-02-01'))]
+        self.store.delete(rows[2].id)
+        
+        self.assertEqual(self.store.rollup('day'), [('2024-01-31', 'Shopping', 2, 15.00),
+                                                    ('2024-02-01', 'Shopping', 1, 4.00)])
+        self.assertEqual(self.store.rollup('month'), [('2024-01', 'Shopping', 2, 15.00),
+                                                      ('2024-02', 'Shopping', 1, 4.00)])
+        self.assertEqual(self.store.rollup('day', ordinal('2024-02-01')),
+                         [('2024-02-01', 'Shopping', 1, 4.00)])
+        # Month rows cover every month the bounds touch.
+        self.assertEqual(len(self.store.rollup('month', None, ordinal('2024-02-01'))), 2)
+        self.store.clear()
+        self.assertEqual(self.store.rollup('month'), [])
+        with self.assertRaises(ValueError):
+            self.store.rollup('week')
+    
+    def test_search(self):
+        """Test search prefix-matches every query word, in id order, with filters."""
+        lunch = self.store.add(Expense(12.00, 'Food & Dining', 'Team lunch downtown',
+                                       date='2024-02-01'))
+        taxi = self.store.add(Expense(30.00, 'Transportation', 'Taxi downtown',
+                                      date='2024-03-01'))
+        lunchbox = self.store.add(Expense(8.00, 'Shopping', 'Lunchbox', date='2024-02-15'))
+        
+        self.assertEqual(ids(self.store.search('lunch')), [lunch.id, lunchbox.id])
+        self.assertEqual(ids(self.store.search('DOWN')), [lunch.id, taxi.id])
+        self.assertEqual(ids(self.store.search('team down')), [lunch.id])
+        self.assertEqual(self.store.search('team taxi'), [])
+        self.assertEqual(self.store.search('  '), [])
+        self.assertEqual(ids(self.store.search('lunch', category='Shopping')), [lunchbox.id])
+        self.assertEqual(ids(self.store.search('down', first=ordinal('2024-02-20'))), [taxi.id])
+        self.assertEqual(ids(self.store.search('down', last=ordinal('2024-02-20'))), [lunch.id])
+        self.assertEqual(ids(self.store.search('lunch', after_id=lunch.id)), [lunchbox.id])
+        self.assertEqual(ids(self.store.search('lunch', limit=1)), [lunch.id])
+    
+    def test_search_after_delete_and_readd(self):
+        """Test search drops deleted rows and sees later adds and re-added ids."""
+        expense = self.store.add(Expense(5.00, 'Other', 'Parking meter'))
+        self.assertEqual(ids(self.store.search('park')), [expense.id])
+        
+        self.store.delete(expense.id)
+        self.assertEqual(self.store.search('park'), [])
+        self.store.add(Expense(5.00, 'Other', 'Museum ticket', expense_id=expense.id))
+        added = self.store.add(Expense(9.00, 'Other', 'Parking garage'))
+        
+        self.assertEqual(ids(self.store.search('park')), [added.id])
+        self.assertEqual(ids(self.store.search('museum')), [expense.id])
+    
+    def test_page_after_out_of_order_id(self):
+        """Test an explicitly lower id is placed in id order for paging."""
+        later = self.store.add(Expense(1.00, 'Other', 'Later', expense_id=700002))
+        earlier = self.store.add(Expense(1.00, 'Other', 'Earlier', expense_id=700001))
+        
+        self.assertEqual(ids(self.store.page(700000, 10)), [earlier.id, later.id])
+    
+    def test_max_id(self):
+        """Test max_id skips deleted ids and is 0 for an empty store."""
+        self.assertEqual(self.store.max_id(), 0)
+        self.store.add(Expense(1.00, 'Other', 'Later', expense_id=800003))
+        self.store.add(Expense(1.00, 'Other', 'Earlier', expense_id=800001))
+        self.store.add(Expense(1.00, 'Other', 'Middle', expense_id=800002))
+        
+        self.assertEqual(self.store.max_id(), 800003)
+        self.store.delete(800003)
+        self.assertEqual(self.store.max_id(), 800002)
+        self.store.clear()
+        self.assertEqual(self.store.max_id(), 0)
+    
+    def test_page_after_many_deletes(self):
+        """Test paging stays correct once deleted ids are purged from the index."""
+        rows = [self.store.add(Expense(1.00, 'Other', f'Row {i}')) for i in range(3000)]
+        for expense in rows[:2900]:
+            self.store.delete(expense.id)
+        
+        self.assertEqual(ids(self.store.page(0, 200)), ids(rows[2900:]))
+    
+    def test_clear(self):
+        """Test clearing the store."""
+        self.store.add(Expense(1.00, 'Other', 'A'))
+        self.store.add(Expense(2.00, 'Other', 'B'))
+        
+        self.store.clear()
+        
+        self.assertEqual(len(self.store), 0)
+        self.assertEqual(list(self.store), [])
+        with self.assertRaises(IndexError):
+            self.store[0]
+    
+    def test_add_many(self):
+        """Test a batch is stored in id order with one version bump."""
+        self.store.add(Expense(1.00, 'Other', 'Existing'))
+        version = self.store.version
+        batch = [Expense(2.00, 'Shopping', f'Row {i}') for i in range(5)]
+        
+        self.store.add_many(batch)
+        
+        self.assertEqual(self.store.version, version + 1)
+        self.assertEqual(ids(self.store)[1:], ids(batch))
+        self.assertEqual(self.store.category_total('Shopping'), 10.00)
+    
+    def test_add_many_back_dated(self):
+        """Test a batch dated before and between stored rows is merged into date order."""
+        later = [self.store.add(Expense(1.00, 'Other', f'Later {i}', date=f'2024-03-0{i + 1}'))
+                 for i in range(3)]
+        self.store.date_range(None, None)
+        batch = [Expense(2.00, 'Other', f'Batch {i}', date=day)
+                 for i, day in enumerate(['2024-03-02', '2024-01-15', '2024-03-09', '2024-01-01'])]
+        
+        self.store.add_many(batch)
+        self.store.delete(batch[1].id)
+        self.store.add_many([Expense(2.00, 'Other', 'Again', date='2024-01-15',
+                                     expense_id=batch[1].id)])
+        
+        self.assertEqual(ids(self.store.date_range(None, None)),
+                         [batch[3].id, batch[1].id, later[0].id, later[1].id, batch[0].id,
+                          later[2].id, batch[2].id])
+    
+    def test_add_many_is_all_or_nothing(self):
+        """Test a batch with a taken or repeated id adds nothing."""
+        existing = self.store.add(Expense(1.00, 'Other', 'Existing'))
+        version = self.store.version
+        fresh = Expense(2.00, 'Other', 'Fresh')
+        
+        for batch in ([fresh, Expense(3.00, 'Other', 'Taken', expense_id=existing.id)],
+                      [fresh, Expense(3.00, 'Other', 'Repeat', expense_id=fresh.id)]):
+            with self.assertRaises(ValueError):
+                self.store.add_many(batch)
+        
+        self.assertEqual(ids(self.store), [existing.id])
+        self.assertEqual(self.store.version, version)
+    
+    def test_version_bumps_on_mutation(self):
+        """Test every successful mutation, and only those, bumps the version."""
+        start = self.store.version
+        expense = self.store.add(Expense(1.00, 'Other', 'A'))
+        added = self.store.version
+        self.store.delete(expense.id)
+        deleted = self.store.version
+        
+        self.store.delete(expense.id)
+        self.store.get(expense.id)
+        list(self.store)
+        self.store.category_totals()
+        self.assertEqual(self.store.version, deleted)
+        
+        self.store.clear()
+        self.assertLess(start, added)
+        self.assertLess(added, deleted)
+        self.assertLess(deleted, self.store.version)
+    
+    def test_failed_add_keeps_version(self):
+        """Test a rejected duplicate does not change the version."""
+        expense = self.store.add(Expense(1.00, 'Other', 'A'))
+        version = self.store.version
+        
+        with self.assertRaises(ValueError):
+            self.store.add(Expense(2.00, 'Other', 'B', expense_id=expense.id))
+        
+        self.assertEqual(self.store.version, version)
+
+
+class TestCategoryTotals(unittest.TestCase):
+    """Test the running per-category totals."""
+    
+    store_class = ExpenseStore
+    
+    def setUp(self):
+        """Set up a store with a few expenses."""
+        self.store = self.make_store()
+        self.coffee = self.store.add(Expense(10.00, 'Food & Dining', 'Coffee'))
+        self.shoes = self.store.add(Expense(50.00, 'Shopping', 'Shoes'))
+        self.lunch = self.store.add(Expense(15.00, 'Food & Dining', 'Lunch'))
+    
+    def make_store(self):
+        """Create the store under test."""
+        return self.store_class()
+    
+    def test_totals_after_add(self):
+        """Test counts and sums reflect added expenses."""
+        self.assertEqual(self.store.category_totals(),
+                         {'Food & Dining': 25.00, 'Shopping': 50.00})
+        self.assertEqual(self.store.category_count('Food & Dining'), 2)
+        self.assertEqual(self.store.total(), 75.00)
+        self.assertEqual(ids(self.store.by_category('Food & Dining')),
+                         [self.coffee.id, self.lunch.id])
+    
+    def test_totals_after_delete(self):
+        """Test deleting updates the category running totals."""
+        self.store.delete(self.coffee.id)
+        
+        self.assertEqual(self.store.category_total('Food & Dining'), 15.00)
+        self.assertEqual(self.store.category_count('Food & Dining'), 1)
+    
+    def test_empty_category_dropped(self):
+        """Test deleting the last expense of a category removes it."""
+        self.store.delete(self.shoes.id)
+        
+        self.assertNotIn('Shopping', self.store.category_totals())
+        self.assertEqual(self.store.by_category('Shopping'), [])
+        self.assertEqual(self.store.category_total('Shopping'), 0)
+    
+    def test_totals_after_clear(self):
+        """Test clearing resets the totals."""
+        self.store.clear()
+        
+        self.assertEqual(self.store.category_totals(), {})
+        self.assertEqual(self.store.total(), 0)
+
+
+class TestColumnarExpenseStore(TestExpenseStore):
+    """Run the store tests against the columnar store."""
+    
+    store_class = ColumnarExpenseStore
+    
+    def test_round_trip(self):
+        """Test that materialized rows match what was stored."""
+        expense = self.store.add(Expense(9.99, 'Healthcare', 'Vitamins', date='2024-03-05'))
+        
+        self.assertEqual(self.store.get(expense.id).to_dict(), expense.to_dict())
+    
+    def test_unknown_category_gets_code(self):
+        """Test categories outside CATEGORIES are still stored."""
+        expense = self.store.add(Expense(3.00, 'Pets', 'Treats'))
+        
+        self.assertEqual(self.store.get(expense.id).category, 'Pets')
+        self.assertEqual(self.store.category_totals(), {'Pets': 3.00})
+    
+    def test_compaction_keeps_rows(self):
+        """Test that compacting dead rows keeps order and lookups intact."""
+        rows = [self.store.add(Expense(1.00, 'Other', f'Row {i}')) for i in range(3000)]
+        for expense in rows[:2500]:
+            self.store.delete(expense.id)
+        
+        self.assertEqual(len(self.store), 500)
+        self.assertEqual(ids(self.store), ids(rows[2500:]))
+        self.assertIsNotNone(self.store.get(rows[2999].id))
+        self.assertIsNone(self.store.get(rows[0].id))
+    
+    def test_iteration_survives_compaction(self):
+        """Test iterating while deleting neither skips nor repeats rows."""
+        rows = [self.store.add(Expense(1.00, 'Other', f'Row {i}')) for i in range(3000)]
+        
+        seen = []
+        for expense in self.store:
+            seen.append(expense.id)
+            if expense.id != rows[-1].id:
+                self.store.delete(expense.id)
+        
+        self.assertEqual(seen, ids(rows))
+    
+    def test_out_of_order_id(self):
+        """Test adding an explicit lower id keeps rows sorted by id."""
+        later = self.store.add(Expense(1.00, 'Other', 'Later', expense_id=500000))
+        earlier = self.store.add(Expense(1.00, 'Other', 'Earlier', expense_id=400000))
+        
+        self.assertEqual(ids(self.store), [earlier.id, later.id])
+
+
+class TestColumnarCategoryTotals(TestCategoryTotals):
+    """Run the category total tests against the columnar store."""
+    
+    store_class = ColumnarExpenseStore
+
+
+class SQLiteStoreMixin:
+    """Create SQLite stores in a temporary directory."""
+    
+    store_class = SQLiteExpenseStore
+    
+    def make_store(self):
+        """Create a SQLite store backed by a temporary file."""
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.db_path = os.path.join(tmp.name, 'expenses.db')
+        store = SQLiteExpenseStore(self.db_path)
+        self.addCleanup(store.close)
+        return store
+
+
+class TestSQLiteExpenseStore(SQLiteStoreMixin, TestExpenseStore):
+    """Run the store tests against the SQLite store."""
+    
+    def test_data_survives_reopen(self):
+        """Test that expenses persist across store instances."""
+        expense = self.store.add(Expense(42.00, 'Bills & Utilities', 'Power', date='2024-04-01'))
+        self.store.close()
+        
+        reopened = SQLiteExpenseStore(self.db_path)
+        self.addCleanup(reopened.close)
+        
+        self.assertEqual(reopened.get(expense.id).to_dict(), expense.to_dict())
+        self.assertEqual(reopened.category_totals(), {'Bills & Utilities': 42.00})
+    
+    def test_reopen_advances_ids(self):
+        """Test that new ids continue after the highest stored id."""
+        self.store.add(Expense(1.00, 'Other', 'High id', expense_id=900000))
+        self.store.close()
+        
+        reopened = SQLiteExpenseStore(self.db_path)
+        self.addCleanup(reopened.close)
+        
+        self.assertGreater(Expense(1.00, 'Other', 'Next').id, 900000)
+    
+    def test_version_survives_reopen(self):
+        """Test the version and epoch are read back from the database."""
+        self.store.add(Expense(1.00, 'Other', 'A'))
+        version, epoch = self.store.version, self.store.epoch
+        self.store.close()
+        
+        reopened = SQLiteExpenseStore(self.db_path)
+        self.addCleanup(reopened.close)
+        
+        self.assertEqual((reopened.version, reopened.epoch), (version, epoch))
+    
+    def test_search_index_filled_for_existing_database(self):
+        """Test a database created without the search table is indexed on open."""
+        self.store.close()
+        conn = sqlite3.connect(self.db_path)
+        with conn:
+            conn.execute('DROP TRIGGER trg_expenses_fts_insert')
+            conn.execute('DROP TRIGGER trg_expenses_fts_delete')
+            conn.execute('DROP TABLE expenses_fts')
+            conn.execute("INSERT INTO expenses VALUES (7, 3.5, 'Other', 'Old receipt', '2024-01-01')")
+        conn.close()
+        
+        reopened = SQLiteExpenseStore(self.db_path)
+        self.addCleanup(reopened.close)
+        
+        self.assertEqual(ids(reopened.search('receipt')), [7])
+    
+    def test_rollups_filled_for_existing_database(self):
+        """Test a database created without rollup tables has them filled on open."""
+        self.store.add(Expense(3.00, 'Other', 'Old', date='2024-05-02'))
+        self.store.add(Expense(4.00, 'Other', 'Old', date='2024-05-09'))
+        self.store.close()
+        conn = sqlite3.connect(self.db_path)
+        with conn:
+            for name in ('trg_expenses_rollup_insert', 'trg_expenses_rollup_delete'):
+                conn.execute(f'DROP TRIGGER {name}')
+            conn.execute('DROP TABLE daily_totals')
+            conn.execute('DROP TABLE monthly_totals')
+        conn.close()
+        
+        reopened = SQLiteExpenseStore(self.db_path)
+        self.addCleanup(reopened.close)
+        
+        self.assertEqual(reopened.rollup('month'), [('2024-05', 'Other', 2, 7.00)])
+    
+    def test_id_allocator_shared_between_stores(self):
+        """Test stores on one database file never hand out the same id."""
+        other = SQLiteExpenseStore(self.db_path)
+        self.addCleanup(other.close)
+        first, second = self.store.id_allocator(), other.id_allocator()
+        
+        block = first.allocate_block(3)
+        self.assertEqual(second.allocate(), block[-1] + 1)
+        self.store.add(Expense(1.00, 'Other', 'High id', expense_id=5000))
+        self.assertEqual(first.allocate(), 5001)
+        second.reset()
+        self.assertEqual(second.peek(), 5001)
+        self.store.clear()
+        second.reset()
+        self.assertEqual(first.allocate(), 1)
+    
+    def test_wal_mode(self):
+        """Test the database runs in WAL mode."""
+        conn = sqlite3.connect(self.db_path)
+        self.addCleanup(conn.close)
+        
+        self.assertEqual(conn.execute('PRAGMA journal_mode').fetchone()[0], 'wal')
+    
+    def test_connection_per_thread(self):
+        """Test each thread gets its own connection."""
+        seen = []
+        worker = threading.Thread(target=lambda: seen.append(self.store._connection()))
+        worker.start()
+        worker.join()
+        
+        self.assertIsNot(seen[0], self.store._connection())
+        self.assertIs(self.store._connection(), self.store._connection())
+    
+    def test_finished_threads_close_their_connections(self):
+        """Test a thread's connection is closed and forgotten when it ends."""
+        seen = []
+        for _ in range(50):
+            worker = threading.Thread(
+                target=lambda: seen.append(self.store._connection()) or len(self.store))
+            worker.start()
+            worker.join()
+        
+        self.assertEqual(list(self.store._connections), [self.store._connection()])
+        with self.assertRaises(sqlite3.ProgrammingError):
+            seen[0].execute('SELECT 1')
+
+
+class TestSQLiteCategoryTotals(SQLiteStoreMixin, TestCategoryTotals):
+    """Run the category total tests against the SQLite store."""
+
+
+class TestIdAllocator(unittest.TestCase):
+    """Test the thread-safe id allocator."""
+    
+    def test_concurrent_allocation_is_unique(self):
+        """Test ids handed out to many threads never repeat."""
+        allocator = models.IdAllocator()
+        results = [[] for _ in range(8)]
+        
+        def worker(out):
+            for _ in range(2000):
+                out.append(allocator.allocate())
+        
+        threads = [threading.Thread(target=worker, args=(out,)) for out in results]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        allocated = [i for out in results for i in out]
+        self.assertEqual(len(set(allocated)), 16000)
+        self.assertEqual(allocator.peek(), 16001)
+    
+    def test_block_and_advance(self):
+        """Test block reservation and advancing past stored ids."""
+        allocator = models.IdAllocator()
+        
+        self.assertEqual(list(allocator.allocate_block(3)), [1, 2, 3])
+        allocator.advance(10)
+        self.assertEqual(allocator.allocate(), 11)
+        allocator.reset()
+        self.assertEqual(allocator.allocate(), 1)
+
+
+class ConcurrentStoreStress:
+    """Hammer a store with concurrent adds and deletes and check invariants."""
+    
+    threads = 8
+    rounds = 300
+    
+    def setUp(self):
+        """Set up the store and force frequent thread switches."""
+        self.store = self.make_store()
+        interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+        self.addCleanup(sys.setswitchinterval, interval)
+    
+    def make_store(self):
+        """Create the store under test."""
+        return self.store_class()
+    
+    def test_concurrent_add_delete(self):
+        """Test concurrent writers and readers leave the store consistent."""
+        kept = [[] for _ in range(self.threads)]
+        errors = []
+        
+        def writer(out, n):
+            try:
+                category = ('Food & Dining', 'Shopping', 'Other')[n % 3]
+                for i in range(self.rounds):
+                    expense = self.store.add(Expense(1.25, category, f'T{n} #{i}',
+                                                     date='2024-07-01'))
+                    if i % 3:
+                        self.assertIsNotNone(self.store.delete(expense.id))
+                    else:
+                        out.append(expense.id)
+                    if i % 25 == 0:
+                        list(self.store)
+                    self.store.category_totals()
+            except Exception as exc:  # surfaced in the main thread below
+                errors.append(exc)
+        
+        workers = [threading.Thread(target=writer, args=(kept[n], n))
+                   for n in range(self.threads)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        
+        self.assertEqual(errors, [])
+        expected = sorted(i for out in kept for i in out)
+        stored = sorted(e.id for e in self.store)
+        self.assertEqual(stored, expected)
+        self.assertEqual(len(self.store), len(expected))
+        totals = {}
+        for expense in self.store:
+            totals[expense.category] = totals.get(expense.category, 0) + expense.amount
+        self.assertEqual(self.store.category_totals(), totals)
+        for n in range(self.threads):
+            self.assertEqual(self.store.category_count(('Food & Dining', 'Shopping', 'Other')[n % 3]),
+                             sum(len(kept[m]) for m in range(self.threads) if m % 3 == n % 3))
+
+
+class TestExpenseStoreConcurrency(ConcurrentStoreStress, unittest.TestCase):
+    """Stress the in-memory store from many threads."""
+    
+    store_class = ExpenseStore
+
+
+class TestColumnarStoreConcurrency(ConcurrentStoreStress, unittest.TestCase):
+    """Stress the columnar store from many threads."""
+    
+    store_class = ColumnarExpenseStore
+    rounds = 600
+    
+    def make_store(self):
+        """Create a columnar store that compacts often."""
+        store = ColumnarExpenseStore()
+        store.compact_min = 16
+        return store
+
+
+class TestSQLiteStoreConcurrency(SQLiteStoreMixin, ConcurrentStoreStress, unittest.TestCase):
+    """Stress the SQLite store from many threads."""
+    
+    rounds = 60
+
+
+class TestCreateStore(unittest.TestCase):
+    """Test choosing a store by configured name."""
+    
+    def test_known_stores(self):
+        """Test the configured names map to store classes."""
+        self.assertIsInstance(create_store('memory'), ExpenseStore)
+        self.assertIsInstance(create_store('columnar'), ColumnarExpenseStore)
+    
+    def test_store_from_config(self):
+        """Test the app config selects the backend and its options."""
+        with tempfile.TemporaryDirectory() as tmp:
+            store = store_from_config({
+                'EXPENSE_STORE': 'sqlite',
+                'EXPENSE_DB_PATH': os.path.join(tmp, 'expenses.db'),
+            })
+            store.close()
+        
+        self.assertIsInstance(store, SQLiteExpenseStore)
+        self.assertIsInstance(store_from_config({}), ExpenseStore)
+    
+    def test_unknown_store(self):
+        """Test an unknown name raises ValueError."""
+        with self.assertRaises(ValueError):
+            create_store('punch-cards')
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)